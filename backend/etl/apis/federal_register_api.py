@@ -1,11 +1,11 @@
 import requests
-from pymongo import MongoClient
 import logging
 import os
 from dotenv import load_dotenv
 import PyPDF2
 from xml.etree import ElementTree
 from bs4 import BeautifulSoup
+from rag.mongo import get_collection
 
 # Load environment variables
 load_dotenv()
@@ -19,11 +19,9 @@ logging.basicConfig(
 # MongoDB Connection
 def get_mongo_collection():
     try:
-        connection_string = os.getenv("MONGO_CONNECTION_STRING")
-        client = MongoClient(connection_string)
-        db = client["govai"]
+        collection = get_collection("govai", "federal_registry")
         logging.info("Connected to MongoDB successfully.")
-        return db["federal_registry"]
+        return collection
     except Exception as e:
         logging.error(f"Failed to connect to MongoDB: {e}")
         raise
@@ -9,9 +9,10 @@ Dependencies:
     - requests for HTTP requests
     - BeautifulSoup4 for HTML parsing
     - Pydantic for data validation
+    - rag.mongo for the shared pooled client, so run from the backend
+      directory: ``python -m etl.scrapers.whgov_scraper``
 """
 
-from pymongo import MongoClient
 import requests
 from bs4 import BeautifulSoup
 import concurrent.futures
@@ -21,14 +22,13 @@ from typing import Literal
 from pydantic import BaseModel, Field, ValidationError
 from tqdm import tqdm
 from html import unescape
+from rag.cards import CardCache
+from rag.mongo import get_collection
 import re
 
 # Load environment variables and setup MongoDB connection
 load_dotenv()
-connection_string = os.getenv("MONGO_CONNECTION_STRING")
-client = MongoClient(connection_string)
-db = client["WTP"]
-collection = db["whbriefingroom"]
+collection = get_collection("WTP", "whbriefingroom")
 
 # Base URL for the White House Briefing Room pages
 BASE_URL = "https://www.whitehouse.gov/briefing-room/page/"
@@ -71,16 +71,25 @@ def insert_article(article_data):
     Args:
         article_data (dict): Article data matching the WHArticle schema
 
+    Returns:
+        ObjectId: Id of the existing article that was updated, or None for
+        a new article (which has no cached search result card)
+
     Note:
         Uses upsert to avoid duplicates based on article URL
     """
     try:
         article = WHArticle(**article_data)
-        collection.update_one(
-            {"url": article.url}, {"$set": article.model_dump()}, upsert=True
+        previous = collection.find_one_and_update(
+            {"url": article.url},
+            {"$set": article.model_dump()},
+            projection={"_id": 1},
+            upsert=True,
         )
+        return previous["_id"] if previous else None
     except ValidationError as e:
         print(f"Validation error inserting an article: {e}")
+        return None
 
 
 def fetch_url(url):
@@ -208,6 +217,7 @@ def scrape_briefing_room() -> int:
     page_number = 1
     max_workers = 10  # Number of concurrent scraping threads
     res = 0  # Counter for processed URLs
+    updated_ids = []  # Existing articles whose cards changed
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Setup progress bar
@@ -235,7 +245,9 @@ def scrape_briefing_room() -> int:
                         # Process each article found on the page
                         for link in links:
                             article_details = scrape_article(link)
-                            insert_article(article_details)
+                            updated_id = insert_article(article_details)
+                            if updated_id is not None:
+                                updated_ids.append(updated_id)
 
                         # Queue next page if not already processed
                         if page_number not in processed_pages:
@@ -248,6 +260,10 @@ def scrape_briefing_room() -> int:
                 except Exception as e:
                     print(f"Error scraping page {page_num}: {e}")
         pbar.close()
+
+    # Updated articles may be behind cached search result cards; web workers
+    # drop them through Redis (without it, when their card TTL expires)
+    CardCache(redis_url=os.getenv("CARD_CACHE_REDIS_URL")).invalidate(updated_ids)
     return res
 
 
@@ -8,15 +8,21 @@ Dependencies:
     - OpenAI API key in environment variables
     - MongoDB connection string in environment variables
     - langchain_openai for GPT model interaction
-    - pymongo for database operations
+    - rag.mongo and rag.rate_limit, so run from the backend directory:
+      ``python -m etl.scrapers.whgov_summarizer``
+
+Summaries run at background priority in the shared OpenAI rate limiter, so
+they yield to interactive chat and search.
 """
 
 import logging
 import os
-from pymongo import MongoClient
 from tqdm import tqdm
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from rag.cards import CardCache
+from rag.mongo import get_collection
+from rag.rate_limit import Priority, get_rate_limiter, rate_priority
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,7 +39,10 @@ logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Initialize LLM model for text summarization
-llm = ChatOpenAI(model="gpt-4o-mini")
+limiter = get_rate_limiter("llm")
+llm = ChatOpenAI(
+    model="gpt-4o-mini", rate_limiter=limiter, callbacks=[limiter.usage_callback]
+)
 
 
 def generate_summary(text):
@@ -82,18 +91,10 @@ def get_mongo_collection():
         Exception: If connection to MongoDB fails.
     """
     try:
-        # Get the MongoDB connection string from environment variables
-        connection_string = os.getenv("MONGO_CONNECTION_STRING")
-
-        # Establish a connection to MongoDB
-        client = MongoClient(connection_string)
-
-        # Select the database and collection for briefing room documents
-        db = client["WTP"]
+        # Briefing room documents on the shared pooled client
+        collection = get_collection("WTP", "whbriefingroom")
         logging.info("Connected to MongoDB successfully.")
-
-        # Return mongodb collection
-        return db["whbriefingroom"]
+        return collection
 
     except Exception as e:
         # Log any errors that occur during connection
@@ -117,6 +118,9 @@ def summarize_documents():
     try:
         # Initialize the MongoDB client
         collection = get_mongo_collection()
+        # Publishes changed card ids to the web workers through Redis;
+        # without it their cards refresh when the card TTL expires
+        card_cache = CardCache(redis_url=os.getenv("CARD_CACHE_REDIS_URL"))
 
         # Define a query to find documents without summaries
         query = {"content": {"$exists": True}, "summary": {"$exists": False}}
@@ -146,6 +150,7 @@ def summarize_documents():
 
                 if not batch:
                     break
+                summarized_ids = []
 
                 # Process each document in the batch
                 for doc in batch:
@@ -164,6 +169,7 @@ def summarize_documents():
                             collection.update_one(
                                 {"_id": doc["_id"]}, {"$set": {"summary": summary}}
                             )
+                            summarized_ids.append(doc["_id"])
                             processed += 1
                             pbar.update(1)
 
@@ -182,6 +188,10 @@ def summarize_documents():
                         )
                         continue
 
+                # Search result cards show the summary, so refresh them
+                if summarized_ids:
+                    card_cache.invalidate(summarized_ids)
+
                 # Update the last ID for the next batch
                 last_id = batch[-1]["_id"]
                 logger.info(
@@ -196,5 +206,6 @@ def summarize_documents():
 
 if __name__ == "__main__":
     logger.info("Starting document summarization process")
-    summarize_documents()
+    with rate_priority(Priority.BACKGROUND):
+        summarize_documents()
     logger.info("Document summarization process completed")
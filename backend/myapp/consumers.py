@@ -8,20 +8,45 @@ This module implements the WebSocket consumer that handles:
 - Chat history persistence
 """
 
+import atexit
 import json
 import logging
+from functools import lru_cache
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import DatabaseError
+from django.conf import settings
 from asgiref.sync import sync_to_async
 import asyncio
-from rag.chat_graph import ChatGraph
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from rag.chat_graph import ChatGraph, ChatContext
+from rag.metrics import STREAM_BYTES, STREAM_FRAMES
+from rag.rate_limit import Priority, rate_priority
+from rag.router import QueryRouter
+from rag.streaming import StreamStats, coalesce_stream
+from .history import ChatHistoryLoader
+from .persistence import get_message_writer
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_query_router() -> QueryRouter:
+    """
+    Return the worker's query router, configured from ``settings.QUERY_ROUTER``.
+
+    Returns:
+        QueryRouter: Router whose decision log is written until the process exits
+    """
+    options = settings.QUERY_ROUTER
+    router = QueryRouter(
+        log_queries=options["LOG_QUERIES"],
+        max_log_bytes=options["MAX_LOG_BYTES"],
+        log_backups=options["LOG_BACKUPS"],
+    )
+    atexit.register(router.close)
+    return router
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for handling chat messages.
@@ -33,13 +58,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
     Attributes:
         user: The authenticated user for this connection
         session_id: UUID of the chat session
-        chat_graph: ChatGraph instance for this session
+        chat_graph: Process-wide ChatGraph shared by all sessions
+        chat_context: Per-session history and new messages run through the graph
+        history_loader: Pages stored messages into the chat context
+        history_ready: Task loading the most recent messages after connect
+        queued_chats: Number of ``chat_context.new_chats`` already queued for writing
     """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.session_id = None
         self.chat_graph = None
+        self.chat_context = None
+        self.history_loader = None
+        self.history_ready = None
+        self.queued_chats = 0
 
     async def connect(self) -> None:
         """
@@ -72,44 +105,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
 
             # Validate session ownership
-            from .models import ChatSession, ChatMessage
+            from .models import ChatSession
 
             try:
                 self.chat_session = await sync_to_async(ChatSession.objects.get)(
                     session_id=self.session_id, user=self.user
                 )
-                
-                # Load existing chat history
-                chat_messages = await sync_to_async(list)(
-                    ChatMessage.objects.filter(session=self.chat_session).order_by("created_at")
-                )
-                
-                # Create chat history for the graph
-                history = ChatMessageHistory()
-                for message in chat_messages:
-                    if message.role == "human":
-                        history.add_user_message(message.content)
-                    elif message.role == "ai":
-                        history.add_ai_message(message.content)
-                
-                logger.info(f"Loaded {len(chat_messages)} messages for session {self.session_id}")
-                
-                # Initialize chat graph with loaded history
-                self.chat_graph = ChatGraph(chat_history=history)
-                logger.info(f"Initialized ChatGraph with {len(history.messages)} message history, for session {self.session_id}")
-                
             except ObjectDoesNotExist:
                 logger.warning(f"Invalid session access attempt: {self.session_id}")
                 await self.close(code=4004)
                 return
 
+            # Shared graph; only the session context is per connection
+            self.chat_graph = ChatGraph(router=get_query_router())
+            self.history_loader = ChatHistoryLoader(
+                self.chat_session, page_size=settings.CHAT_HISTORY["INITIAL_MESSAGES"]
+            )
+            self.chat_context = ChatContext(
+                session_id=self.session_id, history_loader=self.history_loader
+            )
+
             logger.info(f"WebSocket connected: session={self.session_id}")
             await self.accept()
 
+            # Recent history loads after the handshake; receive waits for it
+            self.history_ready = asyncio.create_task(self.load_history())
+
         except Exception as e:
             logger.error(f"Connection error: {str(e)}")
             await self.close(code=4000)
 
+    async def load_history(self) -> None:
+        """
+        Loads the most recent page of stored messages into the chat context.
+
+        Older messages are loaded later only if the history manager needs
+        them to fill its window.
+        """
+        try:
+            messages = await self.history_loader.latest()
+            self.chat_context.chat_history.messages[:0] = messages
+        except DatabaseError as e:
+            logger.error(f"Error loading chat history for session {self.session_id}: {str(e)}")
+
     async def disconnect(self, close_code: int) -> None:
         """
         Handles WebSocket disconnection.
@@ -118,35 +156,45 @@ class ChatConsumer(AsyncWebsocketConsumer):
             close_code: The code indicating why the connection was closed
         """
         try:
-            if self.chat_graph:
-                # Get new chats from the graph
-                new_chats = self.chat_graph.get_new_chats()
-                logger.info(f"Retrieved {len(new_chats)} new chats for session={self.session_id}")
-                
-                # Save new chats to database
-                from .models import ChatMessage
-                
-                saved_count = 0
-                for chat in new_chats:
-                    #TODO Extract metadata if it exists
-                                        
-                    await sync_to_async(ChatMessage.objects.create)(
-                        session=self.chat_session,
-                        content=chat.content,
-                        role="human" if isinstance(chat, HumanMessage) else "ai",
-                    )
-                    saved_count += 1
-                    
-                logger.info(
-                    f"Successfully saved {saved_count} messages for session={self.session_id}"
-                )
+            # A client that leaves early should not keep its history load running
+            if self.history_ready is not None and not self.history_ready.done():
+                self.history_ready.cancel()
+                try:
+                    await self.history_ready
+                except asyncio.CancelledError:
+                    pass
+
+            if self.chat_context:
+                # The rolling summary lives with the connection
+                if self.chat_context.summary_task is not None:
+                    self.chat_context.summary_task.cancel()
+
+                # Turns are written as they complete; queue any remainder
+                # (e.g. a question whose answer failed) and flush promptly
+                queued = self.queue_new_chats()
+                get_message_writer().flush_soon()
+                logger.info(f"Queued {queued} remaining messages for session={self.session_id}")
             
             logger.info(
-                f"WebSocket disconnected: session={self.session_id}, code={close_code}"
+                f"WebSocket disconnected: session={self.session_id}, code={close_code}, "
+                f"history_loads={self.history_loader.stats.as_dict() if self.history_loader else None}"
             )
         except Exception as e:
             logger.error(f"Error saving chat history: {str(e)}")
 
+    def queue_new_chats(self) -> int:
+        """
+        Queues messages not yet handed to the write-behind writer.
+
+        Returns:
+            int: Number of messages queued
+        """
+        pending = self.chat_context.new_chats[self.queued_chats:]
+        if pending:
+            get_message_writer().enqueue(self.chat_session, pending)
+            self.queued_chats += len(pending)
+        return len(pending)
+
     async def send_error(self, message, code=None) -> None:
         """
         Sends an error message to the client.
@@ -166,7 +214,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Handles the complete lifecycle of a chat message:
         1. Message parsing and validation
         2. ChatGraph processing with streaming response
-        3. Message streaming to client
+        3. Message streaming to client, with token chunks coalesced into
+           frames per ``settings.CHAT_STREAMING``
+        4. Queueing the completed turn for write-behind persistence
 
         Error Codes:
             INVALID_FORMAT: Message parsing failed
@@ -187,16 +237,32 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             logger.info(f"Processing message: session={self.session_id}")
 
-            if not self.chat_graph:
+            if not self.chat_graph or not self.chat_context:
                 logger.error("ChatGraph not initialized")
                 await self.send_error("System error occurred", "SYSTEM_ERROR")
                 return
+            await self.history_ready
 
             # Process with ChatGraph
             try:
                 logger.info(f"Starting ChatGraph processing for query: session={self.session_id}")
-                async for message in self.chat_graph.process_query_async(query):
-                    await self.send(json.dumps(message))
+                stream_settings = settings.CHAT_STREAMING
+                stats = StreamStats()
+                # Interactive chat goes first in the shared OpenAI rate limiter
+                with rate_priority(Priority.CHAT):
+                    async for message in coalesce_stream(
+                        self.chat_graph.process_query_async(query, self.chat_context),
+                        flush_interval=stream_settings["FLUSH_INTERVAL"],
+                        max_bytes=stream_settings["MAX_BYTES"],
+                    ):
+                        payload = json.dumps(message)
+                        await self.send(payload)
+                        stats.record(payload)
+                STREAM_FRAMES.inc(stats.frames)
+                STREAM_BYTES.inc(stats.bytes)
+
+                # Persist the completed turn in the background
+                self.queue_new_chats()
 
                 # Success response
                 await self.send(
@@ -204,7 +270,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
                         {"type": "complete", "message": "Streaming finished"}
                     )
                 )
-                logger.info(f"Message finished successfully: session={self.session_id}")
+                logger.info(
+                    f"Message finished successfully: session={self.session_id} "
+                    f"stream={stats.as_dict()}"
+                )
 
 
             except Exception as e:
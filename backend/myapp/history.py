@@ -0,0 +1,97 @@
+"""
+Windowed loading of stored chat history.
+
+Connections load only the most recent messages of a session; older pages
+are fetched on demand with a keyset query on (created_at, id), which the
+``chatmsg_session_recent_idx`` index serves without scanning the session.
+"""
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from rag.metrics import HISTORY_LOAD_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HistoryLoadStats:
+    """Counters for history pages loaded by one connection."""
+
+    loads: int = 0
+    messages: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def to_langchain_message(message) -> BaseMessage:
+    """Convert a stored ``ChatMessage`` into a LangChain message."""
+    if message.role == "human":
+        return HumanMessage(content=message.content)
+    return AIMessage(content=message.content, additional_kwargs={"metadata": message.metadata or []})
+
+
+class ChatHistoryLoader:
+    """Pages a session's messages from newest to oldest.
+
+    Args:
+        session: The ChatSession whose messages are loaded
+        page_size: Messages loaded by ``latest``
+    """
+
+    def __init__(self, session, page_size: int = 8):
+        self.session = session
+        self.page_size = page_size
+        self.has_more = True
+        self.stats = HistoryLoadStats()
+        # (created_at, id) of the oldest message loaded so far
+        self._cursor = None
+
+    def _page(self, limit: int) -> List[BaseMessage]:
+        from .models import ChatMessage
+
+        queryset = ChatMessage.objects.filter(session=self.session)
+        if self._cursor is not None:
+            created_at, pk = self._cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(
+            queryset.order_by("-created_at", "-id").only("id", "role", "content", "created_at", "metadata")[:limit]
+        )
+        if rows:
+            self._cursor = (rows[-1].created_at, rows[-1].id)
+        self.has_more = len(rows) == limit
+        return [to_langchain_message(row) for row in reversed(rows)]
+
+    async def older(self, limit: int) -> List[BaseMessage]:
+        """Load up to ``limit`` messages older than those already loaded.
+
+        Load times also feed ``chat_history_load_duration_seconds``.
+
+        Returns:
+            List[BaseMessage]: Messages in chronological order
+        """
+        if not self.has_more:
+            return []
+        start = time.perf_counter()
+        messages = await sync_to_async(self._page)(limit)
+        elapsed = time.perf_counter() - start
+        self.stats.loads += 1
+        self.stats.messages += len(messages)
+        self.stats.seconds += elapsed
+        HISTORY_LOAD_DURATION.observe(elapsed)
+        logger.info(
+            f"Loaded {len(messages)} history messages for session {self.session.session_id} "
+            f"in {elapsed * 1000:.1f}ms"
+        )
+        return messages
+
+    async def latest(self) -> List[BaseMessage]:
+        """Load the most recent page of the session."""
+        return await self.older(self.page_size)
@@ -0,0 +1,234 @@
+"""
+WebSocket load generation for ChatConsumer.
+
+Drives the real ASGI websocket stack (``TokenAuthMiddleware`` and the
+chat URL router) in-process through a raw ASGI websocket client, with the
+chat graph replaced by one built on the fake providers in ``rag.fakes``.
+The client mirrors ``channels.testing.WebSocketClient`` without its
+test-only daphne dependency.
+Reports connect latency, frame latency percentiles, memory per open
+connection and event-loop lag.
+"""
+
+import asyncio
+import json
+import os
+import resource
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+from rag.benchmark import summarize
+
+from .models import ChatSession
+
+LOAD_TEST_PREFIX = "loadtest-"
+
+
+class WebSocketClient(ApplicationCommunicator):
+    """In-process ASGI websocket client for one connection.
+
+    Args:
+        application: ASGI application handling ``websocket`` scopes
+        path: Request path including the query string
+    """
+
+    def __init__(self, application, path: str):
+        parsed = urlparse(path)
+        scope = {
+            "type": "websocket",
+            "path": parsed.path,
+            "query_string": parsed.query.encode("utf-8"),
+            "headers": [],
+            "subprotocols": [],
+        }
+        super().__init__(application, scope)
+
+    async def connect(self, timeout: float = 1) -> Tuple[bool, Optional[int]]:
+        """Returns (True, None) when accepted, (False, close code) otherwise."""
+        await self.send_input({"type": "websocket.connect"})
+        response = await self.receive_output(timeout)
+        if response["type"] == "websocket.close":
+            return False, response.get("code", 1000)
+        return True, None
+
+    async def send_json(self, data) -> None:
+        await self.send_input({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self, timeout: float = 1):
+        response = await self.receive_output(timeout)
+        if response["type"] != "websocket.send":
+            raise ConnectionError(f"Expected a frame, got {response['type']}")
+        return json.loads(response["text"])
+
+    async def disconnect(self, code: int = 1000, timeout: float = 1) -> None:
+        await self.send_input({"type": "websocket.disconnect", "code": code})
+        await self.wait(timeout)
+
+
+@dataclass
+class LoadTestResult:
+    """Measurements of one load test run."""
+
+    connections: int = 0
+    failed_connections: int = 0
+    connect_ms: List[float] = field(default_factory=list)
+    first_frame_ms: List[float] = field(default_factory=list)
+    frame_ms: List[float] = field(default_factory=list)
+    turn_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    loop_lag_ms: List[float] = field(default_factory=list)
+    memory_per_connection_kb: Optional[float] = None
+    wall_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "connections": self.connections,
+            "failed_connections": self.failed_connections,
+            "connect_ms": summarize(self.connect_ms),
+            "first_frame_ms": summarize(self.first_frame_ms),
+            "frame_ms": summarize(self.frame_ms),
+            "turn_ms": summarize(self.turn_ms),
+            "turns_per_second": len(self.turn_ms) / self.wall_seconds if self.wall_seconds else 0.0,
+            "errors": self.errors,
+            "loop_lag_ms": summarize(self.loop_lag_ms),
+            "memory_per_connection_kb": self.memory_per_connection_kb,
+            "wall_seconds": self.wall_seconds,
+        }
+
+
+def resident_memory_kb() -> float:
+    """Current resident set size of this process in KiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except (OSError, ValueError):
+        # Peak rather than current RSS, but still monotonic during a run
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def create_load_test_fixtures(connections: int, users: int = 10) -> List[Tuple[str, str]]:
+    """Create users, tokens and chat sessions for a load test.
+
+    Returns:
+        List[Tuple[str, str]]: (token key, session id) per connection
+    """
+    User.objects.bulk_create([User(username=f"{LOAD_TEST_PREFIX}{i}") for i in range(users)])
+    accounts = list(User.objects.filter(username__startswith=LOAD_TEST_PREFIX).order_by("id"))
+    tokens = Token.objects.bulk_create(
+        [Token(user=user, key=Token.generate_key()) for user in accounts]
+    )
+    sessions = ChatSession.objects.bulk_create(
+        [
+            ChatSession(user=accounts[i % len(accounts)], name=f"Load test {i}")
+            for i in range(connections)
+        ]
+    )
+    token_by_user = {token.user_id: token.key for token in tokens}
+    return [(token_by_user[session.user_id], str(session.session_id)) for session in sessions]
+
+
+def delete_load_test_fixtures() -> int:
+    """Remove load test users together with their tokens, sessions and messages."""
+    deleted, _ = User.objects.filter(username__startswith=LOAD_TEST_PREFIX).delete()
+    return deleted
+
+
+async def _monitor_loop_lag(result: LoadTestResult, stop: asyncio.Event, interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        result.loop_lag_ms.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def _receive_turn(communicator: WebSocketClient, sent: float, result: LoadTestResult, timeout: float) -> None:
+    first = True
+    while True:
+        message = await communicator.receive_json(timeout=timeout)
+        elapsed = (time.perf_counter() - sent) * 1000
+        if first:
+            result.first_frame_ms.append(elapsed)
+            first = False
+        result.frame_ms.append(elapsed)
+        if message["type"] == "complete":
+            result.turn_ms.append(elapsed)
+            return
+        if message["type"] == "error":
+            result.errors += 1
+            return
+
+
+async def run_load_test(
+    application,
+    credentials: Sequence[Tuple[str, str]],
+    messages_per_connection: int = 1,
+    connect_concurrency: int = 100,
+    think_time: float = 0.0,
+    timeout: float = 60.0,
+    questions: Sequence[str] = ("What does Executive Order 14067 say about digital assets?",),
+) -> LoadTestResult:
+    """Open one socket per credential, chat on all of them, then close them.
+
+    Args:
+        application: ASGI websocket application (usually the auth
+            middleware wrapping the chat URL router)
+        credentials: (token key, session id) per connection
+        messages_per_connection: Chat turns sent on each socket
+        connect_concurrency: Handshakes allowed in flight at once
+        think_time: Pause between turns on one socket
+        timeout: Seconds to wait for any single frame
+        questions: Messages sent, cycled across turns
+    """
+    result = LoadTestResult()
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(result, stop))
+    gate = asyncio.Semaphore(connect_concurrency)
+    communicators: List[WebSocketClient] = []
+
+    async def connect(token: str, session_id: str) -> Optional[WebSocketClient]:
+        communicator = WebSocketClient(application, f"/ws/chat/{session_id}/?token={token}")
+        async with gate:
+            start = time.perf_counter()
+            try:
+                connected, _ = await communicator.connect(timeout=timeout)
+            except Exception:
+                connected = False
+            if not connected:
+                result.failed_connections += 1
+                return None
+            result.connect_ms.append((time.perf_counter() - start) * 1000)
+        return communicator
+
+    async def chat(index: int, communicator: WebSocketClient) -> None:
+        for turn in range(messages_per_connection):
+            if turn and think_time:
+                await asyncio.sleep(think_time)
+            sent = time.perf_counter()
+            await communicator.send_json({"message": questions[(index + turn) % len(questions)]})
+            try:
+                await _receive_turn(communicator, sent, result, timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                result.errors += 1
+                return
+
+    start = time.perf_counter()
+    memory_before = resident_memory_kb()
+    try:
+        opened = await asyncio.gather(*(connect(token, session_id) for token, session_id in credentials))
+        communicators = [c for c in opened if c is not None]
+        result.connections = len(communicators)
+        if communicators:
+            result.memory_per_connection_kb = (resident_memory_kb() - memory_before) / len(communicators)
+        await asyncio.gather(*(chat(i, c) for i, c in enumerate(communicators)))
+    finally:
+        await asyncio.gather(*(c.disconnect() for c in communicators), return_exceptions=True)
+        result.wall_seconds = time.perf_counter() - start
+        stop.set()
+        await monitor
+    return result
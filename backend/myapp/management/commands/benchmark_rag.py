@@ -0,0 +1,95 @@
+"""
+Management command to benchmark the RAG graphs offline.
+
+Runs ChatGraph and SearchGraph on deterministic fake providers (no OpenAI
+or Pinecone calls) at several concurrency levels and writes the results as
+JSON, optionally comparing them with an earlier run:
+
+    python manage.py benchmark_rag --sessions 1,10,100,500 --output bench.json
+    python manage.py benchmark_rag --output new.json --compare bench.json
+"""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from rag.benchmark import BenchmarkConfig, compare_results, run_benchmarks
+from rag.fakes import Latency
+
+
+class Command(BaseCommand):
+    help = "Benchmark ChatGraph and SearchGraph offline with fake LLM, embeddings and vector store"
+    requires_system_checks = []
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--sessions", default="1,10,50,100,500", help="Comma-separated concurrent session counts")
+        parser.add_argument("--turns", type=int, default=3, help="Turns (or queries) per session")
+        parser.add_argument("--graphs", default="chat,search", help="Graphs to benchmark")
+        parser.add_argument("--llm-latency", type=float, default=0.4, help="Mean LLM time to first token (s)")
+        parser.add_argument("--llm-jitter", type=float, default=0.15, help="LLM latency standard deviation (s)")
+        parser.add_argument("--tokens-per-second", type=float, default=60.0, help="LLM streaming rate")
+        parser.add_argument("--answer-tokens", type=int, default=60, help="Tokens per generated answer")
+        parser.add_argument("--embedding-latency", type=float, default=0.03, help="Mean embedding latency (s)")
+        parser.add_argument("--retrieval-latency", type=float, default=0.05, help="Mean vector search latency (s)")
+        parser.add_argument(
+            "--distribution",
+            default="lognormal",
+            choices=["constant", "uniform", "normal", "lognormal"],
+            help="Latency distribution of every fake provider",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+        parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against")
+
+    def handle(self, *args, **options) -> None:
+        try:
+            sessions = tuple(int(value) for value in options["sessions"].split(","))
+        except ValueError:
+            raise CommandError("--sessions must be comma-separated integers")
+        distribution = options["distribution"]
+        config = BenchmarkConfig(
+            sessions=sessions,
+            turns=options["turns"],
+            llm_latency=Latency(options["llm_latency"], options["llm_jitter"], distribution),
+            tokens_per_second=options["tokens_per_second"],
+            answer_tokens=options["answer_tokens"],
+            embedding_latency=Latency(options["embedding_latency"], options["embedding_latency"] / 3, distribution),
+            retrieval_latency=Latency(options["retrieval_latency"], options["retrieval_latency"] / 3, distribution),
+            seed=options["seed"],
+        )
+        report = run_benchmarks(config, graphs=[g.strip() for g in options["graphs"].split(",")])
+
+        for graph, result in report["results"].items():
+            overhead_key = "turn_ms" if graph == "chat" else "query_ms"
+            self.stdout.write(
+                f"{graph}: graph overhead p50 {result['overhead'][overhead_key]['p50']:.1f} ms"
+            )
+            for level in result["levels"]:
+                line = (
+                    f"  {level['sessions']:>4} sessions: p50 {level[overhead_key]['p50']:.0f} ms, "
+                    f"p95 {level[overhead_key]['p95']:.0f} ms"
+                )
+                if graph == "chat":
+                    line += (
+                        f", ttft p50 {level['ttft_ms'].get('p50', 0):.0f} ms, "
+                        f"{level['turns_per_second']:.1f} turns/s, {level['tokens_per_second']:.0f} tokens/s"
+                    )
+                else:
+                    line += f", {level['queries_per_second']:.1f} queries/s"
+                self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+            self.stdout.write(f"Compared with {options['compare']} (current / baseline):")
+            for row in compare_results(baseline, report):
+                self.stdout.write(
+                    f"  {row['graph']} {row['sessions']:>4} sessions: throughput x{row['throughput']:.2f}, "
+                    f"p50 x{row['p50']:.2f}, p95 x{row['p95']:.2f}"
+                )
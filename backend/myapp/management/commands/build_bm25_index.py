@@ -0,0 +1,43 @@
+"""
+Management command to build the BM25 keyword index.
+
+Loads the briefing room collection from MongoDB, chunks it the same way
+as the vector index and writes the lexical index used by hybrid retrieval:
+
+    python manage.py build_bm25_index --path /data/policybot-bm25
+
+Point ``BM25_INDEX_PATH`` at the directory to enable hybrid retrieval.
+"""
+
+import os
+import shutil
+from django.core.management.base import BaseCommand, CommandError
+from dotenv import load_dotenv
+from rag.indexing import load_policy_chunks
+from rag.lexical import BM25Index
+
+
+class Command(BaseCommand):
+    help = "Build the BM25 keyword index over the briefing room collection"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--path", required=True, help="Index directory to write")
+        parser.add_argument("--limit", type=int, default=None, help="Only index the first N chunks")
+        parser.add_argument(
+            "--overwrite", action="store_true", help="Replace an existing index at --path"
+        )
+
+    def handle(self, *args, **options) -> None:
+        load_dotenv()
+        path = options["path"]
+        if os.path.exists(path) and os.listdir(path):
+            if not options["overwrite"]:
+                raise CommandError(f"{path} is not empty; pass --overwrite")
+            shutil.rmtree(path)
+
+        chunks = load_policy_chunks(options["limit"])
+        self.stdout.write(f"Indexing {len(chunks)} chunks")
+        index = BM25Index.build(path, chunks)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote BM25 index over {len(index)} chunks to {path}")
+        )
@@ -0,0 +1,64 @@
+"""
+Management command to build the in-process vector index.
+
+Loads the briefing room collection from MongoDB, chunks it the same way
+as the Pinecone index and writes a memory-mapped local index:
+
+    python manage.py build_local_vector_index --path /data/policybot-index --ivf-lists 256
+
+Point ``LOCAL_VECTOR_STORE_PATH`` at the directory to serve from it.
+"""
+
+import os
+import shutil
+from django.core.management.base import BaseCommand, CommandError
+from dotenv import load_dotenv
+from rag.base import OpenAIEmbeddingsModel
+from rag.indexing import load_policy_chunks
+from rag.local_store import LocalVectorStore
+from rag.rate_limit import Priority, rate_priority
+
+
+class Command(BaseCommand):
+    help = "Embed the briefing room collection into a local memory-mapped vector index"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--path", required=True, help="Index directory to write")
+        parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding call")
+        parser.add_argument("--limit", type=int, default=None, help="Only index the first N chunks")
+        parser.add_argument("--quantize", action="store_true", help="Also write int8 vectors")
+        parser.add_argument(
+            "--ivf-lists", type=int, default=None, help="Build an IVF index with N lists"
+        )
+        parser.add_argument(
+            "--overwrite", action="store_true", help="Replace an existing index at --path"
+        )
+
+    def handle(self, *args, **options) -> None:
+        load_dotenv()
+        path = options["path"]
+        if os.path.exists(os.path.join(path, "manifest.json")):
+            if not options["overwrite"]:
+                raise CommandError(f"An index already exists at {path}; pass --overwrite")
+            shutil.rmtree(path)
+
+        # Indexing yields to interactive traffic sharing the OpenAI budget
+        with rate_priority(Priority.BACKGROUND):
+            self._build(path, options)
+
+    def _build(self, path: str, options) -> None:
+        chunks = load_policy_chunks(options["limit"])
+        self.stdout.write(f"Embedding {len(chunks)} chunks")
+
+        store = LocalVectorStore(path, OpenAIEmbeddingsModel().get_embeddings())
+        batch_size = options["batch_size"]
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start : start + batch_size]
+            store.add_texts(
+                [chunk.page_content for chunk in batch],
+                [chunk.metadata for chunk in batch],
+            )
+            self.stdout.write(f"Embedded {min(start + batch_size, len(chunks))}/{len(chunks)}")
+
+        store.persist(quantize_vectors=options["quantize"], ivf_lists=options["ivf_lists"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(store)} vectors to {path}"))
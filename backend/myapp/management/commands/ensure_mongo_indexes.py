@@ -0,0 +1,60 @@
+"""
+Management command to create and verify the MongoDB indexes.
+
+Run at deploy, after the database is reachable. It creates any declared
+index that is missing (see ``rag.mongo_indexes``), then explains the
+scraper, summarizer, card pool and Federal Register queries and reports
+whether each one uses its index:
+
+    python manage.py ensure_mongo_indexes
+    python manage.py ensure_mongo_indexes --check   # verify only, create nothing
+
+Exits with an error if an index could not be created or conflicts with an
+existing one, or if a query would scan its collection.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from dotenv import load_dotenv
+from rag.mongo_indexes import ensure_indexes, explain_access_paths
+
+FAILED_INDEX = {"missing", "conflict", "error"}
+FAILED_PLAN = {"collscan", "wrong_index", "blocking_sort", "error"}
+
+
+class Command(BaseCommand):
+    help = "Create and verify the MongoDB indexes used by the ETL jobs, and explain their queries"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--check", action="store_true", help="Only verify; report missing indexes instead of creating them"
+        )
+
+    def handle(self, *args, **options) -> None:
+        load_dotenv()
+        failures = 0
+
+        for result in ensure_indexes(create=not options["check"]):
+            line = f"{result.spec.namespace} {result.spec.name}: {result.status}"
+            if result.detail:
+                line += f" ({result.detail})"
+            if result.status in FAILED_INDEX:
+                failures += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        for report in explain_access_paths():
+            plan = " <- ".join(report.stages) or "-"
+            line = f"{report.path.description}: {report.status} [{plan}]"
+            if report.detail:
+                line += f" ({report.detail})"
+            if report.status in FAILED_PLAN:
+                failures += 1
+                self.stdout.write(self.style.ERROR(line))
+            elif report.status == "empty":
+                self.stdout.write(self.style.WARNING(f"{line} collection does not exist yet"))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if failures:
+            raise CommandError(f"{failures} index or query plan checks failed")
@@ -0,0 +1,33 @@
+"""
+Management command to drop cached search results.
+
+Run after re-indexing the vector store so no worker keeps serving
+document ids from the previous index:
+
+    python manage.py invalidate_search_cache
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rag.search_cache import create_search_cache
+
+
+class Command(BaseCommand):
+    help = "Invalidate the search result cache after the vector index is updated"
+
+    def handle(self, *args, **options) -> None:
+        cache_settings = settings.SEARCH_CACHE
+        if cache_settings["BACKEND"] != "redis":
+            self.stdout.write(
+                self.style.WARNING(
+                    "Search cache backend is per-process memory; "
+                    "restart the workers to clear it."
+                )
+            )
+            return
+
+        cache = create_search_cache(
+            backend=cache_settings["BACKEND"], **cache_settings.get("OPTIONS", {})
+        )
+        cache.invalidate()
+        self.stdout.write(self.style.SUCCESS("Search result cache invalidated"))
@@ -0,0 +1,104 @@
+"""
+Management command to load test the chat WebSocket consumer in-process.
+
+Opens many authenticated sockets through TokenAuthMiddleware against a
+ChatGraph built on fake providers, and reports connect latency, frame
+latency percentiles, memory per connection and event-loop lag. Runs in a
+throwaway test database unless --no-test-db is given:
+
+    python manage.py load_test_chat --connections 2000 --messages 2
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from channels.routing import URLRouter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from myapp import routing
+from myapp.loadtest import create_load_test_fixtures, delete_load_test_fixtures, run_load_test
+from myapp.middleware import TokenAuthMiddleware
+from myapp.persistence import get_message_writer
+from rag.benchmark import BenchmarkConfig, build_fake_graph
+from rag.chat_graph import ChatGraph
+from rag.fakes import Latency, mark_environment_offline
+from rag.router import QueryRouter
+
+
+class Command(BaseCommand):
+    help = "Load test ChatConsumer with many concurrent authenticated WebSocket sessions"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--connections", type=int, default=1000, help="Concurrent sockets to open")
+        parser.add_argument("--users", type=int, default=10, help="Users the sessions are spread over")
+        parser.add_argument("--messages", type=int, default=1, help="Chat turns per socket")
+        parser.add_argument("--connect-concurrency", type=int, default=100, help="Handshakes in flight at once")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between turns on a socket")
+        parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for any frame")
+        parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean fake LLM time to first token (s)")
+        parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Fake LLM streaming rate")
+        parser.add_argument("--answer-tokens", type=int, default=40, help="Tokens per fake answer")
+        parser.add_argument("--no-test-db", action="store_true", help="Use the configured database (fixtures are deleted afterwards)")
+        parser.add_argument("--output", default=None, help="Write the JSON report here")
+
+    def handle(self, *args, **options) -> None:
+        if options["connections"] < 1 or options["users"] < 1:
+            raise CommandError("--connections and --users must be positive")
+
+        test_db = not options["no_test_db"]
+        old_name = connection.settings_dict["NAME"]
+        if test_db:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self._run(options)
+        finally:
+            # Pending chat writes must land before the database goes away
+            get_message_writer().flush()
+            if test_db:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            else:
+                delete_load_test_fixtures()
+
+        for key, value in report.items():
+            if isinstance(value, dict):
+                if value.get("count"):
+                    value = f"p50 {value['p50']:.1f}, p95 {value['p95']:.1f}, p99 {value['p99']:.1f}, max {value['max']:.1f}"
+                else:
+                    value = "n/a"
+            self.stdout.write(f"{key}: {value}")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _run(self, options) -> dict:
+        delete_load_test_fixtures()
+        credentials = create_load_test_fixtures(options["connections"], options["users"])
+        self.stdout.write(f"Created {len(credentials)} sessions for {options['users']} users")
+
+        mark_environment_offline()
+        config = BenchmarkConfig(
+            llm_latency=Latency(options["llm_latency"], options["llm_latency"] / 3),
+            tokens_per_second=options["tokens_per_second"],
+            answer_tokens=options["answer_tokens"],
+        )
+        with tempfile.TemporaryDirectory() as work_dir:
+            router = QueryRouter(
+                log_path=os.path.join(work_dir, "router.jsonl"),
+                model_path=os.path.join(work_dir, "router.json"),
+            )
+            # The consumer's ChatGraph() returns this fake-backed singleton
+            build_fake_graph(ChatGraph, config, offline_latency=False, router=router)
+            application = TokenAuthMiddleware(URLRouter(routing.websocket_urlpatterns))
+            result = asyncio.run(
+                run_load_test(
+                    application,
+                    credentials,
+                    messages_per_connection=options["messages"],
+                    connect_concurrency=options["connect_concurrency"],
+                    think_time=options["think_time"],
+                    timeout=options["timeout"],
+                )
+            )
+        return result.as_dict()
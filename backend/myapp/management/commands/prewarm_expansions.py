@@ -0,0 +1,58 @@
+"""
+Management command to pre-warm the query expansion cache.
+
+Expands the most frequent historical search queries offline so live
+searches skip the LLM expansion call:
+
+    python manage.py prewarm_expansions --top 500
+
+Queries are only logged with ``EXPANSION_CACHE["LOG_QUERIES"]`` enabled.
+"""
+
+import logging
+from django.core.management.base import BaseCommand
+from myapp.views import get_search_graph
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Expand the top-N historical search queries into the expansion cache"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--top", type=int, default=500, help="Number of historical queries to expand"
+        )
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Re-expand queries even if a cached expansion exists",
+        )
+
+    def handle(self, *args, **options) -> None:
+        search_graph = get_search_graph()
+        cache = search_graph.expansion_cache
+        queries = cache.top_queries(options["top"])
+        if not queries and not cache.log_queries:
+            self.stdout.write(
+                self.style.WARNING("Query logging is off; set EXPANSION_LOG_QUERIES=true to collect queries")
+            )
+        self.stdout.write(f"Pre-warming {len(queries)} historical queries")
+
+        expanded = skipped = failed = 0
+        for query in queries:
+            if not options["refresh"] and cache.get(query, record=False) is not None:
+                skipped += 1
+                continue
+            try:
+                search_graph.expand_query(query, refresh=True, record=False)
+                expanded += 1
+            except Exception as e:
+                logger.error(f"Failed to expand query '{query}': {str(e)}")
+                failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Expanded {expanded} queries ({skipped} already cached, {failed} failed)"
+            )
+        )
@@ -0,0 +1,55 @@
+"""
+Management command to retrain the local chat query router.
+
+Fits the router's naive Bayes classifier on the LLM agent decisions
+logged by the chat graph and reports how many agent calls the router
+has saved. Decisions are only trainable when they were logged with
+``QUERY_ROUTER["LOG_QUERIES"]`` on:
+
+    python manage.py train_query_router
+"""
+
+import json
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rag.router import QueryRouter
+
+
+class Command(BaseCommand):
+    help = "Train the chat query router on logged agent routing decisions"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--log", default=None, help="Decision log (defaults to ROUTER_LOG_PATH)")
+
+    def handle(self, *args, **options) -> None:
+        router = QueryRouter(
+            log_path=options["log"], log_backups=settings.QUERY_ROUTER["LOG_BACKUPS"]
+        )
+        paths = router.log_files()
+        if not paths:
+            raise CommandError(f"No decision log at {router.log_path}")
+        sources = Counter()
+        malformed = 0
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = None
+                    if isinstance(entry, dict):
+                        sources[entry.get("source")] += 1
+                    else:
+                        malformed += 1
+
+        examples = router.train()
+        router.close()
+        self.stdout.write(f"Decisions by source: {dict(sources)}")
+        if malformed:
+            self.stdout.write(self.style.WARNING(f"Skipped {malformed} malformed log lines"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Trained router on {examples} agent decisions -> {router.model_path}")
+        )
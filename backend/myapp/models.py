@@ -86,6 +86,15 @@ class ChatMessage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     metadata = models.JSONField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset paging of a session's most recent messages
+            models.Index(
+                fields=["session", "-created_at", "-id"],
+                name="chatmsg_session_recent_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         """
         Returns a string representation of the message.
@@ -0,0 +1,129 @@
+"""
+Write-behind persistence of chat messages.
+
+Completed turns are queued by the chat consumer and written by one
+background thread per worker process, which batches every queued message
+(across all sessions) into a single ``bulk_create`` on a short interval.
+Remaining messages are flushed when the process exits.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from typing import List, Optional
+
+from django.db import DatabaseError, close_old_connections
+from langchain_core.messages import BaseMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+
+def to_chat_message(session, message: BaseMessage):
+    """Build an unsaved ``ChatMessage`` from a LangChain message."""
+    from .models import ChatMessage
+
+    if isinstance(message, HumanMessage):
+        return ChatMessage(session=session, role="human", content=message.content)
+    return ChatMessage(
+        session=session,
+        role="ai",
+        content=message.content,
+        metadata=message.additional_kwargs.get("metadata") or None,
+    )
+
+
+class MessageWriter:
+    """Batches chat messages from every session into bulk inserts.
+
+    Args:
+        flush_interval: Seconds between flushes of the queue
+        max_batch: Messages written per ``bulk_create`` call
+    """
+
+    def __init__(self, flush_interval: float = 0.5, max_batch: int = 500):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: List = []
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="chat-message-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, session, messages: List[BaseMessage]) -> None:
+        """Queue messages of one session for the next flush."""
+        for message in messages:
+            self._queue.put(to_chat_message(session, message))
+
+    def flush_soon(self) -> None:
+        """Wake the writer without waiting for the interval."""
+        self._wake.set()
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of messages."""
+        from .models import ChatMessage
+
+        with self._flush_lock:
+            written = 0
+            while True:
+                # A batch that failed last time goes first, keeping session order
+                batch, self._pending = self._pending, []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                try:
+                    ChatMessage.objects.bulk_create(batch)
+                    written += len(batch)
+                except DatabaseError as e:
+                    # Retry ahead of newer messages on the next flush rather than drop turns
+                    logger.error(f"Failed to write {len(batch)} chat messages: {str(e)}")
+                    self._pending = batch
+                    return written
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                written = self.flush()
+                if written:
+                    logger.info(f"Wrote {written} chat messages")
+            except Exception as e:
+                logger.error(f"Chat message writer error: {str(e)}")
+            finally:
+                close_old_connections()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the background thread and write anything still queued."""
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        written = self.flush()
+        if written:
+            logger.info(f"Wrote {written} chat messages on shutdown")
+
+
+_writer: Optional[MessageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_message_writer() -> MessageWriter:
+    """Return the worker process's message writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from django.conf import settings
+
+                options = settings.CHAT_PERSISTENCE
+                _writer = MessageWriter(
+                    flush_interval=options["FLUSH_INTERVAL"], max_batch=options["MAX_BATCH"]
+                )
+                atexit.register(_writer.close)
+    return _writer
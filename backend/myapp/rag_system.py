@@ -14,6 +14,9 @@ import asyncio
 from typing import Optional
 import logging
 from pydantic import BaseModel
+from rag.base import CachedEmbeddingsModel
+from rag.cache import ExpansionCache
+from rag.registry import get_registry
 
 logger = logging.getLogger(__name__)
 
@@ -275,7 +278,6 @@ class Generator:
         async for chunk in self.conversational_rag_chain.astream({"input": question}):
             if "answer" in chunk:
                 yield chunk["answer"]
-                await asyncio.sleep(0.1)
 
     def update_chat_history(self, new_chat_history: ChatMessageHistory) -> None:
         """Update chat history for the current session.
@@ -295,19 +297,38 @@ class Search:
     Handles query preprocessing and document retrieval.
     """
 
-    def __init__(self, llm, retriever, prompt_template):
+    def __init__(self, llm, retriever, prompt_template, expansion_cache: Optional[ExpansionCache] = None):
         """Initialize search with models and template.
 
         Args:
             llm: Language model for query expansion
             retriever: Document retriever instance
             prompt_template: Template for query preprocessing
+            expansion_cache: Optional memo of previous query expansions
         """
         self.llm = llm
         self.retriever = retriever
         self.prompt = prompt_template
+        self.expansion_cache = expansion_cache
         self.query_search_chain = self.prompt | self.llm | StrOutputParser()
 
+    def expand(self, question):
+        """Expand a search query, reusing a cached expansion when available.
+
+        Args:
+            question: User search query
+        Returns:
+            str: Expanded query
+        """
+        if self.expansion_cache is not None:
+            cached = self.expansion_cache.get(question)
+            if cached is not None:
+                return cached
+        expanded_query = self.query_search_chain.invoke(question)
+        if self.expansion_cache is not None:
+            self.expansion_cache.set(question, expanded_query)
+        return expanded_query
+
     def invoke(self, question):
         """Process search query and retrieve relevant documents.
 
@@ -320,7 +341,7 @@ class Search:
         """
         # TODO Add relevance scores
         try:
-            expanded_query = self.query_search_chain.invoke(question)
+            expanded_query = self.expand(question)
             docs = self.retriever.invoke(expanded_query)
             results = []
             for doc in docs:
@@ -374,14 +395,18 @@ class RAGSystem:
             load_dotenv()
             self._load_environment_variables()
 
-            self.llm = (model or OpenAIModel()).get_model()
-            self.embeddings = (embeddings or OpenAIEmbeddingsModel()).get_embeddings()
-            self.vector_store = (
+            # Shared with the LangGraph pipelines through the process-wide registry
+            self.registry = get_registry()
+            self.llm = self.registry.acquire_llm(model or OpenAIModel())
+            self.embeddings = self.registry.acquire_embeddings(
+                embeddings or CachedEmbeddingsModel(OpenAIEmbeddingsModel())
+            )
+            self.vector_store = self.registry.acquire_vector_store(
                 vector_store
                 or PineconeVectorStoreModel(
                     index_name="langchain-index", embeddings=self.embeddings
                 )
-            ).get_vector_store()
+            )
             self.retriever = self.vector_store.as_retriever(
                 search_type="similarity", search_kwargs={"k": 6}
             )
@@ -398,7 +423,15 @@ class RAGSystem:
                 chat_history,
             )
 
-            self.search = Search(self.llm, self.retriever, self.query_search_prompt)
+            self.search = Search(
+                self.llm,
+                self.retriever,
+                self.query_search_prompt,
+                ExpansionCache(
+                    prompt_template=self.query_search_prompt.template,
+                    model_name=getattr(self.llm, "model_name", type(self.llm).__name__),
+                ),
+            )
             self._initialized = True
             self.msg = ""
 
@@ -423,7 +456,7 @@ class RAGSystem:
         Args:
             model: New language model instance
         """
-        self.llm = model.get_model()
+        self.llm = self.registry.acquire_llm(model)
         self.generator.llm = self.llm
 
     async def handle_chat_query(self, question):
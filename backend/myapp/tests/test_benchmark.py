@@ -0,0 +1,62 @@
+import asyncio
+import random
+import unittest
+from langchain_core.messages import HumanMessage
+from rag.benchmark import BenchmarkConfig, compare_results, run_benchmarks, summarize
+from rag.fakes import FakeChatModel, FakeVectorStore, FakeEmbeddings, Latency
+
+
+class TestFakes(unittest.TestCase):
+    # Test the fake model streams a deterministic answer and calls bound tools
+    def test_fake_chat_model(self):
+        model = FakeChatModel(answer_tokens=5)
+        first = model.invoke([HumanMessage(content="q")]).content
+        self.assertEqual(first, model.invoke([HumanMessage(content="q")]).content)
+        self.assertEqual(len(first.split()), 5)
+
+        async def stream():
+            return [chunk.content async for chunk in model.astream([HumanMessage(content="q")])]
+
+        self.assertEqual("".join(asyncio.run(stream())).strip(), first)
+
+        def search_documents(query: str) -> str:
+            """Search."""
+            return query
+
+        [call] = model.bind_tools([search_documents]).invoke([HumanMessage(content="EPA")]).tool_calls
+        self.assertEqual((call["name"], call["args"]), ("search_documents", {"query": "EPA"}))
+
+    # Test latency samples are seeded and vector results repeatable
+    def test_deterministic(self):
+        latency = Latency(0.1, 0.05)
+        self.assertEqual(latency.sample(random.Random(1)), latency.sample(random.Random(1)))
+        store = FakeVectorStore(FakeEmbeddings(), num_documents=50)
+        self.assertEqual(store.similarity_search("q", k=3), store.similarity_search("q", k=3))
+
+
+class TestBenchmark(unittest.TestCase):
+    # Test a small zero-latency run reports every level and compares to itself
+    def test_run(self):
+        config = BenchmarkConfig(
+            sessions=(1, 2),
+            turns=1,
+            llm_latency=Latency(),
+            tokens_per_second=0,
+            embedding_latency=Latency(),
+            retrieval_latency=Latency(),
+        )
+        report = run_benchmarks(config)
+
+        chat = report["results"]["chat"]
+        self.assertEqual([level["turns"] for level in chat["levels"]], [1, 2])
+        self.assertEqual(chat["levels"][1]["ttft_ms"]["count"], 2)
+        self.assertEqual(report["results"]["search"]["levels"][1]["queries"], 2)
+        self.assertEqual(len(compare_results(report, report)), 4)
+
+    def test_summarize(self):
+        stats = summarize([float(v) for v in range(1, 101)])
+        self.assertEqual((stats["p50"], stats["max"]), (51.0, 100.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rag.cache import LRUCache, SQLiteCache, CachedEmbeddings, ExpansionCache
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+class TestCaches(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    # Test LRU eviction order and TTL expiry
+    def test_lru_eviction_and_ttl(self):
+        cache = LRUCache(max_entries=2, ttl=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats.evictions, 1)
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("c"))
+
+    # Test disk tier is bounded and survives reopening
+    def test_sqlite_bounded_and_persistent(self):
+        cache = SQLiteCache(self.path, max_entries=10)
+        for i in range(30):
+            cache.set(f"k{i}", b"v")
+        self.assertLessEqual(len(cache), 10)
+
+        reopened = SQLiteCache(self.path, max_entries=10)
+        self.assertEqual(reopened.get("k29"), b"v")
+
+    # Test repeated and re-spaced queries hit the cache
+    def test_cached_embeddings(self):
+        inner = CountingEmbeddings(size=8)
+        embeddings = CachedEmbeddings(inner, model_name="fake", cache_path=self.path)
+
+        first = embeddings.embed_query("Executive Order 14110")
+        second = embeddings.embed_query("  executive   order 14110 ")
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(len(first), len(second))
+
+        # A fresh wrapper reads the vector back from disk
+        cold = CachedEmbeddings(inner, model_name="fake", cache_path=self.path)
+        cold.embed_query("Executive Order 14110")
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(cold.stats()["disk"]["hits"], 1)
+
+        # The async path reads the disk tier too; documents are not cached
+        asyncio.run(CachedEmbeddings(inner, model_name="fake", cache_path=self.path).aembed_query("executive order 14110"))
+        self.assertEqual(inner.calls, 1)
+        embeddings.embed_documents(["Executive Order 14110"])
+        self.assertEqual(len(embeddings.memory), 1)
+
+    # Test expansions are keyed by prompt and model, and lookups are only logged when enabled
+    def test_expansion_cache(self):
+        cache = ExpansionCache("prompt v1", "gpt-4", cache_path=self.path)
+        cache.set("Tariffs on steel", "expanded tariffs")
+        self.assertEqual(cache.get("tariffs on  steel"), "expanded tariffs")
+        cache.get("climate policy")
+        self.assertEqual(cache.top_queries(10), [])
+
+        other_prompt = ExpansionCache("prompt v2", "gpt-4", cache_path=self.path)
+        self.assertIsNone(other_prompt.get("tariffs on steel", record=False))
+
+    # Test logged lookups are batched and the log is trimmed to the most frequent
+    def test_expansion_query_log(self):
+        cache = ExpansionCache(
+            "prompt v1", "gpt-4", cache_path=self.path,
+            log_queries=True, max_logged_queries=2, log_batch_size=3,
+        )
+        cache.get("climate policy")
+        cache.get("Climate  policy")
+        cache.get("tariffs")
+        rows = cache._log.execute("SELECT COUNT(*) FROM query_log").fetchone()[0]
+        self.assertEqual(rows, 0)
+
+        cache.get("budget")
+        cache.get("budget")
+        cache.get("energy")
+        self.assertEqual(cache.top_queries(10), ["budget", "climate policy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
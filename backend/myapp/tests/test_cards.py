@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+from bson import ObjectId
+from rag.cards import CARD_PROJECTION, CardCache, CardStore, RandomCardPool, to_card
+
+
+class FakeCursor(list):
+    async def to_list(self, length=None):
+        return list(self)
+
+
+class FakeCollection:
+    """Records find() calls and applies the projection like MongoDB."""
+
+    def __init__(self, documents):
+        self.documents = {doc["_id"]: doc for doc in documents}
+        self.calls = []
+        self.samples = 0
+        self.category_samples = 0
+
+    def find(self, query, projection=None):
+        ids = query["_id"]["$in"]
+        self.calls.append((ids, projection))
+        return FakeCursor(
+            {"_id": _id, **{k: v for k, v in self.documents[_id].items() if k in projection}}
+            for _id in ids
+            if _id in self.documents
+        )
+
+    def aggregate(self, pipeline):
+        documents = list(self.documents.values())
+        if "$match" in pipeline[0]:
+            category = pipeline.pop(0)["$match"]["category"]
+            documents = [doc for doc in documents if doc.get("category") == category]
+            self.category_samples += 1
+        else:
+            self.samples += 1
+        size = pipeline[0]["$sample"]["size"]
+        projection = pipeline[1]["$project"]
+        return FakeCursor(
+            {"_id": doc["_id"], **{k: v for k, v in doc.items() if k in projection}} for doc in documents[:size]
+        )
+
+
+class FakeStreamRedis:
+    """The Redis stream commands CardCache uses, with MAXLEN trimming."""
+
+    def __init__(self):
+        self.entries = []
+        self.next_id = 1
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        entry_id = f"{self.next_id}-0".encode()
+        self.next_id += 1
+        self.entries.append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        self.entries = self.entries[-maxlen:]
+        return entry_id
+
+    def xrange(self, key, count=None):
+        return self.entries[:count]
+
+    def xrevrange(self, key, count=None):
+        return self.entries[::-1][:count]
+
+    def xread(self, streams):
+        [(key, last_id)] = streams.items()
+        after = [entry for entry in self.entries if int(entry[0].split(b"-")[0]) > int(last_id.split(b"-")[0])]
+        return [[key, after]] if after else []
+
+
+class TestCardStore(unittest.TestCase):
+    def setUp(self):
+        self.ids = [ObjectId() for _ in range(3)]
+        self.collection = FakeCollection(
+            [{"_id": _id, "title": f"Doc {i}", "content": "x" * 10_000, "summary": "s"} for i, _id in enumerate(self.ids)]
+        )
+        self.store = CardStore(CardCache(max_entries=10, ttl=60))
+        patcher = mock.patch.multiple(
+            "rag.cards",
+            get_collection=lambda *args: self.collection,
+            get_async_collection=lambda *args: self.collection,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    # Test cards keep request order, skip unknown ids and never load content
+    def test_projection_and_order(self):
+        unknown = ObjectId()
+        cards = self.store.get_cards([self.ids[2], unknown, self.ids[0]])
+        self.assertEqual([c["title"] for c in cards], ["Doc 2", "Doc 0"])
+        self.assertEqual(self.collection.calls[0][1], CARD_PROJECTION)
+        self.assertNotIn("content", cards[0])
+        self.assertEqual(cards[0]["category"], "Uncategorized")
+
+    # Test cached cards are not fetched again, sync or async
+    def test_cache_hits(self):
+        self.store.get_cards(self.ids[:2])
+        cards = asyncio.run(self.store.aget_cards(self.ids))
+        self.assertEqual(len(cards), 3)
+        self.assertEqual([len(ids) for ids, _ in self.collection.calls], [2, 1])
+
+    # Test invalidation and TTL force a refetch
+    def test_invalidation(self):
+        self.store.get_cards(self.ids)
+        self.store.cache.invalidate([self.ids[0]])
+        self.store.get_cards(self.ids)
+        self.assertEqual(self.collection.calls[-1][0], [self.ids[0]])
+
+        expiring = CardStore(CardCache(ttl=0.01))
+        expiring.get_cards(self.ids[:1])
+        time.sleep(0.02)
+        expiring.get_cards(self.ids[:1])
+        self.assertEqual(len(self.collection.calls), 4)
+
+    # Test another process's invalidation drops only the changed cards
+    def test_invalidation_across_processes(self):
+        redis_client = FakeStreamRedis()
+        worker, etl = CardCache(sync_interval=0), CardCache(max_invalidations=3)
+        worker.client = etl.client = redis_client
+        store = CardStore(worker)
+        store.get_cards(self.ids)
+
+        etl.invalidate([self.ids[0]])
+        store.get_cards(self.ids)
+        self.assertEqual(self.collection.calls[-1][0], [self.ids[0]])
+        self.assertEqual(len(worker.lru), 3)
+
+        # Falling behind the capped stream clears everything
+        for _ in range(4):
+            etl.invalidate([self.ids[1]])
+        store.get_cards(self.ids)
+        self.assertEqual(self.collection.calls[-1][0], self.ids)
+
+    def test_to_card_defaults(self):
+        _id = ObjectId()
+        self.assertEqual(to_card({"_id": _id})["title"], "Untitled")
+
+    # Test dates become the same JSON string wherever the card is stored
+    def test_to_card_dates(self):
+        card = to_card({"_id": ObjectId(), "date_posted": datetime(2025, 1, 20, 12, 30)})
+        self.assertEqual(card["date_posted"], "2025-01-20T12:30:00")
+        self.assertEqual(json.loads(json.dumps(card)), card)
+
+
+class TestRandomCardPool(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeCollection(
+            [{"_id": ObjectId(), "title": f"Doc {i}", "category": "Briefing" if i % 2 else "Statement"} for i in range(20)]
+        )
+        patcher = mock.patch.multiple(
+            "rag.cards",
+            get_collection=lambda *args: self.collection,
+            get_async_collection=lambda *args: self.collection,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = RandomCardPool(pool_size=10, refresh_interval=60)
+        self.addCleanup(self.pool.close)
+
+    # Test selections come from one pool draw, filtered by category
+    def test_sample(self):
+        cards = self.pool.sample(4)
+        self.assertEqual(len(cards), 4)
+        self.assertEqual(len({card["id"] for card in cards}), 4)
+        statements = asyncio.run(self.pool.asample(5, category="Statement"))
+        self.assertEqual(len(statements), 5)
+        self.assertTrue(all(card["category"] == "Statement" for card in statements))
+        self.assertEqual(self.collection.samples, 1)
+        self.assertEqual(self.collection.category_samples, 0)
+        self.assertEqual(len(self.pool), 10)
+
+    # Test a category the pool is short of is drawn from MongoDB, once per interval
+    def test_category_fallback(self):
+        for _ in range(8):
+            _id = ObjectId()
+            self.collection.documents[_id] = {"_id": _id, "title": "Post", "category": "Blog"}
+
+        blogs = self.pool.sample(6, category="Blog")
+        self.assertEqual(len(blogs), 6)
+        self.assertTrue(all(card["category"] == "Blog" for card in blogs))
+        self.assertEqual(len(asyncio.run(self.pool.asample(8, category="Blog"))), 8)
+        self.assertEqual(len(self.pool.sample(10, category="Statement")), 10)
+        self.assertEqual(self.pool.sample(3, category="Unknown"), [])
+        self.assertEqual(self.pool.sample(3, category="Unknown"), [])
+        self.assertEqual(self.collection.category_samples, 3)
+
+    # Test the background thread redraws the pool on its interval
+    def test_background_refresh(self):
+        pool = RandomCardPool(pool_size=10, refresh_interval=0.01)
+        self.addCleanup(pool.close)
+        pool.sample()
+        deadline = time.monotonic() + 2
+        while self.collection.samples < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(self.collection.samples, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+from rag.base import RetrievalResult
+from rag.chat_graph import ChatGraph, get_retriever_tool
+from rag.router import DIRECT_RESPONSE, QueryRouter
+from rag.speculative import SpeculativeRetrieval, query_similarity
+
+
+class FakeGrader:
+    """Grades chunks containing 'relevant'; records which chunks were graded."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.graded = []
+
+    async def ainvoke(self, inputs):
+        content = inputs["context"]
+        await asyncio.sleep(self.delays.get(content, 0))
+        self.graded.append(content)
+        return SimpleNamespace(binary_score="yes" if content.startswith("relevant") else "no")
+
+
+def make_graph(grader, min_relevant_docs=3):
+    # Exercise the grading nodes without building models or the workflow
+    graph = object.__new__(ChatGraph)
+    graph.grader_chain = grader
+    graph.min_relevant_docs = min_relevant_docs
+    graph.max_retrieval_attempts = 3
+    return graph
+
+
+def make_state(contents, attempts=1):
+    documents = [Document(page_content=c, metadata={"id": str(i)}) for i, c in enumerate(contents)]
+    return {
+        "messages": [HumanMessage(content="question"), AIMessage(content="question")],
+        "retrieved": RetrievalResult(documents, [1.0] * len(documents)),
+        "retrieval_attempts": attempts,
+    }
+
+
+class FakeRetriever:
+    async def aretrieve(self, query):
+        docs = [Document(page_content="It's the EPA's rule", metadata={"id": "epa"})]
+        return RetrievalResult(docs, [0.9])
+
+
+class TestChatGraphGrading(unittest.TestCase):
+    # Test only relevant chunks move forward, in retrieval order
+    def test_keeps_relevant_chunks(self):
+        graph = make_graph(FakeGrader(delays={"relevant b": 0.01}))
+        state = make_state(["relevant b", "noise", "relevant a's"])
+        update = asyncio.run(graph._grade_documents(state))
+
+        self.assertEqual([d.metadata["id"] for d in update["relevant_docs"]], ["0", "2"])
+        self.assertEqual(graph._route_graded({**state, **update}), "generate")
+
+    # Test grading stops once enough relevant chunks are found
+    def test_early_exit(self):
+        contents = ["relevant 1", "relevant 2", "slow 1", "slow 2"]
+        grader = FakeGrader(delays={"slow 1": 1, "slow 2": 1})
+        graph = make_graph(grader, min_relevant_docs=2)
+        update = asyncio.run(graph._grade_documents(make_state(contents)))
+
+        self.assertEqual(len(update["relevant_docs"]), 2)
+        self.assertNotIn("slow 1", grader.graded)
+
+    # Test routing when nothing is relevant
+    def test_routes_without_relevant_chunks(self):
+        graph = make_graph(FakeGrader())
+        state = make_state(["noise"])
+        update = asyncio.run(graph._grade_documents(state))
+
+        self.assertEqual(graph._route_graded({**state, **update}), "rewrite")
+        self.assertEqual(
+            graph._route_graded({**state, **update, "retrieval_attempts": 2}), "direct_response"
+        )
+
+
+class TestRetrieverToolArtifact(unittest.TestCase):
+    # Test the tool message carries the typed result, apostrophes intact
+    def test_artifact_on_tool_message(self):
+        tool = get_retriever_tool(FakeRetriever(), "search_documents", "Search")
+        message = asyncio.run(
+            tool.ainvoke(
+                {"name": "search_documents", "args": {"query": "epa"}, "id": "1", "type": "tool_call"}
+            )
+        )
+
+        self.assertEqual(message.content, "It's the EPA's rule")
+        self.assertEqual(message.artifact.ids, ["epa"])
+        self.assertEqual(message.artifact.scores, [0.9])
+
+
+class TestSpeculativeRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    async def retrieve(self, query):
+        self.calls.append(query)
+        await asyncio.sleep(0.01)
+        return RetrievalResult([Document(page_content=query, metadata={"id": query})], [1.0])
+
+    def agent_state(self, query):
+        call = {"name": "search_documents", "args": {"query": query}, "id": "call-1"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])], "retrieval_attempts": 0}
+
+    # Test a matching agent query reuses the speculative result without a second search
+    def test_reused_when_similar(self):
+        async def run():
+            graph = object.__new__(ChatGraph)
+            speculative = SpeculativeRetrieval("EPA clean water rule", self.retrieve).start()
+            config = {"configurable": {"speculative_retrieval": speculative}}
+            return await graph._retrieve(self.agent_state("the EPA clean water rule"), config)
+
+        update = asyncio.run(run())
+        self.assertEqual(self.calls, ["EPA clean water rule"])
+        self.assertEqual(update["retrieved"].ids, ["EPA clean water rule"])
+        self.assertEqual(update["messages"][0].tool_call_id, "call-1")
+        self.assertEqual(update["retrieval_attempts"], 1)
+
+    # Test a reformulated query cancels the speculative task
+    def test_cancelled_when_different(self):
+        async def run():
+            speculative = SpeculativeRetrieval("what about that", self.retrieve).start()
+            task = speculative._task
+            result = await speculative.take("tariffs on Chinese steel imports")
+            await asyncio.sleep(0)
+            return result, task
+
+        result, task = asyncio.run(run())
+        self.assertIsNone(result)
+        self.assertTrue(task.cancelled())
+        self.assertLess(query_similarity("what about that", "tariffs on steel"), 0.6)
+
+    # Test routing to a direct response cancels the speculative task from the node's thread
+    def test_cancelled_on_direct_response(self):
+        async def run(directory):
+            graph = object.__new__(ChatGraph)
+            graph.router = QueryRouter(log_path=os.path.join(directory, "log.jsonl"))
+            speculative = SpeculativeRetrieval("hi there", self.retrieve).start()
+            task = speculative._task
+            config = {"configurable": {"speculative_retrieval": speculative}}
+            state = {"messages": [HumanMessage(content="hi there"), AIMessage(content="hi there")]}
+            update = await asyncio.to_thread(graph._route, state, config)
+            await asyncio.sleep(0)
+            graph.router.close()
+            return update, task, graph.router.is_small_talk("hi, what is EO 14110?")
+
+        with tempfile.TemporaryDirectory() as directory:
+            update, task, small_talk = asyncio.run(run(directory))
+        self.assertEqual(update, {"routed_to": DIRECT_RESPONSE})
+        self.assertTrue(task.cancelled())
+        self.assertFalse(small_talk)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+from unittest import mock
+from channels.routing import URLRouter
+from django.conf import settings
+from django.test import TransactionTestCase
+from django.urls import re_path
+from rag.benchmark import BenchmarkConfig, build_fake_graph
+from rag.chat_graph import ChatGraph
+from rag.fakes import Latency, mark_environment_offline
+from rag.router import QueryRouter
+from ..consumers import ChatConsumer
+from ..history import ChatHistoryLoader
+from ..loadtest import WebSocketClient, create_load_test_fixtures
+from ..middleware import TokenAuthMiddleware
+from ..models import ChatMessage, ChatSession
+
+
+class RecordingConsumer(ChatConsumer):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingConsumer.instances.append(self)
+
+
+class TestConsumerHistory(TransactionTestCase):
+    def setUp(self):
+        mark_environment_offline()
+        self.directory = tempfile.TemporaryDirectory()
+        config = BenchmarkConfig(llm_latency=Latency(), tokens_per_second=0, answer_tokens=5)
+        router = QueryRouter(log_path=os.path.join(self.directory.name, "router.jsonl"))
+        self.addCleanup(router.close)
+        build_fake_graph(ChatGraph, config, offline_latency=True, router=router)
+        RecordingConsumer.instances = []
+        self.application = TokenAuthMiddleware(
+            URLRouter([re_path(r"^ws/chat/(?P<session_id>[\w-]+)/$", RecordingConsumer.as_asgi())])
+        )
+        [(self.token, self.session_id)] = create_load_test_fixtures(connections=1, users=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def connect_client(self):
+        return WebSocketClient(self.application, f"/ws/chat/{self.session_id}/?token={self.token}")
+
+    # Test the default initial page fills the history window with one load
+    def test_default_window_single_load(self):
+        session = ChatSession.objects.get(session_id=self.session_id)
+        ChatMessage.objects.bulk_create(
+            [ChatMessage(session=session, role="human" if i % 2 == 0 else "ai", content=f"m{i}") for i in range(20)]
+        )
+
+        async def run():
+            client = self.connect_client()
+            self.assertEqual(await client.connect(), (True, None))
+            await client.send_json({"message": "What did the EPA announce?"})
+            while (await client.receive_json(timeout=5))["type"] != "complete":
+                pass
+            await client.disconnect()
+
+        asyncio.run(run())
+        [consumer] = RecordingConsumer.instances
+        stats = consumer.history_loader.stats
+        self.assertEqual((stats.loads, stats.messages), (1, settings.CHAT_HISTORY["INITIAL_MESSAGES"]))
+        self.assertEqual(consumer.chat_context.chat_history.messages[0].content, "m12")
+
+    # Test a client leaving before its history loads cancels the load
+    def test_disconnect_cancels_history_load(self):
+        started = asyncio.Event()
+
+        async def slow_latest(loader):
+            started.set()
+            await asyncio.sleep(60)
+
+        async def run():
+            client = self.connect_client()
+            self.assertEqual(await client.connect(), (True, None))
+            await asyncio.wait_for(started.wait(), 5)
+            await client.disconnect()
+            # Checked before asyncio.run cancels leftover tasks itself
+            [consumer] = RecordingConsumer.instances
+            self.assertTrue(consumer.history_ready.cancelled())
+
+        with mock.patch.object(ChatHistoryLoader, "latest", slow_latest):
+            asyncio.run(run())
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from rag.chat_graph import ChatContext, ChatGraph
+from rag.history import HistoryManager
+
+
+def make_context(turns):
+    context = ChatContext(session_id="s")
+    for i in range(turns):
+        context.chat_history.add_user_message(f"question {i}")
+        context.chat_history.add_ai_message(f"answer {i}")
+    return context
+
+
+def count_words(text):
+    return len(text.split())
+
+
+class TestHistoryManager(unittest.TestCase):
+    def make_manager(self, responses=("summary",), **kwargs):
+        llm = FakeListChatModel(responses=list(responses))
+        return HistoryManager(llm, max_recent_turns=2, count_tokens=count_words, **kwargs)
+
+    # Test the window keeps only the most recent turns
+    def test_window_recent_turns(self):
+        window = self.make_manager().window(make_context(5))
+        self.assertNotIn("question 2", window)
+        self.assertIn("Human: question 3", window)
+        self.assertTrue(window.endswith("AI: answer 4"))
+
+    # Test the token budget trims from the oldest side
+    def test_window_token_budget(self):
+        window = self.make_manager(token_budget=7).window(make_context(5))
+        self.assertEqual(window, "Human: question 4\nAI: answer 4")
+
+    # Test older turns are folded into the summary in the background
+    def test_summary_update(self):
+        manager = self.make_manager(responses=["user asked about 0 to 2"])
+        context = make_context(5)
+
+        async def run():
+            manager.schedule_update(context)
+            await context.summary_task
+
+        asyncio.run(run())
+        self.assertEqual((context.summary, context.summarized_count), ("user asked about 0 to 2", 6))
+        window = manager.window(context)
+        self.assertTrue(window.startswith("Summary of the earlier conversation: user asked about 0 to 2"))
+        self.assertNotIn("question 2", window)
+
+        # Nothing new left the window, so no further model call is scheduled
+        context.summary_task = None
+        manager.schedule_update(context)
+        self.assertIsNone(context.summary_task)
+
+
+class FakeLoader:
+    def __init__(self, messages):
+        self.messages = messages
+        self.requests = []
+
+    @property
+    def has_more(self):
+        return bool(self.messages)
+
+    async def older(self, limit):
+        self.requests.append(limit)
+        page, self.messages = self.messages[-limit:], self.messages[:-limit]
+        return page
+
+
+class TestOnDemandHistory(unittest.TestCase):
+    # Test older turns are loaded only to fill the window
+    def test_loads_missing_turns(self):
+        stored = make_context(4).chat_history.messages
+        context = ChatContext(history_loader=FakeLoader(stored[:-2]))
+        context.chat_history.messages.extend(stored[-2:])
+        manager = HistoryManager(FakeListChatModel(responses=["x"]), max_recent_turns=2)
+
+        asyncio.run(manager.ensure_history(context))
+        self.assertEqual(context.history_loader.requests, [2])
+        self.assertEqual([m.content for m in context.chat_history.messages][0], "question 2")
+
+        # A full window needs no further loads
+        asyncio.run(manager.ensure_history(context))
+        self.assertEqual(context.history_loader.requests, [2])
+
+
+class TestChatGraphHistory(unittest.TestCase):
+    # Test the first question skips the reformulation call
+    def test_empty_history_passthrough(self):
+        graph = object.__new__(ChatGraph)
+        graph.history_manager = HistoryManager(FakeListChatModel(responses=["x"]))
+        state = graph._initial_state("What is EO 14067?", ChatContext())
+        self.assertEqual(state["chat_history"], "")
+
+        update = asyncio.run(graph._history(state))
+        self.assertEqual(update["messages"][0].content, "What is EO 14067?")
+
+
+if __name__ == "__main__":
+    unittest.main()
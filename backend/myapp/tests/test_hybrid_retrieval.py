@@ -0,0 +1,79 @@
+import asyncio
+import tempfile
+import unittest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rag.base import HybridRetriever, reciprocal_rank_fusion
+from rag.lexical import BM25Index, tokenize
+from rag.local_store import LocalVectorStore
+
+CHUNKS = [
+    Document(page_content="Executive Order 14067 on digital assets", metadata={"id": "eo"}),
+    Document(page_content="H.R. 5376 Inflation Reduction Act passes", metadata={"id": "hr"}),
+    Document(page_content="EPA announces clean water grants", metadata={"id": "epa"}),
+    Document(page_content="Remarks on cryptocurrency and financial stability", metadata={"id": "crypto"}),
+]
+
+
+class TopicEmbeddings(Embeddings):
+    """Embeds by topic words only, so identifiers are invisible to dense search."""
+
+    TOPICS = ("crypto", "inflation", "water", "digital")
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0 if topic in text.lower() else 0.05 for topic in self.TOPICS]
+
+
+class TestHybridRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = BM25Index.build(f"{self.directory.name}/bm25", CHUNKS)
+        self.store = LocalVectorStore.from_texts(
+            [c.page_content for c in CHUNKS],
+            TopicEmbeddings(),
+            [c.metadata for c in CHUNKS],
+            path=f"{self.directory.name}/vectors",
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Test identifiers survive tokenization
+    def test_tokenize_identifiers(self):
+        tokens = tokenize("Executive Order 14067 and H.R. 5376, COVID-19")
+        for token in ("14067", "h.r", "5376", "covid-19", "covid"):
+            self.assertIn(token, tokens)
+
+    # Test BM25 finds exact identifier matches
+    def test_bm25_exact_match(self):
+        [(doc, score)] = self.index.search("order 14067", k=1)
+        self.assertEqual(doc.metadata["id"], "eo")
+        self.assertGreater(score, 0)
+        self.assertEqual(self.index.search("nonexistent", k=3), [])
+
+    # Test fusion rewards documents ranked by both lists
+    def test_reciprocal_rank_fusion(self):
+        a, b, c = CHUNKS[:3]
+        fused = reciprocal_rank_fusion([[a, b], [b, c]], k=3)
+        self.assertEqual([d.metadata["id"] for d, _ in fused], ["hr", "eo", "epa"])
+        self.assertGreater(fused[0][1], fused[1][1])
+
+    # Test the hybrid retriever surfaces the identifier match dense search misses
+    def test_hybrid_retriever(self):
+        retriever = HybridRetriever(vector_store=self.store, lexical_index=self.index, k=2, fetch_k=2)
+        query = "what does H.R. 5376 say about crypto"
+
+        dense_ids = [d.metadata["id"] for d in self.store.similarity_search(query, k=2)]
+        self.assertNotIn("hr", dense_ids)
+
+        sync_ids = [d.metadata["id"] for d in retriever.invoke(query)]
+        async_ids = [d.metadata["id"] for d in asyncio.run(retriever.ainvoke(query))]
+        self.assertIn("hr", sync_ids)
+        self.assertEqual(sync_ids, async_ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
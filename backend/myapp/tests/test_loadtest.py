@@ -0,0 +1,42 @@
+import asyncio
+import os
+import tempfile
+from channels.routing import URLRouter
+from django.test import TransactionTestCase
+from rag.benchmark import BenchmarkConfig, build_fake_graph
+from rag.chat_graph import ChatGraph
+from rag.fakes import Latency, mark_environment_offline
+from rag.router import QueryRouter
+from .. import routing
+from ..loadtest import create_load_test_fixtures, run_load_test
+from ..middleware import TokenAuthMiddleware
+from ..models import ChatSession
+
+
+class TestLoadTest(TransactionTestCase):
+    def setUp(self):
+        mark_environment_offline()
+        self.directory = tempfile.TemporaryDirectory()
+        config = BenchmarkConfig(llm_latency=Latency(), tokens_per_second=0, answer_tokens=5)
+        router = QueryRouter(log_path=os.path.join(self.directory.name, "router.jsonl"))
+        build_fake_graph(ChatGraph, config, offline_latency=True, router=router)
+        self.application = TokenAuthMiddleware(URLRouter(routing.websocket_urlpatterns))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Test authenticated sockets connect, stream and complete every turn
+    def test_run(self):
+        credentials = create_load_test_fixtures(connections=5, users=2)
+        self.assertEqual(ChatSession.objects.count(), 5)
+
+        result = asyncio.run(run_load_test(self.application, credentials, messages_per_connection=2))
+        self.assertEqual((result.connections, result.failed_connections, result.errors), (5, 0, 0))
+        self.assertEqual(len(result.turn_ms), 10)
+        self.assertGreater(len(result.frame_ms), len(result.turn_ms))
+
+    # Test a bad token is rejected by the auth middleware
+    def test_rejects_bad_token(self):
+        [(_, session_id)] = create_load_test_fixtures(connections=1, users=1)
+        result = asyncio.run(run_load_test(self.application, [("bad-token", session_id)]))
+        self.assertEqual((result.connections, result.failed_connections), (0, 1))
@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from langchain_core.embeddings import Embeddings
+from rag.local_store import LocalVectorStore
+
+TEXTS = ["tariffs on steel", "student loan forgiveness", "climate executive order", "farm bill"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per known text, so the nearest neighbour is predictable."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0 if word in text else 0.1 for word in ("tariffs", "loan", "climate", "farm")]
+
+
+class TestLocalVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.metadatas = [{"id": str(i)} for i in range(len(TEXTS))]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self, **kwargs):
+        return LocalVectorStore.from_texts(
+            TEXTS, KeywordEmbeddings(), self.metadatas, path=self.directory.name, **kwargs
+        )
+
+    # Test exact search returns the closest chunk with its metadata
+    def test_exact_search(self):
+        store = self.build()
+        [(doc, score)] = store.similarity_search_with_score("student loan", k=1)
+        self.assertEqual(doc.page_content, "student loan forgiveness")
+        self.assertEqual(doc.metadata, {"id": "1"})
+        self.assertGreater(score, 0.9)
+
+    # Test a reopened index serves the same results from the mapped files
+    def test_reopen(self):
+        self.build(quantize_vectors=True)
+        store = LocalVectorStore(self.directory.name, KeywordEmbeddings(), quantized=True)
+        self.assertEqual(len(store), len(TEXTS))
+        self.assertEqual(store.similarity_search("farm", k=1)[0].metadata["id"], "3")
+
+    # Test IVF search and blocked exact search agree on the top hit
+    def test_ivf_and_blocks(self):
+        self.build(ivf_lists=2)
+        ivf = LocalVectorStore(self.directory.name, KeywordEmbeddings(), nprobe=2)
+        blocked = LocalVectorStore(self.directory.name, KeywordEmbeddings(), nprobe=0, block_size=1)
+
+        for query in ("climate", "tariffs"):
+            self.assertEqual(
+                ivf.similarity_search(query, k=1)[0].page_content,
+                blocked.similarity_search(query, k=1)[0].page_content,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from typing import TypedDict
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.graph import END, START, StateGraph
+import httpx
+from langchain_core.runnables import RunnableLambda
+from openai import DefaultHttpxClient, OpenAI
+from rag.metrics import (
+    LLM_RETRIES,
+    LLM_TOKENS,
+    NODE_DURATION,
+    NODE_ERRORS,
+    MetricsRegistry,
+    TokenUsageCallback,
+    count_openai_retry,
+    instrument_node,
+)
+
+
+class State(TypedDict):
+    value: str
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    # Test histograms render cumulative Prometheus buckets
+    def test_render(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency.", ("node",), buckets=(0.1, 1.0))
+        counter = registry.counter("calls_total", "Calls.", ("node",))
+        histogram.observe(0.05, node="a")
+        histogram.observe(0.5, node="a")
+        counter.inc(node='say "hi"')
+
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{node="a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{node="a",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{node="a",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_count{node="a"} 2', text)
+        self.assertIn('calls_total{node="say \\"hi\\""} 1', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+
+
+class TestInstrumentNode(unittest.TestCase):
+    # Test wrapped nodes still receive the run config and are timed
+    def test_graph_node(self):
+        async def node(state, config):
+            return {"value": config["configurable"]["value"]}
+
+        workflow = StateGraph(State)
+        workflow.add_node("node", instrument_node("test", "node", node))
+        workflow.add_edge(START, "node")
+        workflow.add_edge("node", END)
+        before = NODE_DURATION.snapshot(graph="test", node="node")["count"]
+
+        result = asyncio.run(
+            workflow.compile().ainvoke({"value": ""}, {"configurable": {"value": "configured"}})
+        )
+        self.assertEqual(result["value"], "configured")
+        self.assertEqual(NODE_DURATION.snapshot(graph="test", node="node")["count"], before + 1)
+
+    # Test failures are counted and re-raised
+    def test_errors(self):
+        def failing(state):
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            instrument_node("test", "failing", failing)({})
+        self.assertEqual(NODE_ERRORS.value(graph="test", node="failing"), 1)
+
+
+class TestTokenUsageCallback(unittest.TestCase):
+    # Test token usage is attributed to the calling node
+    def test_usage_by_node(self):
+        callback = TokenUsageCallback()
+        message = AIMessage(
+            content="hi", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}
+        )
+        callback.on_chat_model_start({}, [], run_id="run", metadata={"langgraph_node": "unit"})
+        callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id="run")
+
+        self.assertEqual(LLM_TOKENS.value(node="unit", direction="input"), 7)
+        self.assertEqual(LLM_TOKENS.value(node="unit", direction="output"), 3)
+
+
+class TestOpenAIRetries(unittest.TestCase):
+    # Test the OpenAI client's internal retries are counted for the calling node
+    def test_client_retries(self):
+        responses = iter(
+            [
+                httpx.Response(429, headers={"retry-after-ms": "1"}),
+                httpx.Response(200, json={"object": "list", "data": []}),
+            ]
+        )
+        client = OpenAI(
+            api_key="test",
+            base_url="http://openai.test/v1",
+            max_retries=2,
+            http_client=DefaultHttpxClient(
+                transport=httpx.MockTransport(lambda request: next(responses)),
+                event_hooks={"request": [count_openai_retry]},
+            ),
+        )
+        call = RunnableLambda(lambda _: client.models.list())
+        call.invoke(None, {"metadata": {"langgraph_node": "retrying"}})
+        self.assertEqual(LLM_RETRIES.value(node="retrying"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
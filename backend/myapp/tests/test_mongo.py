@@ -0,0 +1,66 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+from rag.metrics import MONGO_POOL_CHECKOUT_WAIT, MONGO_POOL_CONNECTIONS
+from rag.mongo import MongoClientManager, MongoSettings, PoolMetricsListener
+
+
+class TestMongoSettings(unittest.TestCase):
+    # Test pool options come from the environment
+    @mock.patch.dict(
+        os.environ,
+        {"MONGO_CONNECTION_STRING": "mongodb://db:27017", "MONGO_MAX_POOL_SIZE": "20", "MONGO_READ_PREFERENCE": "secondaryPreferred"},
+    )
+    def test_from_env(self):
+        settings = MongoSettings.from_env()
+        options = settings.client_options()
+        self.assertEqual((settings.uri, options["maxPoolSize"]), ("mongodb://db:27017", 20))
+        self.assertEqual(options["readPreference"], "secondaryPreferred")
+
+    @mock.patch.dict(os.environ, {}, clear=True)
+    def test_missing_uri(self):
+        with self.assertRaises(ValueError):
+            MongoSettings.from_env()
+
+
+class TestMongoClientManager(unittest.TestCase):
+    def setUp(self):
+        # Clients connect lazily, so no server is needed
+        self.manager = MongoClientManager(MongoSettings("mongodb://127.0.0.1:1", max_pool_size=7))
+
+    def tearDown(self):
+        self.manager.close()
+
+    # Test every caller gets the same configured client
+    def test_shared_client(self):
+        client = self.manager.client()
+        self.assertIs(self.manager.client(), client)
+        self.assertEqual(client.options.pool_options.max_pool_size, 7)
+        self.assertEqual(self.manager.collection("WTP", "whbriefingroom").full_name, "WTP.whbriefingroom")
+
+    # Test Motor clients are shared within a loop and separate across loops
+    def test_async_client_per_loop(self):
+        async def clients():
+            return self.manager.async_client(), self.manager.async_client()
+
+        first, again = asyncio.run(clients())
+        second, _ = asyncio.run(clients())
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+
+    # Test pool events update the pool metrics
+    def test_pool_metrics(self):
+        listener = PoolMetricsListener("test")
+        event = mock.Mock(duration=0.02)
+        listener.connection_created(event)
+        listener.connection_checked_out(event)
+        self.assertEqual(MONGO_POOL_CONNECTIONS.value(client="test", state="in_use"), 1)
+        listener.connection_checked_in(event)
+        self.assertEqual(MONGO_POOL_CONNECTIONS.value(client="test", state="in_use"), 0)
+        self.assertEqual(MONGO_POOL_CONNECTIONS.value(client="test", state="open"), 1)
+        self.assertEqual(MONGO_POOL_CHECKOUT_WAIT.snapshot(client="test")["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from pymongo.errors import OperationFailure
+from rag.mongo_indexes import ACCESS_PATHS, INDEXES, ensure_index, ensure_indexes, summarize_plan
+
+
+class FakeCollection:
+    """Keeps index_information() entries the way pymongo reports them."""
+
+    def __init__(self, duplicates=False):
+        self.indexes = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        self.duplicates = duplicates
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def create_index(self, keys, name, unique=False, partialFilterExpression=None):
+        if unique and self.duplicates:
+            raise OperationFailure("E11000 duplicate key error", 11000, {"errmsg": "E11000 duplicate key error"})
+        info = {"key": [(key, float(direction)) for key, direction in keys], "v": 2}
+        if unique:
+            info["unique"] = True
+        if partialFilterExpression is not None:
+            info["partialFilterExpression"] = partialFilterExpression
+        self.indexes[name] = info
+        return name
+
+
+def plan(*stages, index=None):
+    """Nested classic plan with ``stages`` from the root down."""
+    node = {"stage": stages[-1]}
+    if index:
+        node["indexName"] = index
+    for stage in reversed(stages[:-1]):
+        node = {"stage": stage, "inputStage": node}
+    return {"queryPlanner": {"winningPlan": node}}
+
+
+class TestEnsureIndexes(unittest.TestCase):
+    def setUp(self):
+        self.collections = {}
+
+    def getter(self, db_name, collection_name):
+        return self.collections.setdefault((db_name, collection_name), FakeCollection())
+
+    # Test missing indexes are created once and then verified
+    def test_create_then_exists(self):
+        self.assertEqual([r.status for r in ensure_indexes(create=False, collection_getter=self.getter)], ["missing"] * len(INDEXES))
+        self.assertEqual([r.status for r in ensure_indexes(collection_getter=self.getter)], ["created"] * len(INDEXES))
+        self.assertEqual([r.status for r in ensure_indexes(collection_getter=self.getter)], ["exists"] * len(INDEXES))
+        info = self.collections[("WTP", "whbriefingroom")].indexes["content_summary_id"]
+        self.assertEqual(info["partialFilterExpression"], {"content": {"$exists": True}})
+
+    # Test differing options and duplicate keys are reported, not fixed
+    def test_conflict_and_error(self):
+        spec = INDEXES[0]
+        collection = self.getter(spec.db_name, spec.collection_name)
+        collection.indexes[spec.name] = {"key": [("url", 1)], "v": 2}
+        self.assertEqual(ensure_index(spec, collection_getter=self.getter).status, "conflict")
+
+        collection.indexes = {"url_1": {"key": [("url", 1)], "unique": True, "v": 2}}
+        result = ensure_index(spec, collection_getter=self.getter)
+        self.assertEqual(result.status, "conflict")
+        self.assertIn("url_1", result.detail)
+
+        self.collections[("WTP", "whbriefingroom")] = FakeCollection(duplicates=True)
+        result = ensure_index(spec, collection_getter=self.getter)
+        self.assertEqual(result.status, "error")
+        self.assertIn("duplicate", result.detail)
+
+
+class TestSummarizePlan(unittest.TestCase):
+    def test_statuses(self):
+        upsert, summarizer, *_ = ACCESS_PATHS
+        self.assertEqual(summarize_plan(upsert, plan("FETCH", "IXSCAN", index="url_unique")).status, "ok")
+        self.assertEqual(summarize_plan(upsert, plan("COLLSCAN")).status, "collscan")
+        self.assertEqual(summarize_plan(upsert, plan("EOF")).status, "empty")
+        self.assertEqual(summarize_plan(summarizer, plan("LIMIT", "FETCH", "IXSCAN", index="_id_")).status, "wrong_index")
+        report = summarize_plan(summarizer, plan("SORT", "FETCH", "IXSCAN", index="content_summary_id"))
+        self.assertEqual(report.status, "blocking_sort")
+        self.assertEqual(report.stages, ["SORT", "FETCH", "IXSCAN"])
+
+        # MongoDB 7+ slot-based plans nest the classic plan under queryPlan
+        sbe = {"queryPlanner": {"winningPlan": {"queryPlan": plan("FETCH", "IXSCAN", index="url_unique")["queryPlanner"]["winningPlan"]}}}
+        self.assertEqual(summarize_plan(upsert, sbe).status, "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
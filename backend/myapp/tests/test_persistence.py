@@ -0,0 +1,47 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TransactionTestCase
+from langchain_core.messages import AIMessage, HumanMessage
+from ..models import ChatMessage, ChatSession
+from ..persistence import MessageWriter
+
+
+class TestMessageWriter(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.sessions = [ChatSession.objects.create(user=self.user) for _ in range(2)]
+        self.writer = MessageWriter(flush_interval=60)
+
+    def tearDown(self):
+        self.writer.close()
+
+    # Test turns from several sessions are written in one flush, with citations
+    def test_flush_turns(self):
+        for session in self.sessions:
+            self.writer.enqueue(
+                session,
+                [HumanMessage(content="question"), AIMessage(content="answer", additional_kwargs={"metadata": ["doc1"]})],
+            )
+
+        self.assertEqual(self.writer.flush(), 4)
+        messages = ChatMessage.objects.filter(session=self.sessions[0]).order_by("created_at", "id")
+        self.assertEqual([(m.role, m.metadata) for m in messages], [("human", None), ("ai", ["doc1"])])
+
+    # Test queued messages are written on close
+    def test_close_flushes(self):
+        self.writer.enqueue(self.sessions[0], [HumanMessage(content="unanswered")])
+        self.writer.close()
+        self.assertEqual(ChatMessage.objects.count(), 1)
+
+    # Test a failed batch is retried before newer messages, keeping order
+    def test_retry_keeps_order(self):
+        session = self.sessions[0]
+        self.writer.enqueue(session, [HumanMessage(content="first"), AIMessage(content="second")])
+        with mock.patch.object(ChatMessage.objects, "bulk_create", side_effect=DatabaseError("down")):
+            self.assertEqual(self.writer.flush(), 0)
+        self.writer.enqueue(session, [HumanMessage(content="third")])
+
+        self.assertEqual(self.writer.flush(), 3)
+        messages = ChatMessage.objects.filter(session=session).order_by("id")
+        self.assertEqual([m.content for m in messages], ["first", "second", "third"])
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from unittest import mock
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from rag.fakes import FakeEmbeddings
+from rag.metrics import RATE_LIMIT_THROTTLED
+from rag.rate_limit import (
+    RESERVES,
+    LocalBuckets,
+    OpenAIRateLimiter,
+    Priority,
+    RateLimitedEmbeddings,
+    current_priority,
+    rate_priority,
+)
+
+
+class TestLocalBuckets(unittest.TestCase):
+    # Test both budgets must allow a call and the wait reflects the refill rate
+    def test_requests_and_tokens(self):
+        buckets = LocalBuckets(requests_per_minute=2, tokens_per_minute=600)
+        self.assertEqual(buckets.try_acquire(1, 500, reserve=0), 0.0)
+        wait = buckets.try_acquire(1, 500, reserve=0)
+        self.assertAlmostEqual(wait, 40.0, delta=0.1)
+        self.assertEqual(buckets.try_acquire(1, 50, reserve=0), 0.0)
+        self.assertGreater(buckets.try_acquire(1, 1, reserve=0), 0.0)
+
+    # Test lower priorities leave their reserve untouched
+    def test_reserve(self):
+        buckets = LocalBuckets(requests_per_minute=100, tokens_per_minute=1000)
+        self.assertEqual(buckets.try_acquire(1, 800, reserve=0), 0.0)
+        self.assertGreater(buckets.try_acquire(1, 100, reserve=0.3), 0.0)
+        self.assertEqual(buckets.try_acquire(1, 100, reserve=0), 0.0)
+
+    # Test usage settlement refunds or charges the token bucket
+    def test_charge(self):
+        buckets = LocalBuckets(requests_per_minute=100, tokens_per_minute=1000)
+        buckets.try_acquire(1, 1000, reserve=0)
+        buckets.charge(-400)
+        self.assertEqual(buckets.try_acquire(1, 300, reserve=0), 0.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    # Test the priority context variable and its propagation into tasks
+    def test_priority_context(self):
+        self.assertEqual(current_priority(), Priority.SEARCH)
+
+        async def check():
+            with rate_priority(Priority.BACKGROUND):
+                return await asyncio.create_task(asyncio.sleep(0, current_priority()))
+
+        self.assertEqual(asyncio.run(check()), Priority.BACKGROUND)
+
+    # Test chat is served before queued background calls, reserves aside
+    @mock.patch.dict(RESERVES, {priority: 0.0 for priority in Priority})
+    def test_chat_goes_first(self):
+        limiter = OpenAIRateLimiter(requests_per_minute=600, tokens_per_minute=10**6, poll_interval=0.01)
+        limiter.backend.try_acquire(600, 0, reserve=0)
+        order = []
+
+        async def call(priority, delay):
+            await asyncio.sleep(delay)
+            with rate_priority(priority):
+                await limiter.aacquire_tokens(10)
+            order.append(priority)
+
+        async def run():
+            await asyncio.gather(call(Priority.BACKGROUND, 0), call(Priority.CHAT, 0.01))
+
+        asyncio.run(run())
+        self.assertEqual(order, [Priority.CHAT, Priority.BACKGROUND])
+        self.assertGreaterEqual(RATE_LIMIT_THROTTLED.value(resource="llm", priority="background"), 1)
+
+    # Test non-blocking acquire fails fast when the budget is spent
+    def test_non_blocking(self):
+        limiter = OpenAIRateLimiter(requests_per_minute=1, tokens_per_minute=100)
+        self.assertTrue(limiter.acquire(blocking=False))
+        self.assertFalse(limiter.acquire(blocking=False))
+
+    # Test the usage callback settles the up-front estimate
+    def test_usage_callback(self):
+        limiter = OpenAIRateLimiter(requests_per_minute=100, tokens_per_minute=1000, estimated_tokens=900)
+        limiter.acquire()
+        message = AIMessage(content="a", usage_metadata={"input_tokens": 80, "output_tokens": 20, "total_tokens": 100})
+        limiter.usage_callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+        self.assertTrue(limiter.acquire_tokens(800, blocking=False))
+
+    # Test wrapped embeddings take capacity and still embed
+    def test_embeddings(self):
+        limiter = OpenAIRateLimiter(requests_per_minute=100, tokens_per_minute=10, name="embeddings")
+        embeddings = RateLimitedEmbeddings(FakeEmbeddings(), limiter)
+        self.assertEqual(len(embeddings.embed_documents(["abcd" * 8])), 1)
+        self.assertFalse(limiter.acquire_tokens(5, blocking=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
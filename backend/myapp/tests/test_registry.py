@@ -0,0 +1,41 @@
+import unittest
+from rag.registry import ComponentRegistry
+
+
+class FakeModel:
+    def __init__(self, model_name="fake"):
+        self.model_name = model_name
+
+    def get_model(self):
+        return object()
+
+
+class TestComponentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ComponentRegistry()
+        self.registry.clear()
+
+    def tearDown(self):
+        self.registry.clear()
+
+    # Same configuration shares one client
+    def test_shared_by_config(self):
+        first = self.registry.acquire_llm(FakeModel())
+        second = self.registry.acquire_llm(FakeModel())
+        other = self.registry.acquire_llm(FakeModel(model_name="other"))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(self.registry.stats()["components"]), 2)
+
+    # Clearing the registry builds fresh clients
+    def test_clear(self):
+        client = self.registry.acquire_llm(FakeModel())
+        self.registry.clear()
+        self.assertIsNot(client, self.registry.acquire_llm(FakeModel()))
+        [entry] = self.registry.stats()["components"]
+        self.assertEqual(entry["kind"], "llm")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+from langchain_core.messages import AIMessage, HumanMessage
+from rag.chat_graph import ChatGraph
+from rag.router import AGENT, DIRECT_RESPONSE, RETRIEVE, QueryRouter
+
+
+class TestQueryRouter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.router = QueryRouter(
+            log_path=os.path.join(self.directory.name, "decisions.jsonl"),
+            model_path=os.path.join(self.directory.name, "model.json"),
+            log_queries=True,
+        )
+
+    def tearDown(self):
+        self.router.close()
+        self.directory.cleanup()
+
+    # Test rules handle obvious cases and defer the rest
+    def test_rules(self):
+        self.assertEqual(self.router.route("Hello there!").route, DIRECT_RESPONSE)
+        self.assertEqual(self.router.route("What does Executive Order 14067 do?").route, RETRIEVE)
+        self.assertEqual(self.router.route("thanks, and what did the EPA announce?").route, RETRIEVE)
+        self.assertEqual(self.router.route("tell me something interesting").route, AGENT)
+        self.assertEqual(self.router.stats()["llm_calls_saved"], 3)
+
+        # Generic policy words are left to the classifier and agent
+        self.assertEqual(self.router.route("what are the rules of chess").route, AGENT)
+        self.assertEqual(self.router.route("how old is the president").route, AGENT)
+        self.assertEqual(self.router.route("changes to 40 CFR 60").route, RETRIEVE)
+
+    # Test the classifier learns from logged agent decisions only
+    def test_train_from_log(self):
+        for _ in range(5):
+            self.router.record_agent_decision("what changed for semiconductor exports", RETRIEVE)
+            self.router.record_agent_decision("write me a poem about cats", DIRECT_RESPONSE)
+        self.router.route("tell me something interesting")
+        self.router.flush()
+        with open(self.router.log_path, "a") as f:
+            f.write('{"source": "agent", "rou\n5\n')
+
+        self.assertEqual(self.router.train(), 10)
+        router = QueryRouter(log_path=self.router.log_path, model_path=self.router.model_path)
+        decision = router.route("semiconductor exports news")
+        router.close()
+        self.assertEqual((decision.route, decision.source), (RETRIEVE, "classifier"))
+
+        self.router.flush()
+        with open(self.router.log_path) as f:
+            sources = {json.loads(line)["source"] for line in f if line.startswith("{") and line.endswith("}\n")}
+        self.assertEqual(sources, {"agent", "default", "classifier"})
+
+    # Test queries are only logged when enabled, and the log rotates
+    def test_log_privacy_and_rotation(self):
+        router = QueryRouter(
+            log_path=os.path.join(self.directory.name, "private.jsonl"),
+            model_path=self.router.model_path,
+            max_log_bytes=200,
+            log_backups=2,
+        )
+        for _ in range(20):
+            router.record_agent_decision("my private question", RETRIEVE)
+        router.close()
+
+        self.assertEqual(len(router.log_files()), 3)
+        for path in router.log_files():
+            with open(path) as f:
+                self.assertNotIn("private question", f.read())
+        self.assertEqual(router.train(), 0)
+
+
+class TestChatGraphRouting(unittest.TestCase):
+    # Test a routed retrieval looks like an agent tool call
+    def test_route_node_builds_tool_call(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph = object.__new__(ChatGraph)
+            graph.router = QueryRouter(log_path=os.path.join(directory, "log.jsonl"))
+            graph.retrieve_tool = type("Tool", (), {"name": "search_documents"})()
+            state = {"messages": [HumanMessage(content="q"), AIMessage(content="EPA water rules")]}
+
+            config = {"configurable": {}}
+            update = graph._route(state, config)
+            [call] = update["messages"][0].tool_calls
+            self.assertEqual(update["routed_to"], RETRIEVE)
+            self.assertEqual((call["name"], call["args"]), ("search_documents", {"query": "EPA water rules"}))
+
+            state["messages"][1] = AIMessage(content="hi!")
+            self.assertEqual(graph._route(state, config), {"routed_to": DIRECT_RESPONSE})
+
+
+if __name__ == "__main__":
+    unittest.main()
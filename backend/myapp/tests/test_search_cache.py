@@ -0,0 +1,50 @@
+import unittest
+from rag.search_cache import InMemorySearchCacheBackend, SearchResultCache
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SearchResultCache(InMemorySearchCacheBackend(ttl=60), similarity_threshold=0.9)
+        self.cache.set("Student loan forgiveness", [1.0, 0.0, 0.0], ["a", "b"])
+
+    # Test normalized exact-match hits
+    def test_exact_hit(self):
+        self.assertEqual(self.cache.get("  student LOAN forgiveness"), ["a", "b"])
+        self.assertIsNone(self.cache.get("tariffs"))
+
+    # Test nearest-neighbour hits respect the threshold
+    def test_semantic_hit(self):
+        self.assertEqual(self.cache.get_similar("student loan relief", [0.95, 0.1, 0.0]), ["a", "b"])
+        self.assertIsNone(self.cache.get_similar("student loan relief", [0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.semantic_hits, 1)
+
+    # Test near-identical queries with different identifiers are not served each other's results
+    def test_identifiers_must_match(self):
+        self.cache.set("What does EO 14110 require?", [0.0, 1.0, 0.0], ["eo-14110"])
+        self.cache.set("2023 budget request", [0.0, 0.0, 1.0], ["budget-2023"])
+
+        self.assertIsNone(self.cache.get_similar("What does EO 14111 require?", [0.0, 0.99, 0.1]))
+        self.assertIsNone(self.cache.get_similar("2024 budget request", [0.0, 0.1, 0.99]))
+        self.assertEqual(self.cache.get_similar("what does eo 14110 require", [0.0, 0.99, 0.1]), ["eo-14110"])
+
+    # Test TTL expiry and explicit invalidation
+    def test_expiry_and_invalidation(self):
+        expiring = SearchResultCache(InMemorySearchCacheBackend(ttl=-1))
+        expiring.set("query", [1.0, 0.0], ["a"])
+        self.assertIsNone(expiring.get("query"))
+
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get("student loan forgiveness"))
+
+    # Test index version changes invalidate the cache
+    def test_version_change_invalidates(self):
+        versions = iter([1, 2])
+        self.cache.version_provider = lambda: next(versions)
+        self.cache.version_check_interval = 0
+
+        self.assertIsNotNone(self.cache.get("student loan forgiveness"))
+        self.assertIsNone(self.cache.get("student loan forgiveness"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from rag.benchmark import QUESTIONS, BenchmarkConfig, build_fake_graph
+from rag.cache import ExpansionCache
+from rag.fakes import Latency, mark_environment_offline
+from rag.search_cache import InMemorySearchCacheBackend, SearchResultCache
+from rag.search_graph import SearchGraph
+
+
+class TestAsyncSearch(unittest.TestCase):
+    def setUp(self):
+        mark_environment_offline()
+        self.directory = tempfile.TemporaryDirectory()
+        expansion_cache = ExpansionCache(
+            prompt_template="test",
+            model_name="fake-chat",
+            cache_path=os.path.join(self.directory.name, "expansions.sqlite3"),
+        )
+        self.graph = build_fake_graph(
+            SearchGraph,
+            BenchmarkConfig(llm_latency=Latency(), tokens_per_second=0),
+            offline_latency=True,
+            expansion_cache=expansion_cache,
+            result_cache=SearchResultCache(InMemorySearchCacheBackend(ttl=60)),
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Test concurrent async searches each get the same ids as the sync path
+    def test_concurrent_matches_sync(self):
+        expected = [self.graph.process_query(q) for q in QUESTIONS]
+        self.graph.result_cache.invalidate()
+
+        async def search_all():
+            return await asyncio.gather(*(self.graph.aprocess_query(q) for q in QUESTIONS * 3))
+
+        results = asyncio.run(search_all())
+        self.assertEqual(results, expected * 3)
+        self.assertTrue(all(results))
+
+    # Test identical concurrent searches run the graph once
+    def test_identical_searches_coalesce(self):
+        runs = []
+        search = self.graph._asearch
+
+        async def counted(query):
+            runs.append(query)
+            return await search(query)
+
+        self.graph._asearch = counted
+
+        async def search_all():
+            return await asyncio.gather(*(self.graph.aprocess_query(QUESTIONS[1]) for _ in range(10)))
+
+        results = asyncio.run(search_all())
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(len({tuple(r) for r in results}), 1)
+
+    # Test a repeated async query is served from the result cache
+    def test_cached(self):
+        first = asyncio.run(self.graph.aprocess_query(QUESTIONS[0]))
+        self.assertEqual(self.graph.result_cache.get(QUESTIONS[0]), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+
+class FakePool:
+    async def asample(self, size=6, category=None):
+        return [{"id": "1", "title": "Doc", "category": category}]
+
+
+class TestAsyncDocumentSearchView(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="searcher", password="pw")
+        self.token = Token.objects.create(user=user)
+
+    # Test search stays public while DRF authentication still applies
+    def test_authentication(self):
+        with mock.patch("myapp.views.get_random_pool", return_value=FakePool()):
+            response = self.client.get("/api/documents/search/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get("/api/documents/search/", HTTP_AUTHORIZATION="Token bad")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+    # Test the empty query serves the card pool through DRF's renderer
+    def test_random_documents(self):
+        with mock.patch("myapp.views.get_random_pool", return_value=FakePool()):
+            response = self.client.get(
+                "/api/documents/search/",
+                {"category": "Briefing"},
+                HTTP_AUTHORIZATION=f"Token {self.token.key}",
+                HTTP_ACCEPT="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["category"], "Briefing")
+        self.assertEqual(response.json()["total"], 1)
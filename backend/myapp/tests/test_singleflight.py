@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from rag.metrics import SINGLEFLIGHT_DEDUPLICATED
+from rag.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    # Test concurrent async callers share one call and its result
+    def test_async_coalesces(self):
+        flight = SingleFlight("test-async")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["a", "b"]
+
+        async def run():
+            return await asyncio.gather(*(flight.ado("key", work) for _ in range(5)), flight.ado("other", work))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [["a", "b"]] * 6)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(SINGLEFLIGHT_DEDUPLICATED.value(operation="test-async", scope="process"), 4)
+        self.assertEqual(flight.in_flight(), 0)
+
+    # Test threads share one call, and a finished call is not reused
+    def test_sync_coalesces(self):
+        flight = SingleFlight("test-sync")
+        calls = []
+        started = threading.Event()
+
+        def work():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(flight.do, "key", work)
+            started.wait()
+            others = [pool.submit(flight.do, "key", work) for _ in range(3)]
+            self.assertEqual([f.result() for f in [first, *others]], [42] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.do("key", work), 42)
+        self.assertEqual(len(calls), 2)
+
+    # Test the leader's exception reaches every caller
+    def test_error_shared(self):
+        flight = SingleFlight("test-error")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(*(flight.ado("key", fail) for _ in range(3)), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in asyncio.run(run())))
+
+    # Test a cancelled caller does not cancel the shared call
+    def test_cancel_one_caller(self):
+        flight = SingleFlight("test-cancel")
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.create_task(flight.ado("key", work))
+            second = asyncio.create_task(flight.ado("key", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
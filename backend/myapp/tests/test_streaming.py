@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from rag.streaming import StreamStats, coalesce_stream
+
+
+async def source(events, delay=0):
+    for event in events:
+        if delay:
+            await asyncio.sleep(delay)
+        yield event
+
+
+def collect(events, **kwargs):
+    async def run():
+        return [frame async for frame in coalesce_stream(events, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def chunk(text):
+    return {"type": "chunk", "chunk": text}
+
+
+class TestCoalesceStream(unittest.TestCase):
+    # Test tokens are merged and step changes flush first
+    def test_coalesces_and_flushes_on_step(self):
+        events = [
+            {"type": "step", "step": "agent"},
+            chunk("Hel"),
+            chunk("lo"),
+            {"type": "step", "step": "generate"},
+            chunk(" world"),
+            {"type": "metadata", "metadata": ["a"]},
+        ]
+        frames = collect(source(events), flush_interval=10)
+
+        self.assertEqual(
+            frames,
+            [
+                {"type": "step", "step": "agent"},
+                chunk("Hello"),
+                {"type": "step", "step": "generate"},
+                chunk(" world"),
+                {"type": "metadata", "metadata": ["a"]},
+            ],
+        )
+
+    # Test the byte limit forces a flush
+    def test_max_bytes(self):
+        frames = collect(source([chunk("ab"), chunk("cd"), chunk("e")]), flush_interval=10, max_bytes=4)
+        self.assertEqual(frames, [chunk("abcd"), chunk("e")])
+
+    # Test slow streams are flushed on the interval
+    def test_flush_interval(self):
+        frames = collect(source([chunk("a"), chunk("b")], delay=0.05), flush_interval=0.01)
+        self.assertEqual(frames, [chunk("a"), chunk("b")])
+
+    # Test buffered text is delivered before a source error propagates
+    def test_error_after_flush(self):
+        async def failing():
+            yield chunk("partial")
+            raise RuntimeError("boom")
+
+        async def run():
+            frames = []
+            with self.assertRaises(RuntimeError):
+                async for frame in coalesce_stream(failing(), flush_interval=10):
+                    frames.append(frame)
+            return frames
+
+        self.assertEqual(asyncio.run(run()), [chunk("partial")])
+
+    # Test stats count frames and payload bytes
+    def test_stats(self):
+        stats = StreamStats()
+        stats.record('{"type": "chunk"}')
+        stats.record("é")
+        report = stats.as_dict()
+        self.assertEqual(report["frames"], 2)
+        self.assertEqual(report["bytes"], 19)
+        self.assertGreater(report["frames_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,8 +14,11 @@ The API is organized into several functional areas:
    - Chat history retrieval
 
 3. Document Search:
-   - Semantic search using RAG system
+   - Semantic search using RAG system (async view under ASGI)
    - Random document retrieval
+
+4. Monitoring:
+   - Prometheus metrics for the RAG graphs
 """
 
 from django.urls import path
@@ -26,6 +29,8 @@ from .views import (
     UserSettingsView,
     ChatSessionView,
     DocumentSearchView,
+    AsyncDocumentSearchView,
+    metrics_view,
 )
 
 urlpatterns = [
@@ -60,12 +65,16 @@ urlpatterns = [
     # Document Search Endpoints
     path(
         "documents/search/",
-        DocumentSearchView.as_view(),
-        name="document_search",  # Search documents using RAG system
+        AsyncDocumentSearchView.as_view(),
+        name="document_search",  # Search documents using RAG system (async)
     ),
     path(
         "documents/retrieve/",
         DocumentSearchView.as_view(),
         name="document_retrieve",  # Retrieve documents by IDs
     ),
+    # Monitoring Endpoints
+    path(
+        "metrics/", metrics_view, name="metrics"  # Prometheus scrape endpoint
+    ),
 ]
@@ -13,12 +13,12 @@ Key components:
 
 from typing import List, Dict, Any
 from uuid import UUID
-from pymongo.mongo_client import MongoClient
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import APIException, ValidationError
 from rest_framework import status
 from rest_framework.request import Request
+from asgiref.sync import sync_to_async
 from .serializers import (
     ChatSessionSerializer,
     ChatSessionUpdateSerializer,
@@ -26,21 +26,100 @@ from .serializers import (
     UpdateSettingsSerializer,
 )
 from .models import ChatSession, ChatMessage
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import generics
 from django.contrib.auth.models import User
 from bson import ObjectId
 from langchain_community.chat_message_histories import ChatMessageHistory
 from django.shortcuts import get_object_or_404
-from pymongo import MongoClient
-import os
+from pymongo.errors import PyMongoError
 from django.db import DatabaseError
+from django.conf import settings
+from functools import lru_cache
 import logging
 from rag.search_graph import SearchGraph
+from rag.search_cache import create_search_cache
+from rag import metrics
+from rag.cards import CardCache, CardStore, RandomCardPool
+from rag.rate_limit import Priority, rate_priority
+from django.http import HttpResponse
+from django.views import View
 
 logger = logging.getLogger(__name__)
 
 
+def metrics_view(request) -> HttpResponse:
+    """
+    Serve the process's RAG metrics in Prometheus text format.
+
+    When ``settings.METRICS_AUTH_TOKEN`` is set, scrapers must send it as a
+    bearer token.
+
+    Returns:
+        HttpResponse: Prometheus text exposition of all metrics
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@lru_cache(maxsize=None)
+def get_card_store() -> CardStore:
+    """
+    Return the shared card store, configured from ``settings.CARD_CACHE``.
+
+    Returns:
+        CardStore: The process-wide card store
+    """
+    options = settings.CARD_CACHE
+    return CardStore(
+        CardCache(
+            max_entries=options["MAX_ENTRIES"],
+            ttl=options["TTL"],
+            redis_url=options["REDIS_URL"],
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def get_random_pool() -> RandomCardPool:
+    """
+    Return the shared random card pool, configured from ``settings.CARD_POOL``.
+
+    Returns:
+        RandomCardPool: The process-wide pool, refreshed in the background
+    """
+    options = settings.CARD_POOL
+    return RandomCardPool(
+        pool_size=options["POOL_SIZE"],
+        refresh_interval=options["REFRESH_INTERVAL"],
+        redis_url=settings.CARD_CACHE["REDIS_URL"],
+    )
+
+
+@lru_cache(maxsize=None)
+def get_search_graph() -> SearchGraph:
+    """
+    Return the shared SearchGraph, wiring in the configured result cache.
+
+    Returns:
+        SearchGraph: The process-wide search graph singleton
+    """
+    cache_settings = settings.SEARCH_CACHE
+    result_cache = create_search_cache(
+        backend=cache_settings["BACKEND"], **cache_settings.get("OPTIONS", {})
+    )
+    expansion_settings = settings.EXPANSION_CACHE
+    return SearchGraph(
+        result_cache=result_cache,
+        expansion_options={
+            "log_queries": expansion_settings["LOG_QUERIES"],
+            "max_logged_queries": expansion_settings["MAX_LOGGED_QUERIES"],
+        },
+    )
+
+
 class BaseAPIView(APIView):
     """
     Base API view with common error handling functionality.
@@ -291,7 +370,7 @@ class LoadPreviousChatView(BaseAPIView):
             # Update the created_at timestamp to move this session to the top
             chat_session.save(update_fields=['created_at'])
             chat_history = ChatMessage.objects.filter(session=chat_session).order_by(
-                "created_at"
+                "created_at", "id"
             )
             logger.info(f"Found {len(chat_history)} messages for session {session_id} for frontend")
             history = ChatMessageHistory()
@@ -383,172 +462,34 @@ class UserSettingsView(BaseAPIView):
 
 class DocumentSearchView(BaseAPIView):
     """
-    View for searching documents using the RAG system.
+    View for retrieving document cards by id.
 
-    This view provides document search functionality with the following features:
-    - MongoDB integration for document storage
-    - Semantic search using RAG system
-    - Random document retrieval when no query is provided
+    Also holds the DRF policies (authentication, permissions, throttles)
+    and error handling that ``AsyncDocumentSearchView`` applies to search
+    requests.
 
     Attributes:
-        permission_classes (list): Requires user authentication
+        permission_classes (list): Open to anonymous users; search is public
     """
 
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
-        """
-        Initialize MongoDB connection and RAG system.
-
-        Sets up the MongoDB client, database, and collection connections
-        required for document retrieval.
-        """
-        super().__init__(*args, **kwargs)
-        self.client = None
-        self.db = None
-        self.collection = None
-        self.initialize_mongodb()
-
-    def initialize_mongodb(self) -> None:
-        """
-        Initialize MongoDB connection with error handling.
-
-        Establishes connection to MongoDB using environment variables
-        and sets up the database and collection references.
-
-        Raises:
-            APIException: If MongoDB connection fails
-        """
-        try:
-            connection_string = os.getenv("MONGO_CONNECTION_STRING")
-            if not connection_string:
-                raise ValueError("MongoDB connection string not found in environment")
-
-            logger.info("Initializing MongoDB connection")
-            self.client = MongoClient(connection_string)
-            self.db = self.client["WTP"]
-            self.collection = self.db["whbriefingroom"]
-            # Test connection
-            self.db.command("ping")
-            logger.info("Successfully connected to MongoDB")
-        except Exception as e:
-            logger.error(f"Failed to initialize MongoDB: {e}")
-            raise APIException("Failed to connect to document database")
+    permission_classes = [AllowAny]
 
     def get_document_details(self, object_ids: List[ObjectId]) -> List[Dict[str, Any]]:
         """
-        Fetch document details from MongoDB.
+        Fetch document cards, from the card cache or a projected MongoDB query.
 
         Args:
             object_ids (list): List of MongoDB ObjectIds to retrieve
 
         Returns:
-            list: List of document details including metadata
+            list: Cards in the order of ``object_ids``, skipping unknown ids
         """
         try:
-            return list(self.collection.find({"_id": {"$in": object_ids}}))
+            return get_card_store().get_cards(object_ids)
         except Exception as e:
             logger.error(f"Error fetching document details: {e}")
             return []
 
-    def get_random_documents(self, size: int = 6) -> List[Dict[str, Any]]:
-        """
-        Get random documents when no query is provided.
-
-        Args:
-            size (int): Number of random documents to retrieve
-
-        Returns:
-            list: List of random documents
-        """
-        try:
-            return list(self.collection.aggregate([{"$sample": {"size": size}}]))
-        except Exception as e:
-            logger.error(f"Error fetching random documents: {e}")
-            return []
-
-    def format_results(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Format documents for response.
-
-        Transforms MongoDB documents into a consistent format with
-        proper ID handling and metadata organization.
-
-        Args:
-            documents (list): Raw documents from MongoDB
-
-        Returns:
-            list: Formatted document list for API response
-        """
-        return [
-            {
-                "id": str(doc["_id"]),
-                "title": doc.get("title", "Untitled"),
-                "summary": doc.get("summary", "No summary available"),
-                "url": doc.get("url", "#"),
-                "date_posted": doc.get("date_posted"),
-                "category": doc.get("category", "Uncategorized"),
-            }
-            for doc in documents
-        ]
-
-    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        """
-        Handle GET requests for document search.
-
-        Supports two modes:
-        1. Query-based search using RAG system
-        2. Random document retrieval when no query provided
-
-        Args:
-            request: HTTP request with optional 'query' parameter
-
-        Returns:
-            Response: List of documents matching the query or random documents
-        """
-        try:
-            query = request.query_params.get("query", "")
-            logger.info(f"Processing search request. Query: '{query}'")
-
-            if query:
-                # Search graph implementation
-                try:
-                    search_graph = SearchGraph()
-                    doc_ids = search_graph.process_query(query)
-                    logger.info(f"Search graph returned {len(doc_ids)} document IDs")
-
-                    # Convert to ObjectIds
-                    object_ids = [
-                        ObjectId(id_str)
-                        for id_str in doc_ids
-                        if ObjectId.is_valid(id_str)
-                    ]
-                    if not object_ids:
-                        logger.warning("No valid document IDs found")
-                        return Response({"query": query, "results": []})
-
-                    # Get and sort documents
-                    documents = self.get_document_details(object_ids)
-                    id_to_doc = {str(doc["_id"]): doc for doc in documents}
-                    documents = [
-                        id_to_doc[id_str] for id_str in doc_ids if id_str in id_to_doc
-                    ]
-
-                except ValidationError as e:
-                    return self.handle_validation_error(e, "processing search query")
-
-            else:
-                # Random documents
-                documents = self.get_random_documents()
-
-            results = self.format_results(documents)
-            logger.info(f"Returning {len(results)} results")
-
-            return Response({"query": query, "results": results, "total": len(results)})
-
-        except pymongo.errors.PyMongoError as e:
-            return self.handle_database_error(e, "searching documents")
-        except Exception as e:
-            self.handle_unexpected_error(e, "processing search request")
-
     def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
         Handle POST requests to retrieve documents by their IDs.
@@ -572,16 +513,15 @@ class DocumentSearchView(BaseAPIView):
 
             # Convert string IDs to ObjectId
             object_ids = [ObjectId(doc_id) for doc_id in document_ids]
-            documents = self.get_document_details(object_ids)
-            
-            if not documents:
+            results = self.get_document_details(object_ids)
+
+            if not results:
                 return Response(
                     {"error": "No documents found"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            formatted_results = self.format_results(documents)
-            return Response(formatted_results)
+            return Response(results)
 
         except ValidationError as e:
             return self.handle_validation_error(e, "retrieving documents by IDs")
@@ -591,3 +531,77 @@ class DocumentSearchView(BaseAPIView):
                 {"error": "Failed to retrieve documents"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class AsyncDocumentSearchView(View):
+    """
+    Async document search for ASGI deployments.
+
+    The search graph and MongoDB lookups are awaited, so a worker can keep
+    many searches in flight without holding a thread for each. DRF views
+    are synchronous, so each request runs through a ``DocumentSearchView``
+    instance for DRF's authentication, permission and throttle checks,
+    exception handling and renderers.
+
+    Supports two modes:
+    1. Query-based search using the search graph
+    2. Random documents from the card pool when no query is provided
+    """
+
+    async def get(self, request, *args: Any, **kwargs: Any) -> HttpResponse:
+        """
+        Handle GET requests for document search.
+
+        Args:
+            request: HTTP request with optional 'query' and 'category' parameters
+
+        Returns:
+            HttpResponse: Rendered DRF response with the matching or random documents
+        """
+        view = DocumentSearchView()
+        view.args, view.kwargs = args, kwargs
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            # Token lookup and throttle state may hit the database
+            await sync_to_async(view.initial)(drf_request, *args, **kwargs)
+            response = await self.search(view, drf_request)
+        except Exception as e:
+            response = view.handle_exception(e)
+        return view.finalize_response(drf_request, response, *args, **kwargs).render()
+
+    async def search(self, view: DocumentSearchView, request: Request) -> Response:
+        """
+        Run a search for an authenticated request.
+
+        Args:
+            view: The DRF view providing error handling
+            request: DRF request with optional 'query' and 'category' parameters
+
+        Returns:
+            Response: Documents matching the query, or random documents
+        """
+        query = request.query_params.get("query", "")
+        logger.info(f"Processing search request. Query: '{query}'")
+        try:
+            if query:
+                with rate_priority(Priority.SEARCH):
+                    doc_ids = await get_search_graph().aprocess_query(query)
+                logger.info(f"Search graph returned {len(doc_ids)} document IDs")
+                object_ids = [ObjectId(id_str) for id_str in doc_ids if ObjectId.is_valid(id_str)]
+                if not object_ids:
+                    logger.warning("No valid document IDs found")
+                    return Response({"query": query, "results": []})
+                # Cards come back in search result order
+                results = await get_card_store().aget_cards(object_ids)
+            else:
+                category = request.query_params.get("category") or None
+                results = await get_random_pool().asample(category=category)
+        except PyMongoError as e:
+            return view.handle_database_error(e, "searching documents")
+        except Exception as e:
+            view.handle_unexpected_error(e, "processing search request")
+
+        logger.info(f"Returning {len(results)} results")
+        return Response({"query": query, "results": results, "total": len(results)})
@@ -34,10 +34,80 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["*"]
 
-# MongoDB settings
+# MongoDB settings (pool size, timeouts and read preference of the shared
+# client are read from MONGO_* environment variables, see rag/mongo.py)
 MONGODB_URI = os.getenv("MONGO_CONNECTION_STRING")
 MONGODB_NAME = "WTP"
 
+# Search result cache (backend: "memory" per worker, or "redis" shared by all workers)
+SEARCH_CACHE = {
+    "BACKEND": os.getenv("SEARCH_CACHE_BACKEND", "memory"),
+    "OPTIONS": {
+        "ttl": 600,
+        "similarity_threshold": 0.95,
+        "max_entries": 1000,
+        "redis_url": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+# Chat streaming: token chunks are coalesced into WebSocket frames, flushed
+# after FLUSH_INTERVAL seconds or MAX_BYTES of text, and on every step change
+CHAT_STREAMING = {
+    "FLUSH_INTERVAL": float(os.getenv("CHAT_STREAM_FLUSH_INTERVAL", "0.05")),
+    "MAX_BYTES": int(os.getenv("CHAT_STREAM_MAX_BYTES", "1024")),
+}
+
+# Chat history: connections load the most recent INITIAL_MESSAGES messages.
+# The chat graph's verbatim window is 3 turns (6 messages), so the default
+# of 8 fills it at connect time and nothing older is read. A smaller value
+# makes connects cheaper; the rest of the window is then paged in before
+# the session's first question
+CHAT_HISTORY = {
+    "INITIAL_MESSAGES": int(os.getenv("CHAT_HISTORY_INITIAL_MESSAGES", "8")),
+}
+
+# Chat persistence: completed turns are queued and written by a background
+# thread per worker with bulk_create every FLUSH_INTERVAL seconds
+CHAT_PERSISTENCE = {
+    "FLUSH_INTERVAL": float(os.getenv("CHAT_PERSIST_FLUSH_INTERVAL", "0.5")),
+    "MAX_BATCH": int(os.getenv("CHAT_PERSIST_MAX_BATCH", "500")),
+}
+
+# Search result cards: an in-process LRU per worker. ETL jobs invalidate
+# changed cards in every worker through REDIS_URL; without it a changed card
+# is served until its TTL expires
+CARD_CACHE = {
+    "MAX_ENTRIES": int(os.getenv("CARD_CACHE_SIZE", "5000")),
+    "TTL": float(os.getenv("CARD_CACHE_TTL", "600")),
+    "REDIS_URL": os.getenv("CARD_CACHE_REDIS_URL") or None,
+}
+
+# Random cards for searches without a query: each worker serves them from a
+# pool of POOL_SIZE sampled cards redrawn every REFRESH_INTERVAL seconds,
+# shared through CARD_CACHE["REDIS_URL"] when set
+CARD_POOL = {
+    "POOL_SIZE": int(os.getenv("CARD_POOL_SIZE", "2000")),
+    "REFRESH_INTERVAL": float(os.getenv("CARD_POOL_REFRESH_INTERVAL", "300")),
+}
+
+# Chat query router: decisions go to a rotating JSONL log. Query text is
+# only stored (and the router only trainable) when LOG_QUERIES is on
+QUERY_ROUTER = {
+    "LOG_QUERIES": os.getenv("ROUTER_LOG_QUERIES", "false").lower() == "true",
+    "MAX_LOG_BYTES": int(os.getenv("ROUTER_MAX_LOG_BYTES", "10000000")),
+    "LOG_BACKUPS": int(os.getenv("ROUTER_LOG_BACKUPS", "5")),
+}
+
+# Query expansion cache: LOG_QUERIES counts search queries (raw text) in the
+# log that prewarm_expansions reads, keeping the MAX_LOGGED_QUERIES most frequent
+EXPANSION_CACHE = {
+    "LOG_QUERIES": os.getenv("EXPANSION_LOG_QUERIES", "false").lower() == "true",
+    "MAX_LOGGED_QUERIES": int(os.getenv("EXPANSION_MAX_LOGGED_QUERIES", "10000")),
+}
+
+# Bearer token required by the Prometheus metrics endpoint; open when unset
+METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN", "")
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -1,7 +1,7 @@
 """RAG system implementation using LangGraph."""
 
 from .base import BaseRAGGraph
-from .chat_graph import ChatGraph
+from .chat_graph import ChatGraph, ChatContext
 from .search_graph import SearchGraph
 
-__all__ = ['BaseRAGGraph', 'ChatGraph', 'SearchGraph']
+__all__ = ['BaseRAGGraph', 'ChatGraph', 'ChatContext', 'SearchGraph']
@@ -1,15 +1,30 @@
 """Base classes and shared functionality for RAG system."""
 
+import asyncio
+import json
 import os
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
 from langchain_pinecone import PineconeVectorStore
 from langchain_core.tools import tool
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from .cache import CachedEmbeddings, get_cache_dir, normalize_text
+from .lexical import BM25Index, load_bm25_index
+from .local_store import LocalVectorStore
+from .metrics import acount_openai_retry, count_openai_retry, instrument_node, service_name, track_call
+from .rate_limit import RateLimitedEmbeddings, get_rate_limiter
+from .singleflight import create_singleflight
+from .registry import get_registry
 
 
 class BaseLLMModel:
@@ -42,15 +57,60 @@ class BaseVectorStore:
 class OpenAIModel(BaseLLMModel):
     """OpenAI GPT model implementation."""
 
+    def __init__(self, model_name: str = "gpt-4", temperature: float = 0):
+        self.model_name = model_name
+        self.temperature = temperature
+
     def get_model(self):
-        return ChatOpenAI(model="gpt-4", temperature=0)
+        # stream_usage reports token counts on streamed responses too, which
+        # the rate limiter's callback uses to settle each call's charge
+        limiter = get_rate_limiter("llm")
+        return ChatOpenAI(
+            model=self.model_name,
+            temperature=self.temperature,
+            stream_usage=True,
+            rate_limiter=limiter,
+            callbacks=[limiter.usage_callback],
+            # The client retries internally; its hooks see every attempt
+            http_client=DefaultHttpxClient(event_hooks={"request": [count_openai_retry]}),
+            http_async_client=DefaultAsyncHttpxClient(event_hooks={"request": [acount_openai_retry]}),
+        )
 
 
 class OpenAIEmbeddingsModel(BaseEmbeddings):
     """OpenAI text embedding model implementation."""
 
+    def __init__(self, model_name: str = "text-embedding-3-small"):
+        self.model_name = model_name
+
     def get_embeddings(self):
-        return OpenAIEmbeddings(model="text-embedding-3-small")
+        return RateLimitedEmbeddings(
+            OpenAIEmbeddings(model=self.model_name), get_rate_limiter("embeddings")
+        )
+
+
+class CachedEmbeddingsModel(BaseEmbeddings):
+    """Wraps another embeddings provider with the two-level query cache."""
+
+    def __init__(
+        self,
+        embeddings: Optional[BaseEmbeddings] = None,
+        cache_path: Optional[str] = None,
+        max_memory_entries: int = 2048,
+        max_disk_entries: int = 100_000,
+    ):
+        self.embeddings = embeddings or OpenAIEmbeddingsModel()
+        self.cache_path = cache_path or os.path.join(get_cache_dir(), "embeddings.sqlite3")
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+    def get_embeddings(self) -> CachedEmbeddings:
+        return CachedEmbeddings(
+            self.embeddings.get_embeddings(),
+            cache_path=self.cache_path,
+            max_memory_entries=self.max_memory_entries,
+            max_disk_entries=self.max_disk_entries,
+        )
 
 
 class PineconeVectorStoreModel(BaseVectorStore):
@@ -62,6 +122,8 @@ class PineconeVectorStoreModel(BaseVectorStore):
         self.embeddings = embeddings
 
     def _validate_embedding_compatibility(self, embedding) -> bool:
+        while isinstance(embedding, (CachedEmbeddings, RateLimitedEmbeddings)):
+            embedding = embedding.underlying
         if not isinstance(embedding, OpenAIEmbeddings):
             raise ValueError("PineconeVectorStore requires OpenAIEmbeddings")
 
@@ -71,6 +133,55 @@ class PineconeVectorStoreModel(BaseVectorStore):
         )
 
 
+class LocalVectorStoreModel(BaseVectorStore):
+    """In-process vector store over a memory-mapped index directory.
+
+    The index is built offline (see the ``build_local_vector_index``
+    management command) with the same embedding model used for queries.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embeddings,
+        quantized: bool = False,
+        nprobe: int = 8,
+    ):
+        self.path = path
+        super().__init__(embeddings)
+        self.embeddings = embeddings
+        self.quantized = quantized
+        self.nprobe = nprobe
+
+    def _validate_embedding_compatibility(self, embedding) -> bool:
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            indexed_model = json.load(f).get("model")
+        model = getattr(embedding, "model", None)
+        if indexed_model and model and indexed_model != model:
+            raise ValueError(
+                f"Local index at {self.path} was built with {indexed_model}, not {model}"
+            )
+
+    def get_vector_store(self) -> LocalVectorStore:
+        return LocalVectorStore(
+            self.path, self.embeddings, quantized=self.quantized, nprobe=self.nprobe
+        )
+
+
+def default_vector_store(embeddings) -> BaseVectorStore:
+    """Local index when ``LOCAL_VECTOR_STORE_PATH`` is set, Pinecone otherwise."""
+    if path := os.getenv("LOCAL_VECTOR_STORE_PATH"):
+        return LocalVectorStoreModel(
+            path,
+            embeddings,
+            quantized=os.getenv("LOCAL_VECTOR_STORE_QUANTIZED", "").lower() in ("1", "true"),
+        )
+    return PineconeVectorStoreModel(index_name="langchain-index", embeddings=embeddings)
+
+
 class BasePromptTemplate:
     """Base interface for prompt templates."""
 
@@ -97,6 +208,24 @@ class HistoryPromptTemplate(BasePromptTemplate):
         )
 
 
+class HistorySummaryPromptTemplate(BasePromptTemplate):
+    """Template for folding older chat turns into a rolling summary."""
+
+    def get_prompt_template(self) -> PromptTemplate:
+        """Returns template for extending a conversation summary."""
+        template = """Progressively summarize the lines of conversation provided,
+        adding onto the previous summary and returning a new summary.
+        Keep the policies, documents, names and dates the user asked about
+        and the key facts of the answers. Be concise. \n\n
+        Current summary: \n\n {summary} \n\n
+        New lines of conversation: \n\n {new_lines} \n\n
+        New summary:
+        """
+        return PromptTemplate(
+            template=template, input_variables=["summary", "new_lines"]
+        )
+
+
 class GraderPromptTemplate(BasePromptTemplate):
     """Template for grading document relevance."""
 
@@ -183,49 +312,209 @@ class DirectResponsePromptTemplate(BasePromptTemplate):
     
 
 class BaseRAGGraph:
-    """Base class for RAG graphs with common initialization."""
+    """Base class for RAG graphs with common initialization.
+
+    Models, embeddings and vector stores are drawn from the process-wide
+    ``ComponentRegistry``, so graphs with the same configuration share one
+    set of clients instead of opening new connection pools per instance.
+    When a BM25 index is given (or found at ``BM25_INDEX_PATH``) retrieval
+    is hybrid lexical + dense.
+    """
+
+    _environment_loaded = False
+    _environment_lock = Lock()
+    # Label of this graph's node metrics
+    graph_name = "rag"
 
     def __init__(
         self,
         model: Optional[BaseLLMModel] = None,
         embeddings: Optional[BaseEmbeddings] = None,
         vector_store: Optional[BaseVectorStore] = None,
+        lexical_index: Optional[BM25Index] = None,
     ):
         self._load_environment_variables()
-        self.llm = (model or OpenAIModel()).get_model()
-        self.embeddings = (embeddings or OpenAIEmbeddingsModel()).get_embeddings()
-        self.vector_store = (
-            vector_store
-            or PineconeVectorStoreModel(
-                index_name="langchain-index", embeddings=self.embeddings
-            )
-        ).get_vector_store()
+        self.registry = get_registry()
+        self.llm = self.registry.acquire_llm(model or OpenAIModel())
+        self.embeddings = self.registry.acquire_embeddings(
+            embeddings or CachedEmbeddingsModel(OpenAIEmbeddingsModel())
+        )
+        self.vector_store = self.registry.acquire_vector_store(
+            vector_store or default_vector_store(self.embeddings)
+        )
+        self.lexical_index = lexical_index or load_bm25_index()
+        self.retriever = build_retriever(self.vector_store, self.lexical_index)
+
+    def _node(self, name: str, func):
+        """A workflow node wrapped with latency and error metrics."""
+        return instrument_node(self.graph_name, name, func)
 
     def _load_environment_variables(self):
-        """Load and validate required API keys."""
-        load_dotenv()
-        required_vars = ["OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY"]
-        for var in required_vars:
-            if value := os.getenv(var):
-                os.environ[var] = value
-            else:
-                raise ValueError(f"Missing required environment variable: {var}")
+        """Load and validate required API keys once per process."""
+        with BaseRAGGraph._environment_lock:
+            if BaseRAGGraph._environment_loaded:
+                return
+            load_dotenv()
+            required_vars = ["OPENAI_API_KEY", "LANGSMITH_API_KEY"]
+            if not os.getenv("LOCAL_VECTOR_STORE_PATH"):
+                required_vars.append("PINECONE_API_KEY")
+            for var in required_vars:
+                if value := os.getenv(var):
+                    os.environ[var] = value
+                else:
+                    raise ValueError(f"Missing required environment variable: {var}")
+
+            os.environ["LANGCHAIN_TRACING_V2"] = "true"
+            os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
+            BaseRAGGraph._environment_loaded = True
+
+
+@dataclass
+class RetrievalResult:
+    """Documents returned by one retrieval, best first, with their scores.
+
+    Carried as the retrieval tool's artifact so graph nodes read documents
+    and citation metadata directly instead of parsing tool output text.
+    """
+
+    documents: List[Document] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+
+    @property
+    def ids(self) -> List[str]:
+        return [doc.metadata.get("id") for doc in self.documents]
+
+    @property
+    def combined_string(self) -> str:
+        return "\n\n".join(doc.page_content for doc in self.documents)
+
+    @classmethod
+    def from_scored(cls, scored: List[Tuple[Document, float]]) -> "RetrievalResult":
+        return cls([doc for doc, _ in scored], [score for _, score in scored])
 
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
-        os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
+
+# Identical retrievals in flight at once (e.g. chat and search sessions
+# asking about the same story) share one vector search. Results hold
+# Documents, so they are only coalesced within the process.
+_retrieval_flight = create_singleflight("retrieval", shared=False)
 
 
 class VectorStoreRetriever(BaseRetriever):
-    """Base retriever class for vector store operations."""
+    """Base retriever class for vector store operations.
+
+    Subclasses implement ``_search``/``_asearch``; ``retrieve`` and
+    ``aretrieve`` coalesce identical concurrent queries, so callers must
+    not mutate the returned result.
+    """
     
-    vector_store: PineconeVectorStore
+    vector_store: VectorStore
+    k: int = 6
+
+    def _flight_key(self, query: str) -> str:
+        return f"{id(self)}:{self.k}:{normalize_text(query)}"
+
+    async def aretrieve(self, query: str) -> RetrievalResult:
+        """Async retrieval of relevant documents with scores."""
+        return await _retrieval_flight.ado(self._flight_key(query), lambda: self._asearch(query))
+
+    def retrieve(self, query: str) -> RetrievalResult:
+        """Sync retrieval of relevant documents with scores."""
+        return _retrieval_flight.do(self._flight_key(query), lambda: self._search(query))
+
+    async def _asearch(self, query: str) -> RetrievalResult:
+        with track_call(service_name(self.vector_store), "similarity_search"):
+            scored = await self.vector_store.asimilarity_search_with_score(query, k=self.k)
+        return RetrievalResult.from_scored(scored)
+
+    def _search(self, query: str) -> RetrievalResult:
+        with track_call(service_name(self.vector_store), "similarity_search"):
+            scored = self.vector_store.similarity_search_with_score(query, k=self.k)
+        return RetrievalResult.from_scored(scored)
 
     async def _aget_relevant_documents(self, query: str) -> List[Document]:
         """Async retrieval of relevant documents."""
-        docs = await self.vector_store.asimilarity_search(query, k=6)
-        return docs
+        return (await self.aretrieve(query)).documents
 
     def _get_relevant_documents(self, query: str) -> List[Document]:
         """Sync version for non-async operations."""
-        docs = self.vector_store.similarity_search(query, k=6)
-        return docs
+        return self.retrieve(query).documents
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]], k: int, rrf_k: int = 60
+) -> List[Tuple[Document, float]]:
+    """Fuse ranked lists by summing ``1 / (rrf_k + rank)`` per document.
+
+    Documents are matched across lists by their text, since the dense and
+    lexical indexes hold the same chunks under different ids.
+
+    Returns:
+        List[Tuple[Document, float]]: The top ``k`` documents with fused scores
+    """
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [(documents[key], scores[key]) for key in ordered[:k]]
+
+
+class HybridRetriever(VectorStoreRetriever):
+    """Dense similarity search fused with BM25 keyword search.
+
+    Both searches run concurrently and fetch ``fetch_k`` candidates each;
+    the top ``k`` after reciprocal-rank fusion are returned, scored by
+    their fused RRF score. Exact matches on bill numbers, executive order
+    numbers and agency names come from the lexical side even when the
+    embedding misses them.
+    """
+
+    lexical_index: BM25Index
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    async def _adense_search(self, query: str) -> List[Document]:
+        with track_call(service_name(self.vector_store), "similarity_search"):
+            return await self.vector_store.asimilarity_search(query, k=self.fetch_k)
+
+    def _dense_search(self, query: str) -> List[Document]:
+        with track_call(service_name(self.vector_store), "similarity_search"):
+            return self.vector_store.similarity_search(query, k=self.fetch_k)
+
+    def _lexical_search(self, query: str) -> List[Tuple[Document, float]]:
+        with track_call("bm25", "search"):
+            return self.lexical_index.search(query, self.fetch_k)
+
+    async def _asearch(self, query: str) -> RetrievalResult:
+        dense, lexical = await asyncio.gather(
+            self._adense_search(query),
+            asyncio.to_thread(self._lexical_search, query),
+        )
+        return RetrievalResult.from_scored(
+            reciprocal_rank_fusion([dense, [doc for doc, _ in lexical]], self.k, self.rrf_k)
+        )
+
+    def _search(self, query: str) -> RetrievalResult:
+        dense = _retrieval_executor.submit(self._dense_search, query)
+        lexical = self._lexical_search(query)
+        return RetrievalResult.from_scored(
+            reciprocal_rank_fusion(
+                [dense.result(), [doc for doc, _ in lexical]], self.k, self.rrf_k
+            )
+        )
+
+
+# Runs the dense half of sync hybrid searches alongside the BM25 lookup
+_retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+def build_retriever(
+    vector_store: VectorStore, lexical_index: Optional[BM25Index] = None, k: int = 6
+) -> VectorStoreRetriever:
+    """Hybrid retriever when a BM25 index is available, dense-only otherwise."""
+    if lexical_index is not None:
+        return HybridRetriever(vector_store=vector_store, lexical_index=lexical_index, k=k)
+    return VectorStoreRetriever(vector_store=vector_store, k=k)
@@ -0,0 +1,258 @@
+"""Offline benchmarks for the chat and search graphs.
+
+Graphs are built on the deterministic fakes in ``rag.fakes``, so results
+reflect the graph's own cost plus the configured provider latencies and
+can be compared across runs (see ``compare_results``). Each scenario also
+runs once with zero provider latency, which measures pure graph overhead.
+"""
+
+import asyncio
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from .base import BaseRAGGraph
+from .cache import ExpansionCache
+from .chat_graph import ChatContext, ChatGraph
+from .fakes import (
+    FakeEmbeddingsModel,
+    FakeLLMModel,
+    FakeVectorStoreModel,
+    Latency,
+    mark_environment_offline,
+)
+from .router import QueryRouter
+from .search_graph import SearchGraph
+
+QUESTIONS = (
+    "What does Executive Order 14067 say about digital assets?",
+    "tell me something interesting about recent announcements",
+    "How is the EPA changing water rules?",
+    "and what happened after that?",
+    "Summarize the infrastructure funding fact sheet",
+    "what else should I know",
+)
+
+
+@dataclass
+class BenchmarkConfig:
+    """Provider behaviour and load shape of a benchmark run.
+
+    Args:
+        sessions: Concurrent session counts to measure
+        turns: Turns per session
+        llm_latency: Time to first token of every LLM call
+        tokens_per_second: LLM streaming rate (0 streams instantly)
+        answer_tokens: Tokens per generated answer
+        embedding_latency: Latency of each embedding call
+        retrieval_latency: Latency of each vector store query
+        seed: Seed for every latency distribution
+    """
+
+    sessions: Sequence[int] = (1, 10, 50, 100, 500)
+    turns: int = 3
+    llm_latency: Latency = field(default_factory=lambda: Latency(0.4, 0.15))
+    tokens_per_second: float = 60.0
+    answer_tokens: int = 60
+    embedding_latency: Latency = field(default_factory=lambda: Latency(0.03, 0.01))
+    retrieval_latency: Latency = field(default_factory=lambda: Latency(0.05, 0.02))
+    seed: int = 0
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Mean and percentiles of a list of measurements (in the input unit)."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": ordered[-1],
+    }
+
+
+def build_fake_graph(cls, config: BenchmarkConfig, offline_latency: bool, **kwargs) -> BaseRAGGraph:
+    """Build a fresh graph singleton on fake providers.
+
+    Replaces any existing instance, so later ``cls()`` calls (e.g. from the
+    chat consumer) return this graph.
+    """
+    zero = Latency()
+    llm = FakeLLMModel(
+        first_token_latency=zero if offline_latency else config.llm_latency,
+        tokens_per_second=0.0 if offline_latency else config.tokens_per_second,
+        answer_tokens=config.answer_tokens,
+        seed=config.seed,
+    )
+    embeddings = FakeEmbeddingsModel(latency=zero if offline_latency else config.embedding_latency, seed=config.seed)
+    vector_store = FakeVectorStoreModel(
+        embeddings.get_embeddings(), latency=zero if offline_latency else config.retrieval_latency, seed=config.seed
+    )
+    with cls._lock:
+        cls._instance = None
+    return cls(model=llm, embeddings=embeddings, vector_store=vector_store, **kwargs)
+
+
+async def _chat_session(graph: ChatGraph, session: int, config: BenchmarkConfig, records: List[dict]) -> None:
+    context = ChatContext(session_id=f"bench-{session}")
+    for turn in range(config.turns):
+        question = QUESTIONS[(session + turn) % len(QUESTIONS)]
+        start = time.perf_counter()
+        first_token = None
+        tokens = 0
+        async for event in graph.process_query_async(question, context):
+            if event["type"] == "chunk" and event["chunk"]:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                tokens += len(event["chunk"].split())
+        records.append(
+            {"seconds": time.perf_counter() - start, "ttft": first_token, "tokens": tokens}
+        )
+
+
+async def _run_chat_level(graph: ChatGraph, sessions: int, config: BenchmarkConfig) -> dict:
+    records: List[dict] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_chat_session(graph, i, config, records) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    turn_seconds = [r["seconds"] for r in records]
+    streaming = [r for r in records if r["ttft"] is not None]
+    return {
+        "sessions": sessions,
+        "turns": len(records),
+        "wall_seconds": elapsed,
+        "turns_per_second": len(records) / elapsed,
+        "turn_ms": summarize([s * 1000 for s in turn_seconds]),
+        "ttft_ms": summarize([r["ttft"] * 1000 for r in streaming]),
+        "tokens_per_second": sum(r["tokens"] for r in records) / elapsed,
+        "stream_tokens_per_second": summarize(
+            [r["tokens"] / (r["seconds"] - r["ttft"]) for r in streaming if r["seconds"] > r["ttft"]]
+        ),
+    }
+
+
+def benchmark_chat(config: BenchmarkConfig, work_dir: str) -> dict:
+    """Chat turns at each concurrency level, plus zero-latency graph overhead."""
+
+    def build(offline_latency: bool) -> ChatGraph:
+        router = QueryRouter(
+            log_path=os.path.join(work_dir, "router.jsonl"), model_path=os.path.join(work_dir, "router.json")
+        )
+        return build_fake_graph(ChatGraph, config, offline_latency, router=router)
+
+    overhead = asyncio.run(_run_chat_level(build(offline_latency=True), 1, config))
+    graph = build(offline_latency=False)
+    levels = [asyncio.run(_run_chat_level(graph, sessions, config)) for sessions in config.sessions]
+    return {"overhead": {"turn_ms": overhead["turn_ms"]}, "levels": levels}
+
+
+async def _run_search_level(graph: SearchGraph, sessions: int, config: BenchmarkConfig, offset: int) -> dict:
+    latencies: List[float] = []
+
+    async def session_loop(session: int) -> None:
+        for turn in range(config.turns):
+            # Unique queries so the expansion cache does not hide LLM latency
+            query = f"{QUESTIONS[(session + turn) % len(QUESTIONS)]} #{offset}-{session}-{turn}"
+            start = time.perf_counter()
+            await graph.aprocess_query(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session_loop(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "queries": len(latencies),
+        "wall_seconds": elapsed,
+        "queries_per_second": len(latencies) / elapsed,
+        "query_ms": summarize([s * 1000 for s in latencies]),
+    }
+
+
+def benchmark_search(config: BenchmarkConfig, work_dir: str) -> dict:
+    """Search queries at each concurrency level, plus zero-latency graph overhead.
+
+    Sessions drive ``SearchGraph.aprocess_query`` on one event loop, as the
+    async search view does.
+    """
+
+    def build(offline_latency: bool, name: str) -> SearchGraph:
+        expansion_cache = ExpansionCache(
+            prompt_template="benchmark",
+            model_name="fake-chat",
+            cache_path=os.path.join(work_dir, f"{name}.sqlite3"),
+        )
+        return build_fake_graph(SearchGraph, config, offline_latency, expansion_cache=expansion_cache)
+
+    overhead = asyncio.run(_run_search_level(build(True, "overhead"), 1, config, offset=0))
+    graph = build(False, "search")
+    levels = [
+        asyncio.run(_run_search_level(graph, sessions, config, offset=i + 1))
+        for i, sessions in enumerate(config.sessions)
+    ]
+    return {"overhead": {"query_ms": overhead["query_ms"]}, "levels": levels}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(config: BenchmarkConfig, graphs: Sequence[str] = ("chat", "search")) -> dict:
+    """Run the selected graph benchmarks offline and return a JSON-ready report."""
+    mark_environment_offline()
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": asdict(config),
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        if "chat" in graphs:
+            report["results"]["chat"] = benchmark_chat(config, work_dir)
+        if "search" in graphs:
+            report["results"]["search"] = benchmark_search(config, work_dir)
+    return report
+
+
+def compare_results(baseline: dict, current: dict) -> List[dict]:
+    """Per-level ratios (current / baseline) of throughput and p50/p95 latency."""
+    rows = []
+    for graph, result in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(graph)
+        if not base:
+            continue
+        base_levels = {level["sessions"]: level for level in base["levels"]}
+        for level in result["levels"]:
+            previous = base_levels.get(level["sessions"])
+            if previous is None:
+                continue
+            latency_key = "turn_ms" if graph == "chat" else "query_ms"
+            throughput_key = "turns_per_second" if graph == "chat" else "queries_per_second"
+            rows.append(
+                {
+                    "graph": graph,
+                    "sessions": level["sessions"],
+                    "throughput": level[throughput_key] / previous[throughput_key],
+                    "p50": level[latency_key]["p50"] / previous[latency_key]["p50"],
+                    "p95": level[latency_key]["p95"] / previous[latency_key]["p95"],
+                }
+            )
+    return rows
@@ -0,0 +1,439 @@
+"""In-process and on-disk caches shared by the RAG pipelines."""
+
+import asyncio
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from .singleflight import SingleFlight, create_singleflight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "policybot")
+
+
+def get_cache_dir() -> str:
+    """Return (and create) the directory holding persistent cache files."""
+    cache_dir = os.getenv("RAG_CACHE_DIR", DEFAULT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys: casefold and collapse whitespace."""
+    return " ".join(text.casefold().split())
+
+
+def make_key(*parts: str) -> str:
+    """Hash key parts into a fixed-size cache key."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with optional TTL.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        ttl: Seconds an entry stays valid, or None to never expire
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return None
+            value, stored_at = item
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Persistent key/value cache backed by a single SQLite table.
+
+    Values are stored as blobs. Rows carry their write and last-access
+    times, which drive TTL expiry and least-recently-used eviction once
+    the table grows past ``max_entries``.
+
+    Args:
+        path: SQLite database file
+        table: Table name, so several caches can share one file
+        max_entries: Rows kept before the least recently used are evicted
+        ttl: Seconds a row stays valid, or None to never expire
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        max_entries: int = 100_000,
+        ttl: Optional[float] = None,
+    ):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = Lock()
+        self._writes_since_trim = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes_since_trim += 1
+            # Counting rows on every write is wasteful; trim in batches.
+            if self._writes_since_trim >= max(self.max_entries // 100, 1):
+                self._trim()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _trim(self) -> None:
+        self._writes_since_trim = 0
+        if self.ttl is not None:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.stats.evictions += excess
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-process LRU and a persistent SQLite tier.
+
+    Vectors are keyed by model name and normalized text and stored as
+    float32, so repeated and near-identical queries (e.g. from the chat
+    rewrite loop) skip the embedding API round-trip. Only queries are
+    cached; document embeddings (built once per index) pass straight
+    through so they do not evict query vectors. The async path reads and
+    writes the SQLite tier in a worker thread.
+
+    Args:
+        underlying: The embeddings client doing the actual work
+        model_name: Name used in cache keys; defaults to ``underlying.model``
+        cache_path: SQLite file for the disk tier, or None for memory only
+        max_memory_entries: Size of the in-process LRU
+        max_disk_entries: Rows kept in the disk tier
+        flight: Coalesces concurrent misses for the same text
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        max_memory_entries: int = 2048,
+        max_disk_entries: int = 100_000,
+        flight: Optional[SingleFlight] = None,
+    ):
+        self.underlying = underlying
+        self.flight = flight or create_singleflight("embedding")
+        self.model_name = model_name or getattr(underlying, "model", type(underlying).__name__)
+        self.memory = LRUCache(max_entries=max_memory_entries)
+        self.disk = (
+            SQLiteCache(cache_path, table="embeddings", max_entries=max_disk_entries)
+            if cache_path
+            else None
+        )
+
+    @property
+    def model(self) -> str:
+        return self.model_name
+
+    def _key(self, text: str) -> str:
+        return make_key(self.model_name, normalize_text(text))
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self._lookup_disk(key)
+        return vector
+
+    def _lookup_disk(self, key: str) -> Optional[List[float]]:
+        blob = self.disk.get(key)
+        if blob is None:
+            return None
+        vector = array("f")
+        vector.frombytes(blob)
+        vector = vector.tolist()
+        self.memory.set(key, vector)
+        return vector
+
+    def _store(self, key: str, vector: List[float]) -> None:
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            self.disk.set(key, array("f", vector).tobytes())
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.flight.do(key, lambda: self._embed_and_store(key, text))
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = await asyncio.to_thread(self._lookup_disk, key)
+        if vector is None:
+            vector = await self.flight.ado(key, lambda: self._aembed_and_store(key, text))
+        return vector
+
+    def _embed_and_store(self, key: str, text: str) -> List[float]:
+        vector = self.underlying.embed_query(text)
+        self._store(key, vector)
+        return vector
+
+    async def _aembed_and_store(self, key: str, text: str) -> List[float]:
+        vector = await self.underlying.aembed_query(text)
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, array("f", vector).tobytes())
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers."""
+        memory = self.memory.stats
+        disk = self.disk.stats if self.disk is not None else CacheStats()
+        return {
+            "model": self.model_name,
+            "memory": {**memory.as_dict(), "size": len(self.memory)},
+            "disk": disk.as_dict(),
+            # Disk lookups only happen on memory misses
+            "hits": memory.hits + disk.hits,
+            "misses": disk.misses if self.disk is not None else memory.misses,
+        }
+
+
+class ExpansionCache:
+    """Persistent memo of LLM query expansions.
+
+    Expansions are deterministic at temperature 0, so they are cached per
+    (normalized query, prompt hash, model) with a TTL and LRU eviction in
+    both tiers. With ``log_queries`` on, lookups are also counted in a query
+    log, which the ``prewarm_expansions`` command uses to re-expand popular
+    queries offline. The log stores raw query text, so it is off by default;
+    counts are buffered in memory and written in batches, and the table is
+    trimmed to the ``max_logged_queries`` most frequent queries.
+
+    Args:
+        prompt_template: Expansion prompt text; part of the cache key
+        model_name: Model producing the expansions; part of the cache key
+        cache_path: SQLite file for the disk tier and query log
+        ttl: Seconds an expansion stays valid
+        max_entries: Expansions kept on disk
+        max_memory_entries: Expansions kept in the in-process LRU
+        log_queries: Count lookups in the query log
+        max_logged_queries: Queries kept in the query log
+        log_batch_size: Distinct buffered queries that trigger a log write
+    """
+
+    def __init__(
+        self,
+        prompt_template: str,
+        model_name: str,
+        cache_path: Optional[str] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 50_000,
+        max_memory_entries: int = 1024,
+        log_queries: bool = False,
+        max_logged_queries: int = 10_000,
+        log_batch_size: int = 100,
+    ):
+        self.model_name = model_name
+        self.log_queries = log_queries
+        self.max_logged_queries = max_logged_queries
+        self.log_batch_size = log_batch_size
+        self.prompt_hash = make_key(prompt_template)[:16]
+        cache_path = cache_path or os.path.join(get_cache_dir(), "expansions.sqlite3")
+        self.memory = LRUCache(max_entries=max_memory_entries, ttl=ttl)
+        self.disk = SQLiteCache(cache_path, table="expansions", max_entries=max_entries, ttl=ttl)
+        self._log_lock = Lock()
+        self._log = sqlite3.connect(cache_path, check_same_thread=False, isolation_level=None)
+        self._log.execute(
+            "CREATE TABLE IF NOT EXISTS query_log ("
+            "normalized TEXT PRIMARY KEY, query TEXT NOT NULL, "
+            "count INTEGER NOT NULL, last_seen REAL NOT NULL)"
+        )
+        # normalized query -> (query, lookups, last seen) not yet written
+        self._pending: Dict[str, Tuple[str, int, float]] = {}
+        if log_queries:
+            atexit.register(self.flush_log)
+
+    def _key(self, query: str) -> str:
+        return make_key("expansion", self.prompt_hash, self.model_name, normalize_text(query))
+
+    def get(self, query: str, record: bool = True) -> Optional[str]:
+        """Return the cached expansion for a query, logging the lookup if enabled."""
+        if record and self.log_queries:
+            self._record(query)
+        key = self._key(query)
+        expansion = self.memory.get(key)
+        if expansion is None:
+            blob = self.disk.get(key)
+            if blob is not None:
+                expansion = blob.decode("utf-8")
+                self.memory.set(key, expansion)
+        return expansion
+
+    def set(self, query: str, expansion: str) -> None:
+        key = self._key(query)
+        self.memory.set(key, expansion)
+        self.disk.set(key, expansion.encode("utf-8"))
+
+    def top_queries(self, limit: int) -> List[str]:
+        """Return the most frequently looked-up queries."""
+        self.flush_log()
+        with self._log_lock:
+            rows = self._log.execute(
+                "SELECT query FROM query_log ORDER BY count DESC, last_seen DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats.as_dict(),
+            "disk": self.disk.stats.as_dict(),
+        }
+
+    def flush_log(self) -> None:
+        """Write buffered lookup counts and trim the log to ``max_logged_queries``."""
+        with self._log_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._log.execute("BEGIN")
+            self._log.executemany(
+                "INSERT INTO query_log (normalized, query, count, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(normalized) DO UPDATE SET count = count + excluded.count, "
+                "last_seen = excluded.last_seen",
+                [(normalized, *entry) for normalized, entry in pending.items()],
+            )
+            self._log.execute(
+                "DELETE FROM query_log WHERE normalized NOT IN ("
+                "SELECT normalized FROM query_log ORDER BY count DESC, last_seen DESC LIMIT ?)",
+                (self.max_logged_queries,),
+            )
+            self._log.execute("COMMIT")
+
+    def _record(self, query: str) -> None:
+        normalized = normalize_text(query)
+        with self._log_lock:
+            first, count, _ = self._pending.get(normalized, (query, 0, 0.0))
+            self._pending[normalized] = (first, count + 1, time.time())
+            full = len(self._pending) >= self.log_batch_size
+        if full:
+            self.flush_log()
@@ -0,0 +1,427 @@
+"""Document cards: the small projection of a policy document shown in search results.
+
+Search and retrieval responses only need six fields per document, so cards
+are read with a field projection instead of whole documents (which carry
+the full ``content`` text) and kept in an in-process LRU keyed by ObjectId.
+
+Cards change when the summarizer writes a summary or the scraper updates
+an article; both call ``CardCache.invalidate`` with the changed ids. With a
+Redis URL the ids are appended to a capped Redis stream, and every worker
+drops just those cards on its next check (at most ``sync_interval``
+seconds later). Without Redis, invalidation only reaches the calling
+process, so other processes serve a changed card until its TTL expires.
+
+Searches without a query show random cards. Instead of running ``$sample``
+over the collection per request, ``RandomCardPool`` keeps a few thousand
+sampled cards in memory, redraws them in a background thread every
+``refresh_interval`` seconds, and serves selections from the pool. With a
+Redis URL, one worker per interval samples MongoDB and the others load its
+pool from Redis. A category too rare to fill a selection from the pool gets
+its own ``$match``/``$sample`` draw, cached for one refresh interval.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import date, datetime
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from .cache import LRUCache
+from .metrics import CARD_POOL_CARDS, CARD_POOL_REFRESHES, track_call
+from .mongo import get_async_collection, get_collection
+
+logger = logging.getLogger(__name__)
+
+CARD_FIELDS = ("title", "summary", "url", "date_posted", "category")
+CARD_PROJECTION = {field: 1 for field in CARD_FIELDS}
+
+
+def to_card(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Format a (projected) MongoDB document as a search result card.
+
+    Cards hold only JSON types, so a card reads the same whether it comes
+    from MongoDB, the LRU or the Redis pool.
+    """
+    date_posted = doc.get("date_posted")
+    if isinstance(date_posted, (datetime, date)):
+        date_posted = date_posted.isoformat()
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title", "Untitled"),
+        "summary": doc.get("summary", "No summary available"),
+        "url": doc.get("url", "#"),
+        "date_posted": date_posted,
+        "category": doc.get("category", "Uncategorized"),
+    }
+
+
+class CardCache:
+    """LRU of cards by document id with TTL and cross-worker invalidation.
+
+    Args:
+        max_entries: Cards kept in memory
+        ttl: Seconds a card stays valid
+        redis_url: Redis carrying invalidated ids between processes, or None
+            for this process only
+        prefix: Redis key prefix
+        sync_interval: Seconds between invalidation checks
+        max_invalidations: Invalidation messages kept in the Redis stream
+    """
+
+    STREAM_START = b"0-0"
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl: float = 600,
+        redis_url: Optional[str] = None,
+        prefix: str = "policybot:cards",
+        sync_interval: float = 5.0,
+        max_invalidations: int = 10_000,
+    ):
+        self.lru = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.client = None
+        if redis_url:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError(
+                    "Cannot import redis, please install with `pip install redis`."
+                ) from e
+            self.client = redis.Redis.from_url(redis_url)
+        self.invalidations_key = f"{prefix}:invalidations"
+        self.sync_interval = sync_interval
+        self.max_invalidations = max_invalidations
+        # Last stream entry applied; None until the first check
+        self._last_id: Optional[bytes] = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+    @staticmethod
+    def _stream_position(entry_id: bytes) -> Tuple[int, int]:
+        milliseconds, sequence = entry_id.split(b"-")
+        return int(milliseconds), int(sequence)
+
+    def _sync(self) -> None:
+        if self.client is None or time.monotonic() - self._checked_at < self.sync_interval:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                if self._last_id is None:
+                    # Cards cached from here on are newer than any past invalidation
+                    latest = self.client.xrevrange(self.invalidations_key, count=1)
+                    self._last_id = latest[0][0] if latest else self.STREAM_START
+                    return
+                oldest = self.client.xrange(self.invalidations_key, count=1)
+                read = self.client.xread({self.invalidations_key: self._last_id})
+            except Exception as e:
+                logger.warning(f"Card cache could not read invalidations: {e}")
+                return
+            entries = read[0][1] if read else []
+            if not entries:
+                return
+            if (
+                oldest
+                and self._last_id != self.STREAM_START
+                and self._stream_position(oldest[0][0]) > self._stream_position(self._last_id)
+            ):
+                # Fell behind the capped stream; some invalidations are gone
+                logger.info("Card cache missed invalidations and was cleared")
+                self.lru.clear()
+            else:
+                for _, fields in entries:
+                    ids = json.loads(fields[b"ids"])
+                    if ids is None:
+                        self.lru.clear()
+                        break
+                    for doc_id in ids:
+                        self.lru.delete(doc_id)
+            self._last_id = entries[-1][0]
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached cards for ``ids``; missing ids are absent from the result."""
+        self._sync()
+        found = {}
+        for doc_id in ids:
+            card = self.lru.get(doc_id)
+            if card is not None:
+                found[doc_id] = card
+        return found
+
+    def set_many(self, cards: Iterable[Dict[str, Any]]) -> None:
+        for card in cards:
+            self.lru.set(card["id"], card)
+
+    def invalidate(self, ids: Optional[Iterable[str]] = None) -> None:
+        """Drop ``ids`` (or every card) here and, with Redis, in all workers."""
+        if ids is None:
+            self.lru.clear()
+        else:
+            ids = [str(doc_id) for doc_id in ids]
+            if not ids:
+                return
+            for doc_id in ids:
+                self.lru.delete(doc_id)
+        if self.client is not None:
+            try:
+                self.client.xadd(
+                    self.invalidations_key,
+                    {"ids": json.dumps(ids)},
+                    maxlen=self.max_invalidations,
+                    approximate=True,
+                )
+            except Exception as e:
+                logger.warning(f"Card cache could not publish invalidation: {e}")
+
+
+class CardStore:
+    """Reads cards through the cache, projecting only card fields from MongoDB.
+
+    Args:
+        cache: Card cache; a process-local one when omitted
+        db_name: Database holding the documents
+        collection_name: Collection holding the documents
+    """
+
+    def __init__(
+        self,
+        cache: Optional[CardCache] = None,
+        db_name: str = "WTP",
+        collection_name: str = "whbriefingroom",
+    ):
+        self.cache = cache or CardCache()
+        self.db_name = db_name
+        self.collection_name = collection_name
+
+    def _order(self, ids: List[str], cards: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [cards[doc_id] for doc_id in ids if doc_id in cards]
+
+    def get_cards(self, object_ids: Sequence[ObjectId]) -> List[Dict[str, Any]]:
+        """Cards for ``object_ids`` in the given order, skipping unknown ids."""
+        ids = [str(object_id) for object_id in object_ids]
+        cards = self.cache.get_many(ids)
+        missing = [ObjectId(doc_id) for doc_id in ids if doc_id not in cards]
+        if missing:
+            collection = get_collection(self.db_name, self.collection_name)
+            with track_call("mongodb", "find_cards"):
+                fetched = [to_card(doc) for doc in collection.find({"_id": {"$in": missing}}, CARD_PROJECTION)]
+            self.cache.set_many(fetched)
+            cards.update((card["id"], card) for card in fetched)
+        return self._order(ids, cards)
+
+    async def aget_cards(self, object_ids: Sequence[ObjectId]) -> List[Dict[str, Any]]:
+        """Async version of ``get_cards``."""
+        ids = [str(object_id) for object_id in object_ids]
+        if self.cache.client is not None:
+            # The invalidation check may go to Redis
+            cards = await asyncio.to_thread(self.cache.get_many, ids)
+        else:
+            cards = self.cache.get_many(ids)
+        missing = [ObjectId(doc_id) for doc_id in ids if doc_id not in cards]
+        if missing:
+            collection = get_async_collection(self.db_name, self.collection_name)
+            with track_call("mongodb", "find_cards"):
+                documents = await collection.find({"_id": {"$in": missing}}, CARD_PROJECTION).to_list(length=None)
+            fetched = [to_card(doc) for doc in documents]
+            self.cache.set_many(fetched)
+            cards.update((card["id"], card) for card in fetched)
+        return self._order(ids, cards)
+
+
+class RandomCardPool:
+    """Pre-sampled cards for random selections, redrawn in the background.
+
+    Args:
+        pool_size: Cards drawn with ``$sample`` per refresh
+        refresh_interval: Seconds between refreshes
+        redis_url: Redis to share the pool between workers, or None to
+            sample in every process
+        prefix: Redis key prefix
+        db_name: Database holding the documents
+        collection_name: Collection holding the documents
+        category_pool_size: Cards drawn for a category the pool cannot serve
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 2000,
+        refresh_interval: float = 300,
+        redis_url: Optional[str] = None,
+        prefix: str = "policybot:cards",
+        db_name: str = "WTP",
+        collection_name: str = "whbriefingroom",
+        category_pool_size: int = 200,
+    ):
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self.category_pool_size = category_pool_size
+        # Category draws for categories the shared pool is short of
+        self._category_pools = LRUCache(max_entries=64, ttl=refresh_interval)
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.client = None
+        if redis_url:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError(
+                    "Cannot import redis, please install with `pip install redis`."
+                ) from e
+            self.client = redis.Redis.from_url(redis_url)
+        self.pool_key = f"{prefix}:pool"
+        self.lock_key = f"{prefix}:pool:lock"
+        self._cards: List[Dict[str, Any]] = []
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self._filled = False
+        self._refresh_lock = Lock()
+        self._fill_lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def _sample_collection(self) -> List[Dict[str, Any]]:
+        collection = get_collection(self.db_name, self.collection_name)
+        with track_call("mongodb", "sample_pool"):
+            documents = collection.aggregate(
+                [{"$sample": {"size": self.pool_size}}, {"$project": CARD_PROJECTION}]
+            )
+            return [to_card(doc) for doc in documents]
+
+    def _category_pipeline(self, category: str) -> List[Dict[str, Any]]:
+        return [
+            {"$match": {"category": category}},
+            {"$sample": {"size": self.category_pool_size}},
+            {"$project": CARD_PROJECTION},
+        ]
+
+    def _category_pool(self, category: str) -> List[Dict[str, Any]]:
+        cards = self._category_pools.get(category)
+        if cards is None:
+            collection = get_collection(self.db_name, self.collection_name)
+            with track_call("mongodb", "sample_category"):
+                cards = [to_card(doc) for doc in collection.aggregate(self._category_pipeline(category))]
+            self._category_pools.set(category, cards)
+        return cards
+
+    async def _acategory_pool(self, category: str) -> List[Dict[str, Any]]:
+        cards = self._category_pools.get(category)
+        if cards is None:
+            collection = get_async_collection(self.db_name, self.collection_name)
+            with track_call("mongodb", "sample_category"):
+                documents = await collection.aggregate(self._category_pipeline(category)).to_list(length=None)
+            cards = [to_card(doc) for doc in documents]
+            self._category_pools.set(category, cards)
+        return cards
+
+    def _load_shared(self, max_age: Optional[float]) -> Optional[List[Dict[str, Any]]]:
+        value = self.client.get(self.pool_key)
+        if value is None:
+            return None
+        pool = json.loads(value)
+        if max_age is not None and time.time() - pool["refreshed_at"] >= max_age:
+            return None
+        return pool["cards"]
+
+    def _draw(self) -> List[Dict[str, Any]]:
+        if self.client is None:
+            CARD_POOL_REFRESHES.inc(source="mongodb")
+            return self._sample_collection()
+
+        try:
+            cards = self._load_shared(max_age=self.refresh_interval)
+            if cards is not None:
+                CARD_POOL_REFRESHES.inc(source="redis")
+                return cards
+            if not self.client.set(self.lock_key, "1", nx=True, px=int(self.refresh_interval * 1000)):
+                # Another worker is drawing the next pool; keep serving the last one
+                cards = self._load_shared(max_age=None)
+                if cards is not None:
+                    CARD_POOL_REFRESHES.inc(source="redis")
+                    return cards
+        except Exception as e:
+            logger.warning(f"Card pool could not read the shared pool: {e}")
+
+        CARD_POOL_REFRESHES.inc(source="mongodb")
+        cards = self._sample_collection()
+        try:
+            pool = {"refreshed_at": time.time(), "cards": cards}
+            self.client.set(self.pool_key, json.dumps(pool), ex=int(self.refresh_interval * 2) + 1)
+        except Exception as e:
+            logger.warning(f"Card pool could not publish the shared pool: {e}")
+        return cards
+
+    def refresh(self) -> int:
+        """Draw a new pool and swap it in; returns its size."""
+        with self._refresh_lock:
+            cards = self._draw()
+            by_category: Dict[str, List[Dict[str, Any]]] = {}
+            for card in cards:
+                by_category.setdefault(card["category"], []).append(card)
+            # Readers see either the old or the new pool, never a partial one
+            self._cards, self._by_category = cards, by_category
+            self._filled = True
+            CARD_POOL_CARDS.set(len(cards))
+            logger.info(f"Card pool refreshed with {len(cards)} cards")
+            return len(cards)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Card pool refresh failed: {e}")
+
+    def start(self) -> None:
+        """Start the background refresh thread if it is not running."""
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="card-pool-refresh", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the background refresh thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @staticmethod
+    def _pick(cards: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+        return random.sample(cards, min(size, len(cards)))
+
+    def _select(self, size: int, category: Optional[str]) -> List[Dict[str, Any]]:
+        cards = self._cards if category is None else self._by_category.get(category, [])
+        return self._pick(cards, size)
+
+    def sample(self, size: int = 6, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Random cards from the pool, optionally only those in ``category``.
+
+        The first call in a process fills the pool and starts the refresh
+        thread; later calls only pick from memory, unless the pool holds
+        fewer than ``size`` cards of ``category``.
+        """
+        if not self._filled:
+            with self._fill_lock:
+                if not self._filled:
+                    self.refresh()
+                    self.start()
+        cards = self._select(size, category)
+        if category is not None and len(cards) < size:
+            cards = self._pick(self._category_pool(category), size)
+        return cards
+
+    async def asample(self, size: int = 6, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Async version of ``sample``; the initial fill runs in a thread."""
+        if not self._filled:
+            return await asyncio.to_thread(self.sample, size, category)
+        cards = self._select(size, category)
+        if category is not None and len(cards) < size:
+            cards = self._pick(await self._acategory_pool(category), size)
+        return cards
+
@@ -1,9 +1,10 @@
 """Chat graph implementation for conversational RAG."""
 
-from typing import Optional, Literal, AsyncGenerator, List, Dict
-from langchain_core.messages import HumanMessage, AIMessage
+from threading import Lock
+from typing import Optional, Literal, AsyncGenerator, List, Dict, Tuple
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.output_parsers import StrOutputParser
-from langchain_pinecone import PineconeVectorStore
 from langgraph.graph import MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.graph import END, START
@@ -15,18 +16,23 @@ from langchain_core.retrievers import BaseRetriever
 from langchain.tools.retriever import create_retriever_tool
 from IPython.display import Image
 from pydantic import BaseModel, Field
-from langchain.tools.retriever import RetrieverInput
+from langchain_core.tools.retriever import RetrieverInput
 from langchain_core.tools.simple import Tool
 
 import asyncio
-import json
-
+import uuid
 
+from .history import HistoryManager
+from .lexical import BM25Index
+from .metrics import RETRIEVAL_ATTEMPTS, token_usage_callback
+from .router import AGENT, DIRECT_RESPONSE, RETRIEVE, QueryRouter
+from .speculative import SpeculativeRetrieval
 from .base import (
     BaseRAGGraph,
     BaseLLMModel,
     BaseEmbeddings,
     BaseVectorStore,
+    RetrievalResult,
     VectorStoreRetriever,
     HistoryPromptTemplate,
     RewritePromptTemplate,
@@ -35,148 +41,284 @@ from .base import (
     GraderPromptTemplate,
     BasePromptTemplate
 )
-    
-class VectorStoreRetriever(BaseRetriever):
-    """Sync wrapper for vector store retrieval."""
-    
-    vector_store: PineconeVectorStore
 
-    async def _aget_relevant_documents(self, query: str) -> List[Document]:
-        """Async retrieval of relevant documents."""
-        docs = await self.vector_store.asimilarity_search(query, k=6)
-        return docs
 
-    def _get_relevant_documents(self, query: str) -> List[Document]:
-        """Sync retrieval of relevant documents."""
-        docs = self.vector_store.similarity_search(query, k=6)
-        return docs
-    
-    def get_retriever_tool(self, name: str, description: str, document_prompt: Optional[BasePromptTemplate] = None) -> Tool:
-        """Create a tool for this retriever."""
-                
-        def sync_func(query: str) -> Dict[str, any]:
-            """Sync function for retrieval."""
-            docs = self._get_relevant_documents(query)
-            doc_list = [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
-            combined_string = "\n\n".join(doc["content"] for doc in doc_list)
-            meta_data = [doc["metadata"]["id"] for doc in doc_list]
-
-            return {
-                "combined_string": combined_string,
-                "meta_data": meta_data
-            }
+class ChatState(MessagesState):
+    """Per-turn state carried through the shared chat workflow."""
+
+    chat_history: str
+    routed_to: str
+    retrieval_attempts: int
+    retrieved: RetrievalResult
+    relevant_docs: List[Document]
+    doc_ids: List[str]
 
-        async def async_func(query: str) -> Dict[str, any]:
-            """Async function for retrieval."""
-            docs = await self._aget_relevant_documents(query)
-            doc_list = [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
-            combined_string = "\n\n".join(doc["content"] for doc in doc_list)
-            meta_data = [doc["metadata"]["id"] for doc in doc_list]
-            return {
-                "combined_string": combined_string,
-                "meta_data": meta_data
-            }
-        
-        return Tool(
-            name=name,
-            description=description,
-            func=sync_func,
-            coroutine=async_func,
-            args_schema=RetrieverInput,
-        )
+
+class GradeDocument(BaseModel):
+    """Binary score for relevance check."""
+
+    binary_score: str = Field(description="Relevance score 'yes' or 'no'")
+
+
+class ChatContext:
+    """Per-connection chat data run through the shared ChatGraph.
+
+    Holds everything that used to live on a per-connection ChatGraph
+    instance, so a connection costs one small object instead of a freshly
+    compiled workflow.
+
+    Attributes:
+        session_id: Chat session this context belongs to
+        chat_history: Full conversation history of the session
+        new_chats: Messages produced since the connection opened
+        summary: Rolling summary of turns older than the history window
+        summarized_count: Number of ``chat_history`` messages in ``summary``
+        summary_task: Background summary update, if one is running
+        history_loader: Loads older stored messages on demand, if any; needs
+            ``has_more`` and an async ``older(limit)``
+    """
+
+    __slots__ = (
+        "session_id",
+        "chat_history",
+        "new_chats",
+        "summary",
+        "summarized_count",
+        "summary_task",
+        "history_loader",
+    )
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        chat_history: Optional[ChatMessageHistory] = None,
+        history_loader=None,
+    ):
+        self.session_id = session_id
+        self.chat_history = chat_history if chat_history is not None else ChatMessageHistory()
+        self.new_chats: List[BaseMessage] = []
+        self.summary = ""
+        self.summarized_count = 0
+        self.summary_task: Optional[asyncio.Task] = None
+        self.history_loader = history_loader
+
+
+def get_retriever_tool(retriever: VectorStoreRetriever, name: str, description: str) -> Tool:
+    """Create a search tool whose artifact is the typed ``RetrievalResult``.
+
+    The model sees the combined chunk text as the tool output; graph nodes
+    read documents, ids and scores from ``ToolMessage.artifact``.
+    """
+
+    def sync_func(query: str) -> Tuple[str, RetrievalResult]:
+        """Sync function for retrieval."""
+        result = retriever.retrieve(query)
+        return result.combined_string, result
+
+    async def async_func(query: str) -> Tuple[str, RetrievalResult]:
+        """Async function for retrieval."""
+        result = await retriever.aretrieve(query)
+        return result.combined_string, result
+
+    return Tool(
+        name=name,
+        description=description,
+        func=sync_func,
+        coroutine=async_func,
+        args_schema=RetrieverInput,
+        response_format="content_and_artifact",
+    )
 
 class ChatGraph(BaseRAGGraph):
-    """Handles conversational RAG with history."""
+    """Singleton conversational RAG graph shared by every chat session.
+
+    The workflow is compiled once per process. All per-session and per-turn
+    data (chat history, retrieval attempts, cited document ids) travels in
+    ``ChatState`` and the caller's ``ChatContext``. Each turn that is not
+    plain small talk also starts a ``SpeculativeRetrieval`` for the raw
+    question, passed to the nodes through the run config; it is cancelled
+    as soon as the turn is routed to a direct response.
+    """
+
+    _instance = None
+    _lock = Lock()
+    graph_name = "chat"
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
 
     def __init__(
         self,
         model: Optional[BaseLLMModel] = None,
         embeddings: Optional[BaseEmbeddings] = None,
         vector_store: Optional[BaseVectorStore] = None,
-        chat_history: ChatMessageHistory = ChatMessageHistory(),
+        lexical_index: Optional[BM25Index] = None,
         history_prompt: Optional[HistoryPromptTemplate] = None,
         rewrite_prompt: Optional[RewritePromptTemplate] = None,
         generate_prompt: Optional[GenerateAnswerPromptTemplate] = None,
+        router: Optional[QueryRouter] = None,
+        history_manager: Optional[HistoryManager] = None,
     ):
-        super().__init__(model, embeddings, vector_store)
-        self.chat_history = chat_history
-        
-        # Create async retriever
-        async_retriever = VectorStoreRetriever(vector_store=self.vector_store)
-        self.retrieve_tool = async_retriever.get_retriever_tool(
+        if not hasattr(self, "_initialized"):
+            super().__init__(model, embeddings, vector_store, lexical_index)
+
+            self.retrieve_tool = get_retriever_tool(
+                self.retriever,
                 name="search_documents",
-                description="Search through documents to find relevant information"
+                description="Search through documents to find relevant information",
             )
-        
-        self.old_retrieve_tool = create_retriever_tool(
-            retriever=async_retriever,
-            name="search_documents",
-            description="Retrieves relevant documents and their metadata",
-        )
+            self.tool_node = ToolNode([self.retrieve_tool])
 
-        self.history_prompt = HistoryPromptTemplate().get_prompt_template()
-        self.rewrite_prompt = RewritePromptTemplate().get_prompt_template()
-        self.generate_prompt = GenerateAnswerPromptTemplate().get_prompt_template()
-        self.direct_response_prompt = DirectResponsePromptTemplate().get_prompt_template()
-        self.grader_prompt = GraderPromptTemplate().get_prompt_template()
-        self.max_retrieval_attempts = 3
-        self.retrieval_attempts = 0
-        self.doc_ids = []
-        self.graph = self._setup_workflow()
-        self.new_chats = []
-        
-    def _update_new_chats(self, chat: HumanMessage or AIMessage):
-        """Update the chat history."""
-        self.new_chats.append(chat)
-        
-    async def _history(self, state):
-        """Process chat history for context."""
-        chain = self.history_prompt | self.llm
+            self.history_prompt = (history_prompt or HistoryPromptTemplate()).get_prompt_template()
+            # Bounded history window: recent turns plus a rolling summary
+            self.history_manager = history_manager or HistoryManager(self.llm)
+            self.rewrite_prompt = (rewrite_prompt or RewritePromptTemplate()).get_prompt_template()
+            self.generate_prompt = (generate_prompt or GenerateAnswerPromptTemplate()).get_prompt_template()
+            self.direct_response_prompt = DirectResponsePromptTemplate().get_prompt_template()
+            self.grader_prompt = GraderPromptTemplate().get_prompt_template()
+            # Local routing skips the agent LLM call for obvious questions
+            self.router = router or QueryRouter()
+            self.grader_chain = self.grader_prompt | self.llm.with_structured_output(GradeDocument)
+            self.max_retrieval_attempts = 3
+            # Grading stops once this many relevant chunks have been found
+            self.min_relevant_docs = 3
+            self.graph = self._setup_workflow()
+            self._initialized = True
+
+    async def _history(self, state: ChatState):
+        """Reformulate the question against the history window.
+
+        The first question of a session is passed through unchanged, without
+        a model call.
+        """
         messages = state["messages"]
         question = messages[0].content
         assert question == messages[-1].content
-        response = await chain.ainvoke({"chat_history": self.chat_history, "question": question})
-        self.chat_history.add_user_message(response.content)
+        chat_history = state.get("chat_history", "")
+        if not chat_history:
+            return {"messages": [AIMessage(content=question)]}
+        chain = self.history_prompt | self.llm
+        response = await chain.ainvoke({"chat_history": chat_history, "question": question})
         return {"messages": [response]}
 
-    async def _grade_documents(self, state) -> Literal["rewrite", "generate", "direct_response"]:
-        """Grade document relevance."""
-        # Data model
-        self.retrieval_attempts += 1
-                
-        class grade(BaseModel):
-            """Binary score for relevance check."""
-            binary_score: str = Field(description="Relevance score 'yes' or 'no'")
-
-        # Invoke chain
-        llm_with_tool = self.llm.with_structured_output(grade)
-        chain = self.grader_prompt | llm_with_tool
-        messages = state["messages"]
-        last_message = messages[-1].content
-        question = messages[1].content
-        # Parse the string content into a dictionary
-        content_dict = json.loads(last_message.replace("'", '"'))
-        docs = content_dict["combined_string"]
-        metadata = content_dict["meta_data"]
-        
-        scored_result = await chain.ainvoke({"question": question, "context": docs})
-        score = scored_result.binary_score
-        if score == "yes":
+    async def _retrieve(self, state: ChatState, config: RunnableConfig):
+        """Run the retrieval tool and count the attempt.
+
+        The speculative retrieval started with the turn is reused instead
+        when the agent searches for (nearly) the raw user question.
+        """
+        speculative = self._speculative(config)
+        tool_calls = state["messages"][-1].tool_calls
+        messages = None
+        if speculative is not None:
+            if len(tool_calls) == 1:
+                call = tool_calls[0]
+                result = await speculative.take(call["args"].get("query", ""))
+                if result is not None:
+                    messages = [
+                        ToolMessage(
+                            content=result.combined_string,
+                            artifact=result,
+                            tool_call_id=call["id"],
+                            name=call["name"],
+                        )
+                    ]
+            else:
+                speculative.cancel()
+        if messages is None:
+            messages = (await self.tool_node.ainvoke(state, config))["messages"]
+
+        retrieved = RetrievalResult()
+        for message in messages:
+            # Tool errors come back as plain ToolMessages without an artifact
+            if isinstance(message.artifact, RetrievalResult):
+                retrieved.documents.extend(message.artifact.documents)
+                retrieved.scores.extend(message.artifact.scores)
+        return {
+            "messages": messages,
+            "retrieved": retrieved,
+            "retrieval_attempts": state.get("retrieval_attempts", 0) + 1,
+        }
+
+    async def _grade_document(self, question: str, index: int, doc: Document):
+        """Grade one retrieved chunk; returns (index, relevant)."""
+        result = await self.grader_chain.ainvoke({"question": question, "context": doc.page_content})
+        return index, result.binary_score.strip().lower() == "yes"
+
+    async def _grade_documents(self, state: ChatState):
+        """Grade each retrieved chunk concurrently and keep the relevant ones.
+
+        Grading stops as soon as ``min_relevant_docs`` chunks pass; the
+        remaining grader calls are cancelled.
+        """
+        question = state["messages"][1].content
+        docs = state["retrieved"].documents
+        tasks = [
+            asyncio.create_task(self._grade_document(question, index, doc))
+            for index, doc in enumerate(docs)
+        ]
+        relevant = []
+        try:
+            for next_graded in asyncio.as_completed(tasks):
+                index, is_relevant = await next_graded
+                if is_relevant:
+                    relevant.append(index)
+                    if len(relevant) >= self.min_relevant_docs:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+        # Keep retrieval order for the generation prompt
+        return {"relevant_docs": [docs[index] for index in sorted(relevant)]}
+
+    def _route_graded(self, state: ChatState) -> Literal["rewrite", "generate", "direct_response"]:
+        """Route on the grading outcome."""
+        if state.get("relevant_docs"):
             return "generate"
-        elif score == "no" and self.retrieval_attempts + 1 == self.max_retrieval_attempts:
+        if state["retrieval_attempts"] + 1 >= self.max_retrieval_attempts:
             return "direct_response"
-        else:
-            return "rewrite"
+        return "rewrite"
+
+    @staticmethod
+    def _speculative(config: RunnableConfig) -> Optional[SpeculativeRetrieval]:
+        return config.get("configurable", {}).get("speculative_retrieval")
 
-    async def _agent(self, state):
+    def _route(self, state: ChatState, config: RunnableConfig):
+        """Route the reformulated question locally, deferring to the agent when unsure."""
+        question = state["messages"][1].content
+        decision = self.router.route(question)
+        if decision.route != RETRIEVE:
+            if decision.route == DIRECT_RESPONSE and (speculative := self._speculative(config)):
+                speculative.cancel()
+            return {"routed_to": decision.route}
+        # Same shape as an agent tool call so the retrieve node is unchanged
+        tool_call = {
+            "name": self.retrieve_tool.name,
+            "args": {"query": question},
+            "id": f"route_{uuid.uuid4().hex}",
+            "type": "tool_call",
+        }
+        return {"routed_to": RETRIEVE, "messages": [AIMessage(content="", tool_calls=[tool_call])]}
+
+    async def _agent(self, state: ChatState, config: RunnableConfig):
         """Decide whether to retrieve or respond."""
         llm_with_tools = self.llm.bind_tools([self.retrieve_tool])
-        print("Input: ", state["messages"])
         response = await llm_with_tools.ainvoke(state["messages"])
-        print("Output: ", response)
+        if not response.tool_calls and (speculative := self._speculative(config)):
+            speculative.cancel()
+        if not state.get("retrieval_attempts"):
+            # First-pass agent decisions label the router's training data
+            self.router.record_agent_decision(
+                state["messages"][1].content,
+                RETRIEVE if response.tool_calls else DIRECT_RESPONSE,
+            )
         return {"messages": [response]}
 
-    async def _rewrite(self, state):
+    async def _rewrite(self, state: ChatState):
         """Rewrite the query for better retrieval."""
         messages = state["messages"]
         question = messages[1].content
@@ -184,32 +326,19 @@ class ChatGraph(BaseRAGGraph):
         response = await chain.ainvoke(question)
         return {"messages": [response]}
 
-    async def _generate(self, state):
+    async def _generate(self, state: ChatState):
         """Generate answer."""
         messages = state["messages"]
-        recent_tool_messages = []
-        for message in reversed(state["messages"]):
-            if message.type == "tool":
-                recent_tool_messages.append(message)
-            else:
-                break
-        tool_messages = recent_tool_messages[::-1]
-
-        # Format into prompt --> adds former messages from graph
-        doc_ids = []
-        docs = ""
-        for message in tool_messages:
-            content_dict = json.loads(message.content.replace("'", '"'))
-            docs += content_dict["combined_string"]
-            doc_ids.extend(content_dict["meta_data"])
+        relevant_docs = state["relevant_docs"]
+        docs = "\n\n".join(doc.page_content for doc in relevant_docs)
+        doc_ids = [doc.metadata["id"] for doc in relevant_docs]
         question = messages[1].content 
         gen_chain = self.generate_prompt | self.llm | StrOutputParser()
-        self.doc_ids = doc_ids
 
         response = await gen_chain.ainvoke({"context": docs, "question": question})
-        return {"messages": [response]}
+        return {"messages": [response], "doc_ids": doc_ids}
     
-    async def _direct_response(self, state):
+    async def _direct_response(self, state: ChatState):
         """Generate a highly constrained response when not using tools."""        
         messages = state["messages"]
         question = messages[0].content
@@ -221,19 +350,29 @@ class ChatGraph(BaseRAGGraph):
 
     def _setup_workflow(self) -> StateGraph:
         """Set up the chat workflow."""
-        workflow = StateGraph(MessagesState)
-        tools = ToolNode([self.retrieve_tool])
+        workflow = StateGraph(ChatState)
 
         # Add nodes
-        workflow.add_node("history", self._history)
-        workflow.add_node("agent", self._agent)  # agent
-        workflow.add_node("retrieve", tools)  # retrieval
-        workflow.add_node("rewrite", self._rewrite) # Re-writing the question
-        workflow.add_node("generate", self._generate) # generate answer
-        workflow.add_node("direct_response", self._direct_response) # direct response for irrelevant question
+        workflow.add_node("history", self._node("history", self._history))
+        workflow.add_node("route", self._node("route", self._route))  # local routing
+        workflow.add_node("agent", self._node("agent", self._agent))  # agent
+        workflow.add_node("retrieve", self._node("retrieve", self._retrieve))  # retrieval
+        workflow.add_node("grade_documents", self._node("grade_documents", self._grade_documents))  # per-chunk relevance
+        workflow.add_node("rewrite", self._node("rewrite", self._rewrite)) # Re-writing the question
+        workflow.add_node("generate", self._node("generate", self._generate)) # generate answer
+        workflow.add_node("direct_response", self._node("direct_response", self._direct_response)) # direct response for irrelevant question
 
         workflow.add_edge(START, "history")
-        workflow.add_edge("history", "agent")
+        workflow.add_edge("history", "route")
+        workflow.add_conditional_edges(
+            "route",
+            lambda state: state["routed_to"],
+            {
+                AGENT: "agent",
+                RETRIEVE: "retrieve",
+                DIRECT_RESPONSE: "direct_response",
+            },
+        )
 
         # Decide whether to retrieve
         workflow.add_conditional_edges(
@@ -246,9 +385,10 @@ class ChatGraph(BaseRAGGraph):
                 END: "direct_response",
             },
         )
+        workflow.add_edge("retrieve", "grade_documents")
         workflow.add_conditional_edges(
-            "retrieve",
-            self._grade_documents,
+            "grade_documents",
+            self._route_graded,
             {
                 "rewrite": "rewrite",
                 "generate": "generate",
@@ -266,40 +406,80 @@ class ChatGraph(BaseRAGGraph):
     def get_compiled_graph(self):
         return self.graph
     
-    def get_new_chats(self):
-        return self.new_chats
-    
     def display(self):
         """Override string representation to display graph visualization."""
         return Image(self.get_compiled_graph().get_graph(xray=True).draw_mermaid_png())
 
-    def process_query_test(self, query: str):
-        """Synchronous query processing - mainly for testing."""
-        self.retrieval_attempts = 0
-        inputs = {"messages": [HumanMessage(content=query)], "metadata" : []}
-        for msg, metadata in self.graph.stream(inputs, stream_mode="messages"):
+    def _initial_state(self, query: str, context: ChatContext) -> ChatState:
+        """Build the input state for one turn of a session."""
+        return {
+            "messages": [HumanMessage(content=query)],
+            "chat_history": self.history_manager.window(context),
+            "routed_to": AGENT,
+            "retrieval_attempts": 0,
+            "retrieved": RetrievalResult(),
+            "relevant_docs": [],
+            "doc_ids": [],
+        }
+
+    async def process_query_test(self, query: str, context: Optional[ChatContext] = None):
+        """Query processing without session bookkeeping - mainly for testing."""
+        inputs = self._initial_state(query, context or ChatContext())
+        async for msg, metadata in self.graph.astream(inputs, stream_mode="messages"):
             if (msg.content and metadata["langgraph_node"] == "generate"):
                 print(msg.content, flush=True)
 
-    async def process_query_async(self, query: str) -> AsyncGenerator[dict, None]:
-        """Asynchronously process a query and stream responses."""
-        self.retrieval_attempts = 0
-        self._update_new_chats(HumanMessage(content=query))
+    async def process_query_async(self, query: str, context: ChatContext) -> AsyncGenerator[dict, None]:
+        """Asynchronously process a query for a session and stream responses.
+
+        Args:
+            query: The user's question
+            context: Per-connection chat data; its history and new chats
+                are updated once the turn completes
+        """
+        context.new_chats.append(HumanMessage(content=query))
         final_response = ""
-        inputs = {"messages": [HumanMessage(content=query)], "metadata" : []}
+        await self.history_manager.ensure_history(context)
+        inputs = self._initial_state(query, context)
+        # The raw question is kept; reformulations only live in this turn's state
+        context.chat_history.add_user_message(query)
         last_node = None
-        docs_metadata = []
-        async for msg, metadata in self.graph.astream(inputs, stream_mode="messages"):
-            cur_node = metadata["langgraph_node"]
-            if cur_node != last_node:
-                yield {"type": "step", "step": cur_node}
-                last_node = cur_node
-            if msg.content and metadata["langgraph_node"] == "generate" or metadata["langgraph_node"] == "direct_response":
-                yield {"type": "chunk", "chunk": msg.content}
-                final_response += msg.content
-                await asyncio.sleep(0.1)
-        if self.doc_ids:
-            yield {"type": "metadata", "metadata": self.doc_ids}
-        final_response = AIMessage(content=final_response, additional_kwargs={"metadata": docs_metadata})
-        self._update_new_chats(final_response)
-        self.chat_history.add_ai_message(final_response)
+        doc_ids = []
+        # Start retrieving for the raw question while history and the agent
+        # run, unless the rules will answer it directly
+        speculative = SpeculativeRetrieval(query, self.retriever.aretrieve)
+        if not self.router.is_small_talk(query):
+            speculative.start()
+        config = {
+            "configurable": {"speculative_retrieval": speculative},
+            "callbacks": [token_usage_callback],
+        }
+        retrieval_attempts = 0
+        try:
+            async for mode, data in self.graph.astream(
+                inputs, config, stream_mode=["messages", "updates"]
+            ):
+                if mode == "updates":
+                    for node, update in data.items():
+                        if node == "generate":
+                            doc_ids = update.get("doc_ids", [])
+                        elif node == "retrieve":
+                            retrieval_attempts = update["retrieval_attempts"]
+                    continue
+                msg, metadata = data
+                cur_node = metadata["langgraph_node"]
+                if cur_node != last_node:
+                    yield {"type": "step", "step": cur_node}
+                    last_node = cur_node
+                if msg.content and metadata["langgraph_node"] == "generate" or metadata["langgraph_node"] == "direct_response":
+                    yield {"type": "chunk", "chunk": msg.content}
+                    final_response += msg.content
+        finally:
+            speculative.cancel()
+            RETRIEVAL_ATTEMPTS.observe(retrieval_attempts, graph=self.graph_name)
+        if doc_ids:
+            yield {"type": "metadata", "metadata": doc_ids}
+        final_response = AIMessage(content=final_response, additional_kwargs={"metadata": doc_ids})
+        context.new_chats.append(final_response)
+        context.chat_history.add_ai_message(final_response)
+        self.history_manager.schedule_update(context)
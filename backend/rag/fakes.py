@@ -0,0 +1,337 @@
+"""Deterministic offline stand-ins for the LLM, embeddings and vector store.
+
+Used by the benchmark suite (and tests) to run ``ChatGraph`` and
+``SearchGraph`` without OpenAI or Pinecone. Each fake waits for a latency
+drawn from a configurable, seeded distribution, so runs are repeatable and
+the graph's own overhead can be separated from provider time.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.vectorstores import VectorStore
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from .base import BaseEmbeddings, BaseLLMModel, BaseRAGGraph, BaseVectorStore
+
+FILLER_WORDS = (
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+)
+
+
+@dataclass(frozen=True)
+class Latency:
+    """A latency distribution in seconds.
+
+    Args:
+        mean: Mean latency
+        jitter: Spread; the standard deviation for ``normal`` and
+            ``lognormal``, half-width for ``uniform``
+        distribution: ``constant``, ``uniform``, ``normal`` or ``lognormal``
+    """
+
+    mean: float = 0.0
+    jitter: float = 0.0
+    distribution: str = "lognormal"
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.jitter <= 0 or self.distribution == "constant":
+            return self.mean
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.mean - self.jitter, self.mean + self.jitter))
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(self.mean, self.jitter))
+        # Log-normal with the requested mean and standard deviation
+        sigma2 = np.log(1 + (self.jitter / self.mean) ** 2)
+        return rng.lognormvariate(np.log(self.mean) - sigma2 / 2, np.sqrt(sigma2))
+
+
+class _SeededSampler:
+    """Thread-safe latency sampling from one seeded generator."""
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self._lock = Lock()
+
+    def sample(self, latency: Latency) -> float:
+        with self._lock:
+            return latency.sample(self._rng)
+
+
+def mark_environment_offline() -> None:
+    """Skip API key checks and LangSmith tracing for offline graph runs."""
+    with BaseRAGGraph._environment_lock:
+        BaseRAGGraph._environment_loaded = True
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model producing filler text at a configurable streaming rate.
+
+    With tools bound it always calls the first tool with the last message
+    as the query; structured output fills every field with ``"yes"``.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    first_token_latency: Latency = Field(default_factory=Latency)
+    tokens_per_second: float = 0.0
+    answer_tokens: int = 40
+    seed: int = 0
+    _sampler: _SeededSampler = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._sampler = _SeededSampler(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def model_name(self) -> str:
+        return "fake-chat"
+
+    def get_num_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        seed = int(hashlib.sha256(str(messages[-1].content).encode("utf-8")).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        return [rng.choice(FILLER_WORDS) + " " for _ in range(self.answer_tokens)]
+
+    def _message(self, messages: List[BaseMessage], tools: Optional[list]) -> AIMessage:
+        if tools:
+            name = tools[0]["function"]["name"]
+            call = {"name": name, "args": {"query": str(messages[-1].content)}, "id": f"call_{name}"}
+            return AIMessage(content="", tool_calls=[call])
+        return AIMessage(content="".join(self._tokens(messages)).strip())
+
+    def _usage(self, messages: List[BaseMessage], output: str) -> dict:
+        input_tokens = sum(len(str(m.content).split()) for m in messages)
+        output_tokens = len(output.split())
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._message(messages, kwargs.get("tools"))
+        time.sleep(self._sampler.sample(self.first_token_latency) + self._token_delay() * len(message.content.split()))
+        message.usage_metadata = self._usage(messages, message.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._message(messages, kwargs.get("tools"))
+        await asyncio.sleep(self._sampler.sample(self.first_token_latency) + self._token_delay() * len(message.content.split()))
+        message.usage_metadata = self._usage(messages, message.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ):
+        tools = kwargs.get("tools")
+        await asyncio.sleep(self._sampler.sample(self.first_token_latency))
+        if tools:
+            message = self._message(messages, tools)
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}
+                        for call in message.tool_calls
+                    ],
+                )
+            )
+            return
+        delay = self._token_delay()
+        tokens = self._tokens(messages)
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=self._usage(messages, "".join(tokens)))
+        )
+
+    def bind_tools(self, tools: Iterable, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        def answer() -> Any:
+            return schema.model_validate({name: "yes" for name in schema.model_fields})
+
+        def invoke(inputs):
+            time.sleep(self._sampler.sample(self.first_token_latency))
+            return answer()
+
+        async def ainvoke(inputs):
+            await asyncio.sleep(self._sampler.sample(self.first_token_latency))
+            return answer()
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+
+class FakeEmbeddings(Embeddings):
+    """Hash-seeded unit vectors with a simulated request latency."""
+
+    def __init__(self, size: int = 64, latency: Latency = Latency(), seed: int = 0):
+        self.size = size
+        self.latency = latency
+        self.model = "fake-embeddings"
+        self._sampler = _SeededSampler(seed)
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._sampler.sample(self.latency))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._sampler.sample(self.latency))
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._sampler.sample(self.latency))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self._sampler.sample(self.latency))
+        return self._vector(text)
+
+
+class FakeVectorStore(VectorStore):
+    """Returns ``k`` synthetic policy chunks per query after a simulated delay.
+
+    Results are chosen deterministically from the query text, so repeated
+    queries return the same documents.
+    """
+
+    def __init__(self, embedding: Embeddings, num_documents: int = 1000, latency: Latency = Latency(), seed: int = 0):
+        self.embedding = embedding
+        self.latency = latency
+        self.documents = [
+            Document(
+                page_content=f"Policy document {i}: " + " ".join(FILLER_WORDS[(i + j) % len(FILLER_WORDS)] for j in range(60)),
+                metadata={"id": f"doc-{i}"},
+            )
+            for i in range(num_documents)
+        ]
+        self._sampler = _SeededSampler(seed)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _results(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        rng = random.Random(hashlib.sha256(query.encode("utf-8")).hexdigest())
+        picked = rng.sample(range(len(self.documents)), min(k, len(self.documents)))
+        return [(self.documents[i], 1.0 - rank * 0.01) for rank, i in enumerate(picked)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        time.sleep(self._sampler.sample(self.latency))
+        return self._results(query, k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        await asyncio.sleep(self._sampler.sample(self.latency))
+        return self._results(query, k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("FakeVectorStore is read-only")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("FakeVectorStore is read-only")
+
+
+class FakeLLMModel(BaseLLMModel):
+    """Provider for ``FakeChatModel``."""
+
+    def __init__(self, first_token_latency: Latency = Latency(), tokens_per_second: float = 0.0, answer_tokens: int = 40, seed: int = 0):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.seed = seed
+
+    def get_model(self) -> FakeChatModel:
+        return FakeChatModel(
+            first_token_latency=self.first_token_latency,
+            tokens_per_second=self.tokens_per_second,
+            answer_tokens=self.answer_tokens,
+            seed=self.seed,
+        )
+
+
+class FakeEmbeddingsModel(BaseEmbeddings):
+    """Provider for ``FakeEmbeddings``."""
+
+    def __init__(self, size: int = 64, latency: Latency = Latency(), seed: int = 0):
+        self.size = size
+        self.latency = latency
+        self.seed = seed
+
+    def get_embeddings(self) -> FakeEmbeddings:
+        return FakeEmbeddings(self.size, self.latency, self.seed)
+
+
+class FakeVectorStoreModel(BaseVectorStore):
+    """Provider for ``FakeVectorStore``."""
+
+    def __init__(self, embeddings, num_documents: int = 1000, latency: Latency = Latency(), seed: int = 0):
+        super().__init__(embeddings)
+        self.embeddings = embeddings
+        self.num_documents = num_documents
+        self.latency = latency
+        self.seed = seed
+
+    def _validate_embedding_compatibility(self, embedding) -> None:
+        return None
+
+    def get_vector_store(self) -> FakeVectorStore:
+        return FakeVectorStore(self.embeddings, self.num_documents, self.latency, self.seed)
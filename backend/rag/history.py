@@ -0,0 +1,138 @@
+"""Token-budgeted chat history for the chat graph's history node."""
+
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+
+from .base import HistorySummaryPromptTemplate
+from .rate_limit import Priority, rate_priority
+
+logger = logging.getLogger(__name__)
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class HistoryManager:
+    """Builds a bounded history window and keeps a rolling summary.
+
+    The window holds a summary of older turns plus the most recent
+    ``max_recent_turns`` turns verbatim, trimmed from the oldest side to fit
+    ``token_budget``. After each answer, turns that fell out of the verbatim
+    window are folded into the session summary by a background task, so the
+    summary call never delays a response.
+
+    Args:
+        llm: Chat model used for summarization
+        max_recent_turns: Human/AI exchanges kept verbatim
+        token_budget: Token budget for the whole window
+        count_tokens: Token counter; defaults to the model's tokenizer
+    """
+
+    def __init__(
+        self,
+        llm,
+        max_recent_turns: int = 3,
+        token_budget: int = 1500,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        self.max_recent_turns = max_recent_turns
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or self._model_token_counter(llm)
+        self.summary_chain = (
+            HistorySummaryPromptTemplate().get_prompt_template() | llm | StrOutputParser()
+        )
+
+    @staticmethod
+    def _model_token_counter(llm) -> Callable[[str], int]:
+        def count(text: str) -> int:
+            try:
+                return llm.get_num_tokens(text)
+            except Exception:
+                return approximate_tokens(text)
+
+        return count
+
+    def is_empty(self, context) -> bool:
+        return not context.summary and not context.chat_history.messages
+
+    async def ensure_history(self, context) -> None:
+        """Load older stored turns when the loaded ones cannot fill the window.
+
+        Only done before the first summary exists, so summarized message
+        positions never shift.
+        """
+        loader = context.history_loader
+        needed = 2 * self.max_recent_turns - len(context.chat_history.messages)
+        if loader is None or not loader.has_more or needed <= 0:
+            return
+        if context.summary or context.summarized_count or context.summary_task is not None:
+            return
+        older = await loader.older(needed)
+        context.chat_history.messages[:0] = older
+
+    def window(self, context) -> str:
+        """Summary plus recent turns, within the token budget."""
+        messages = context.chat_history.messages
+        summary = f"Summary of the earlier conversation: {context.summary}" if context.summary else ""
+        budget = self.token_budget - (self.count_tokens(summary) if summary else 0)
+
+        recent: List[BaseMessage] = []
+        start = max(context.summarized_count, len(messages) - 2 * self.max_recent_turns)
+        for message in reversed(messages[start:]):
+            cost = self.count_tokens(get_buffer_string([message]))
+            if cost > budget:
+                break
+            recent.append(message)
+            budget -= cost
+        recent.reverse()
+
+        parts = [summary] if summary else []
+        if recent:
+            parts.append(get_buffer_string(recent))
+        return "\n\n".join(parts)
+
+    def _pending(self, context) -> Tuple[int, List[BaseMessage]]:
+        """Messages that left the verbatim window but are not yet summarized."""
+        messages = context.chat_history.messages
+        cutoff = len(messages) - 2 * self.max_recent_turns
+        if cutoff <= context.summarized_count:
+            return context.summarized_count, []
+        return cutoff, messages[context.summarized_count:cutoff]
+
+    async def update_summary(self, context) -> None:
+        """Fold turns that left the verbatim window into the summary."""
+        cutoff, pending = self._pending(context)
+        if not pending:
+            return
+        # Summaries are off the answer path, so they queue behind chat turns
+        with rate_priority(Priority.BACKGROUND):
+            summary = await self.summary_chain.ainvoke(
+                {"summary": context.summary or "(none)", "new_lines": get_buffer_string(pending)}
+            )
+        context.summary = summary.strip()
+        context.summarized_count = cutoff
+
+    def schedule_update(self, context) -> None:
+        """Update the summary in the background after a turn completes.
+
+        Updates for one session run one at a time; a new request while one
+        is running simply runs after it and picks up any further turns.
+        """
+        previous = context.summary_task
+
+        async def run():
+            if previous is not None and not previous.done():
+                await asyncio.gather(previous, return_exceptions=True)
+            try:
+                await self.update_summary(context)
+            except Exception as e:
+                logger.warning(f"History summary update failed for session {context.session_id}: {e}")
+
+        if self._pending(context)[1]:
+            context.summary_task = asyncio.create_task(run())
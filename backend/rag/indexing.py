@@ -0,0 +1,70 @@
+"""Chunking shared by the offline index builders.
+
+Mirrors ``rag_notebooks/indexing_pinecone.ipynb`` so local indexes hold
+the same chunks as the Pinecone index.
+"""
+
+import os
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def split_policy_documents(
+    docs: List[Document], chunk_size: int = 1000, chunk_overlap: int = 200
+) -> List[Document]:
+    """Split loaded briefing room documents into indexed chunks.
+
+    Each chunk carries the document's title, date and category in its text
+    and keeps the remaining metadata (database, collection, id) used to look
+    the full document up in MongoDB.
+
+    Args:
+        docs: Documents from ``WhBriefingRoomLoader``
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared between neighbouring chunks
+
+    Returns:
+        List[Document]: Chunks ready to embed
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    chunks = []
+    for doc in docs:
+        metadata_str = (
+            f"Title: {doc.metadata['title']} "
+            f"Date Posted: {doc.metadata['date_posted']} "
+            f"Category: {doc.metadata['category']}"
+        )
+        metadata = {
+            key: value
+            for key, value in doc.metadata.items()
+            if key not in ["title", "date_posted", "category"]
+        }
+        for chunk in splitter.split_text(doc.page_content):
+            chunks.append(
+                Document(page_content=f"{chunk} {metadata_str}", metadata=dict(metadata))
+            )
+    return chunks
+
+
+def load_policy_chunks(limit: Optional[int] = None) -> List[Document]:
+    """Load the briefing room collection from MongoDB and split it.
+
+    Args:
+        limit: Only return the first ``limit`` chunks
+
+    Returns:
+        List[Document]: Chunks ready to index
+    """
+    from etl.scrapers.whbriefingroom_loader import WhBriefingRoomLoader
+
+    loader = WhBriefingRoomLoader(
+        connection_string=os.getenv("MONGO_CONNECTION_STRING"),
+        db_name="WTP",
+        collection_name="whbriefingroom",
+    )
+    chunks = split_policy_documents(loader.load())
+    return chunks[:limit] if limit else chunks
@@ -0,0 +1,147 @@
+"""BM25 inverted index over the policy document chunks.
+
+Dense retrieval blurs exact identifiers such as bill numbers, executive
+order numbers and agency acronyms; a lexical index matches them directly.
+The index is built offline from the same chunks as the vector index and
+persisted as:
+
+- ``bm25_vocabulary.json``: term -> [postings start, document frequency]
+- ``bm25_postings.npy``: chunk rows for every term, grouped by term
+- ``bm25_frequencies.npy``: term frequency for each posting
+- ``bm25_lengths.npy``: token count of every chunk
+- ``documents.jsonl`` / ``offsets.npy``: chunk text and metadata
+"""
+
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .local_store import DocumentFile, save_array, top_k
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY = "bm25_vocabulary.json"
+POSTINGS = "bm25_postings.npy"
+FREQUENCIES = "bm25_frequencies.npy"
+LENGTHS = "bm25_lengths.npy"
+
+# Keeps identifiers like "h.r.1234", "14067" and "covid-19" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their "
+    "this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; compound identifiers also yield their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[.\-/]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over memory-mapped postings.
+
+    Args:
+        path: Index directory
+        k1: Term frequency saturation
+        b: Document length normalization
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(path, VOCABULARY)) as f:
+            self.vocabulary: Dict[str, Tuple[int, int]] = json.load(f)
+        self._postings = np.load(os.path.join(path, POSTINGS), mmap_mode="r")
+        self._frequencies = np.load(os.path.join(path, FREQUENCIES), mmap_mode="r")
+        self._lengths = np.load(os.path.join(path, LENGTHS))
+        self._average_length = float(self._lengths.mean()) if len(self._lengths) else 0.0
+        self._documents = DocumentFile(path)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @classmethod
+    def build(cls, path: str, documents: List[Document], **kwargs) -> "BM25Index":
+        """Tokenize ``documents`` and write a new index to ``path``."""
+        if os.path.exists(os.path.join(path, VOCABULARY)):
+            raise ValueError(f"{path} already holds an index; build into an empty directory")
+        os.makedirs(path, exist_ok=True)
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(documents), dtype=np.int32)
+        for row, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                postings[term].append((row, count))
+
+        vocabulary, rows, frequencies = {}, [], []
+        for term, entries in postings.items():
+            vocabulary[term] = [len(rows), len(entries)]
+            rows.extend(row for row, _ in entries)
+            frequencies.extend(count for _, count in entries)
+
+        save_array(os.path.join(path, POSTINGS), np.asarray(rows, dtype=np.int32))
+        save_array(os.path.join(path, FREQUENCIES), np.asarray(frequencies, dtype=np.float32))
+        save_array(os.path.join(path, LENGTHS), lengths)
+        with open(os.path.join(path, VOCABULARY), "w") as f:
+            json.dump(vocabulary, f)
+
+        document_file = DocumentFile(path)
+        document_file.append(
+            [
+                {"id": doc.id or str(row), "text": doc.page_content, "metadata": doc.metadata}
+                for row, doc in enumerate(documents)
+            ]
+        )
+        document_file.close()
+        logger.info(f"Built BM25 index over {len(documents)} chunks, {len(vocabulary)} terms")
+        return cls(path, **kwargs)
+
+    def search(self, query: str, k: int = 6) -> List[Tuple[Document, float]]:
+        """Return the ``k`` best matching chunks with their BM25 scores."""
+        scores = np.zeros(len(self._lengths), dtype=np.float32)
+        total = len(self._lengths)
+        matched = False
+        for term in set(tokenize(query)):
+            entry = self.vocabulary.get(term)
+            if entry is None:
+                continue
+            matched = True
+            start, document_frequency = entry
+            rows = self._postings[start:start + document_frequency]
+            frequencies = self._frequencies[start:start + document_frequency]
+            idf = np.log(1.0 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._lengths[rows] / self._average_length)
+            scores[rows] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norm)
+        if not matched:
+            return []
+        top = top_k(scores, k)
+        return [(self._documents.get(int(row)), float(scores[row])) for row in top if scores[row] > 0]
+
+
+@lru_cache(maxsize=None)
+def load_bm25_index(path: Optional[str] = None) -> Optional[BM25Index]:
+    """Open the BM25 index at ``path`` (or ``BM25_INDEX_PATH``) once per process."""
+    path = path or os.getenv("BM25_INDEX_PATH")
+    if not path:
+        return None
+    if not os.path.exists(os.path.join(path, VOCABULARY)):
+        logger.warning(f"No BM25 index at {path}; using dense retrieval only")
+        return None
+    return BM25Index(path)
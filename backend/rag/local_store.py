@@ -0,0 +1,436 @@
+"""In-process vector store backed by memory-mapped NumPy files.
+
+An index directory holds:
+
+- ``manifest.json``: dimension, row count, embedding model and index options
+- ``vectors.npy``: unit-normalized float32 embeddings, one row per chunk
+- ``vectors_i8.npy`` / ``scales.npy``: optional int8 quantized copy
+- ``ivf_centroids.npy`` / ``ivf_order.npy`` / ``ivf_offsets.npy``: optional
+  inverted-file index for approximate search on large corpora; when present
+  the vectors are stored grouped by list and ``ivf_order`` maps each stored
+  vector back to its document row
+- ``documents.jsonl`` / ``offsets.npy``: chunk text and metadata, read by
+  byte offset so only the top-k rows are ever parsed
+
+Arrays are opened with ``mmap_mode="r"``, so loading an index costs no copy
+and pages are brought in by the OS as searches touch them.
+"""
+
+import json
+import logging
+import os
+import uuid
+from threading import Lock
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+VECTORS = "vectors.npy"
+VECTORS_I8 = "vectors_i8.npy"
+SCALES = "scales.npy"
+CENTROIDS = "ivf_centroids.npy"
+IVF_ORDER = "ivf_order.npy"
+IVF_OFFSETS = "ivf_offsets.npy"
+DOCUMENTS = "documents.jsonl"
+OFFSETS = "offsets.npy"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores in descending order."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def quantize(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (codes, scales)."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def kmeans(
+    matrix: np.ndarray, n_lists: int, iterations: int = 10, sample_size: int = 50_000, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means over unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    rows = len(matrix)
+    n_lists = min(n_lists, rows)
+    sample = matrix[rng.choice(rows, size=min(rows, sample_size), replace=False)]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for index in range(n_lists):
+            members = sample[assignment == index]
+            if len(members):
+                centroids[index] = members.sum(axis=0)
+            else:
+                # Re-seed empty lists so every list stays useful
+                centroids[index] = sample[rng.integers(len(sample))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """Write atomically so readers never map a half-written file."""
+    temp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(temp, "wb") as f:
+        np.save(f, array)
+    os.replace(temp, path)
+
+
+class DocumentFile:
+    """Append-only JSONL of chunk records addressed by row.
+
+    A byte-offset table (``offsets.npy``) lets ``get`` read and parse a
+    single record without touching the rest of the file.
+
+    Args:
+        path: Directory holding ``documents.jsonl`` and ``offsets.npy``
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._offsets: Optional[np.ndarray] = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+    def reload(self) -> None:
+        self.close()
+        offsets_path = os.path.join(self.path, OFFSETS)
+        if os.path.exists(offsets_path):
+            self._offsets = np.load(offsets_path, mmap_mode="r")
+            self._fd = os.open(os.path.join(self.path, DOCUMENTS), os.O_RDONLY)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd, self._offsets = None, None
+
+    def append(self, records: List[dict]) -> None:
+        """Append ``{"id", "text", "metadata"}`` records and rewrite the offsets."""
+        os.makedirs(self.path, exist_ok=True)
+        offsets = [] if self._offsets is None else list(self._offsets[:-1])
+        mode = "ab" if self._offsets is not None else "wb"
+        with open(os.path.join(self.path, DOCUMENTS), mode) as f:
+            position = f.tell()
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                offsets.append(position)
+                position += len(line)
+                f.write(line)
+        offsets.append(position)
+        save_array(os.path.join(self.path, OFFSETS), np.asarray(offsets, dtype=np.uint64))
+        self.reload()
+
+    def get(self, row: int) -> Document:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        record = json.loads(os.pread(self._fd, end - start, start))
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+
+class LocalVectorStore(VectorStore):
+    """Memory-mapped vector store with exact and IVF top-k search.
+
+    Vectors are stored unit-normalized, so scores are cosine similarities
+    like the Pinecone index. Search is exact by default; once an IVF index
+    has been built, queries only scan the ``nprobe`` closest lists. The
+    int8 copy cuts resident memory by 4x at the cost of dequantizing each
+    scanned block, so it pays off when the float32 matrix no longer fits
+    in the page cache.
+
+    Args:
+        path: Index directory
+        embedding: Embeddings used for queries and new texts
+        quantized: Search the int8 copy of the vectors when available
+        nprobe: IVF lists scanned per query; 0 always searches exhaustively
+        block_size: Rows scored per matrix product during exact search
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedding: Embeddings,
+        quantized: bool = False,
+        nprobe: int = 8,
+        block_size: int = 65_536,
+    ):
+        self.path = path
+        self.embedding = embedding
+        self.quantized = quantized
+        self.nprobe = nprobe
+        self.block_size = block_size
+        self._lock = Lock()
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_records: List[dict] = []
+        self._open()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @property
+    def manifest(self) -> dict:
+        return dict(self._manifest)
+
+    @property
+    def index_version(self) -> Optional[int]:
+        """Row count of the persisted index, used to detect rebuilds."""
+        return self._manifest.get("count")
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self, name: str) -> Optional[np.ndarray]:
+        path = self._file(name)
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def _open(self) -> None:
+        """Map the persisted index files (zero-copy)."""
+        manifest_path = self._file(MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._manifest = json.load(f)
+        else:
+            self._manifest = {}
+        self._vectors = self._load(VECTORS)
+        self._codes = self._load(VECTORS_I8)
+        self._scales = self._load(SCALES)
+        self._centroids = self._load(CENTROIDS)
+        self._ivf_order = self._load(IVF_ORDER)
+        self._ivf_offsets = self._load(IVF_OFFSETS)
+        if getattr(self, "_documents", None) is not None:
+            self._documents.close()
+        self._documents = DocumentFile(self.path)
+        if self.quantized and self._codes is None and self._vectors is not None:
+            logger.warning(f"No int8 vectors in {self.path}; searching float32 vectors")
+
+    # Writing
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed texts and stage them; call ``persist`` to write the index."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(self.embedding.embed_documents(texts))
+        with self._lock:
+            self._pending_vectors.append(vectors)
+            self._pending_records.extend(
+                {"id": id_, "text": text, "metadata": metadata}
+                for id_, text, metadata in zip(ids, texts, metadatas)
+            )
+        return ids
+
+    def persist(
+        self, quantize_vectors: bool = False, ivf_lists: Optional[int] = None
+    ) -> None:
+        """Write staged texts to disk and rebuild the optional indexes.
+
+        Args:
+            quantize_vectors: Also write an int8 copy of the vectors
+            ivf_lists: Number of IVF lists to build; ``None`` keeps exact search only
+        """
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            # Keep existing optional indexes in sync with the new rows
+            quantize_vectors = quantize_vectors or self._codes is not None
+            ivf_lists = ivf_lists or self._manifest.get("ivf_lists")
+            matrix = self._document_order_vectors()
+            if self._pending_vectors:
+                matrix = np.concatenate(
+                    ([matrix] if matrix is not None else []) + self._pending_vectors
+                )
+            if matrix is None:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+
+            self._documents.append(self._pending_records)
+
+            if ivf_lists and len(matrix):
+                # Store vectors grouped by IVF list so each probe is a
+                # contiguous slice of the memmap rather than a gather
+                centroids = kmeans(matrix, ivf_lists)
+                assignment = np.concatenate([
+                    np.argmax(matrix[start:start + self.block_size] @ centroids.T, axis=1)
+                    for start in range(0, len(matrix), self.block_size)
+                ])
+                order = np.argsort(assignment, kind="stable").astype(np.int64)
+                counts = np.bincount(assignment, minlength=len(centroids))
+                matrix = matrix[order]
+                self._save(CENTROIDS, centroids)
+                self._save(IVF_ORDER, order)
+                self._save(IVF_OFFSETS, np.concatenate([[0], np.cumsum(counts)]).astype(np.int64))
+            self._save(VECTORS, matrix)
+            if quantize_vectors and len(matrix):
+                codes, scales = quantize(matrix)
+                self._save(VECTORS_I8, codes)
+                self._save(SCALES, scales)
+
+            manifest = {
+                "dimension": int(matrix.shape[1]) if matrix.size else None,
+                "count": int(len(matrix)),
+                "model": getattr(self.embedding, "model", None),
+                "quantized": quantize_vectors,
+                "ivf_lists": ivf_lists,
+            }
+            with open(self._file(MANIFEST), "w") as f:
+                json.dump(manifest, f)
+
+            self._pending_vectors = []
+            self._pending_records = []
+            self._open()
+
+    def _document_order_vectors(self) -> Optional[np.ndarray]:
+        """Persisted vectors in document order, undoing any IVF grouping."""
+        if self._vectors is None:
+            return None
+        if self._ivf_order is None:
+            return np.asarray(self._vectors)
+        matrix = np.empty_like(self._vectors)
+        matrix[self._ivf_order] = self._vectors
+        return matrix
+
+    def _save(self, name: str, array: np.ndarray) -> None:
+        save_array(self._file(name), array)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        path: str,
+        ids: Optional[List[str]] = None,
+        quantize_vectors: bool = False,
+        ivf_lists: Optional[int] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(path, embedding, quantized=quantize_vectors, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        store.persist(quantize_vectors=quantize_vectors, ivf_lists=ivf_lists)
+        return store
+
+    # Searching
+
+    def _score_slice(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Cosine scores of ``queries`` (Q x D) against stored rows ``start:end``."""
+        if self.quantized and self._codes is not None:
+            codes = self._codes[start:end].astype(np.float32)
+            return (queries @ codes.T) * self._scales[start:end]
+        return queries @ self._vectors[start:end].T
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        total = len(self._vectors)
+        # Keep a running top-k per query across blocks of the memmap
+        best_rows = [np.empty(0, dtype=np.int64) for _ in queries]
+        best_scores = [np.empty(0, dtype=np.float32) for _ in queries]
+        for start in range(0, total, self.block_size):
+            end = min(start + self.block_size, total)
+            scores = self._score_slice(queries, start, end)
+            rows = np.arange(start, end)
+            for q, row_scores in enumerate(scores):
+                candidates = np.concatenate([best_scores[q], row_scores])
+                candidate_rows = np.concatenate([best_rows[q], rows])
+                top = top_k(candidates, k)
+                best_rows[q], best_scores[q] = candidate_rows[top], candidates[top]
+        return list(zip(best_rows, best_scores))
+
+    def _search_ivf(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        nprobe = min(self.nprobe, len(self._centroids))
+        lists = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :nprobe]
+        results = []
+        for query, probe in zip(queries, lists):
+            ranges = [(int(self._ivf_offsets[i]), int(self._ivf_offsets[i + 1])) for i in probe]
+            ranges = [(start, end) for start, end in ranges if end > start]
+            if not ranges:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+                continue
+            scores = np.concatenate(
+                [self._score_slice(query[None, :], start, end)[0] for start, end in ranges]
+            )
+            rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+            top = top_k(scores, k)
+            results.append((rows[top], scores[top]))
+        return results
+
+    def search_by_vectors(
+        self, vectors: List[List[float]], k: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """Batched top-k search; one (document, score) list per query vector."""
+        if not len(self):
+            return [[] for _ in vectors]
+        queries = _normalize(np.atleast_2d(vectors))
+        if self.nprobe and self._centroids is not None:
+            matches = self._search_ivf(queries, k)
+        else:
+            matches = self._search_exact(queries, k)
+        return [
+            [(self._documents.get(self._row(position)), float(score)) for position, score in zip(rows, scores)]
+            for rows, scores in matches
+        ]
+
+    def _row(self, position: int) -> int:
+        """Document row of a stored vector (vectors are IVF-grouped when indexed)."""
+        return int(self._ivf_order[position]) if self._ivf_order is not None else int(position)
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.search_by_vectors([embedding], k)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # Only the embedding call does I/O; the local search itself is cheap
+        vector = await self.embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
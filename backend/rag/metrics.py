@@ -0,0 +1,418 @@
+"""In-process metrics for the RAG graphs, exported as Prometheus text.
+
+Counters and fixed-bucket histograms are aggregated in memory under one
+lock per metric; an observation is a dict lookup and a bisect, so the
+instrumentation stays on in production. ``render`` produces the Prometheus
+text exposition format served by the metrics endpoint.
+"""
+
+import functools
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class for labelled metrics."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return "\n".join(lines + self._samples())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed buckets.
+
+    Args:
+        buckets: Upper bounds of the buckets; ``+Inf`` is implied
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """Count and sum of the observations for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return {"count": state[2], "sum": state[1]} if state else {"count": 0, "sum": 0.0}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric (used by tests and benchmarks)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_DURATION = REGISTRY.histogram(
+    "rag_node_duration_seconds", "Time spent in each graph node.", ("graph", "node")
+)
+NODE_ERRORS = REGISTRY.counter(
+    "rag_node_errors_total", "Graph node executions that raised.", ("graph", "node")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "LLM tokens used, by graph node and direction.", ("node", "direction")
+)
+LLM_RETRIES = REGISTRY.counter(
+    "rag_llm_retries_total", "LLM call retries, by graph node.", ("node",)
+)
+RETRIEVAL_ATTEMPTS = REGISTRY.histogram(
+    "rag_retrieval_attempts",
+    "Retrievals per chat turn; values above one are rewrite-loop retries.",
+    ("graph",),
+    buckets=COUNT_BUCKETS,
+)
+EXTERNAL_CALL_DURATION = REGISTRY.histogram(
+    "rag_external_call_duration_seconds",
+    "Latency of calls to external services.",
+    ("service", "operation"),
+)
+EXTERNAL_CALL_ERRORS = REGISTRY.counter(
+    "rag_external_call_errors_total", "External service calls that raised.", ("service", "operation")
+)
+ROUTER_DECISIONS = REGISTRY.counter(
+    "rag_router_decisions_total", "Local query router decisions.", ("route", "source")
+)
+STREAM_FRAMES = REGISTRY.counter("chat_stream_frames_total", "WebSocket frames sent for chat answers.")
+STREAM_BYTES = REGISTRY.counter("chat_stream_bytes_total", "WebSocket payload bytes sent for chat answers.")
+HISTORY_LOAD_DURATION = REGISTRY.histogram(
+    "chat_history_load_duration_seconds", "Time to load a page of stored chat history."
+)
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "rag_singleflight_calls_total", "Calls routed through request coalescing.", ("operation",)
+)
+SINGLEFLIGHT_DEDUPLICATED = REGISTRY.counter(
+    "rag_singleflight_deduplicated_total",
+    "Calls served by an identical in-flight call, in this process or another worker.",
+    ("operation", "scope"),
+)
+MONGO_POOL_CONNECTIONS = REGISTRY.gauge(
+    "mongo_pool_connections", "MongoDB pool connections, open or checked out.", ("client", "state")
+)
+MONGO_POOL_CHECKOUTS = REGISTRY.counter(
+    "mongo_pool_checkouts_total", "MongoDB connection checkouts, by outcome.", ("client", "outcome")
+)
+MONGO_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection.", ("client",)
+)
+CARD_POOL_CARDS = REGISTRY.gauge("card_pool_cards", "Cards in the random-sample pool for empty searches.")
+CARD_POOL_REFRESHES = REGISTRY.counter(
+    "card_pool_refreshes_total", "Random-sample card pool refreshes, by source.", ("source",)
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "rag_rate_limit_wait_seconds",
+    "Time OpenAI calls spent queued in the rate limiter.",
+    ("resource", "priority"),
+)
+RATE_LIMIT_THROTTLED = REGISTRY.counter(
+    "rag_rate_limit_throttled_total",
+    "OpenAI calls that had to wait for rate limit capacity.",
+    ("resource", "priority"),
+)
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+def instrument_node(graph: str, node: str, func: Callable) -> Callable:
+    """Wrap a graph node to record its latency and failures.
+
+    The wrapper keeps the node's signature, so LangGraph still passes
+    ``config`` to nodes that accept it.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.inc(graph=graph, node=node)
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - start, graph=graph, node=node)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            NODE_ERRORS.inc(graph=graph, node=node)
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - start, graph=graph, node=node)
+
+    return wrapper
+
+
+@contextmanager
+def track_call(service: str, operation: str):
+    """Record the latency (and failure) of an external call in the block."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.inc(service=service, operation=operation)
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - start, service=service, operation=operation)
+
+
+def service_name(component: Any) -> str:
+    """Short service label for a vector store or client, e.g. ``pinecone``."""
+    name = type(component).__name__.lower()
+    for suffix in ("vectorstore", "store"):
+        if name.endswith(suffix) and name != suffix:
+            name = name[: -len(suffix)]
+    return name or "unknown"
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts LLM token usage per graph node.
+
+    Pass it in the run config's ``callbacks``; it maps each model run to
+    the ``langgraph_node`` it was started from.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[UUID, str] = {}
+        self._lock = Lock()
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._nodes[run_id] = (metadata or {}).get("langgraph_node", "unknown")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            node = self._nodes.pop(run_id, "unknown")
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None and getattr(message, "usage_metadata", None):
+                    usage = message.usage_metadata
+        if usage is None:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            usage = {
+                "input_tokens": token_usage.get("prompt_tokens", 0),
+                "output_tokens": token_usage.get("completion_tokens", 0),
+            }
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), node=node, direction="input")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), node=node, direction="output")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._nodes.pop(run_id, None)
+
+
+token_usage_callback = TokenUsageCallback()
+
+
+def count_openai_retry(request) -> None:
+    """httpx request hook counting the OpenAI client's own retries.
+
+    The OpenAI SDK retries inside one model call (``max_retries``), so
+    LangChain callbacks never see it; every retried request carries a
+    non-zero ``x-stainless-retry-count`` header. The node label comes from
+    the runnable config of the model call in progress.
+    """
+    if request.headers.get("x-stainless-retry-count", "0") != "0":
+        config = var_child_runnable_config.get() or {}
+        LLM_RETRIES.inc(node=(config.get("metadata") or {}).get("langgraph_node", "unknown"))
+
+
+async def acount_openai_retry(request) -> None:
+    """Async version of ``count_openai_retry`` for ``httpx.AsyncClient``."""
+    count_openai_retry(request)
@@ -0,0 +1,243 @@
+"""Process-wide MongoDB clients for the views, ETL jobs and RAG indexing.
+
+``MongoClient`` is thread-safe and pools connections, so a process should
+create one and share it. ``get_collection`` returns collections on a
+lazily created client configured from the environment; async code uses
+``get_async_collection``, which keeps one Motor client per event loop
+because Motor clients are bound to the loop they were first used on.
+
+Pool options are read from the environment:
+
+    MONGO_CONNECTION_STRING           server URI (required)
+    MONGO_MAX_POOL_SIZE               connections per server (default 50)
+    MONGO_MIN_POOL_SIZE               connections kept open (default 0)
+    MONGO_MAX_IDLE_TIME_MS            idle connection lifetime (default 60000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS       wait for a free connection (default 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS wait for a usable server (default 5000)
+    MONGO_CONNECT_TIMEOUT_MS          TCP connect timeout (default 5000)
+    MONGO_SOCKET_TIMEOUT_MS           per-operation socket timeout (default 30000)
+    MONGO_READ_PREFERENCE             e.g. primary, secondaryPreferred (default primary)
+
+Pool activity is exported through ``rag.metrics`` (``mongo_pool_*``).
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, monitoring
+from pymongo.collection import Collection
+
+from .metrics import MONGO_POOL_CHECKOUT_WAIT, MONGO_POOL_CHECKOUTS, MONGO_POOL_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    """Connection and pool options shared by the sync and async clients."""
+
+    uri: str
+    max_pool_size: int = 50
+    min_pool_size: int = 0
+    max_idle_time_ms: int = 60_000
+    wait_queue_timeout_ms: int = 5_000
+    server_selection_timeout_ms: int = 5_000
+    connect_timeout_ms: int = 5_000
+    socket_timeout_ms: int = 30_000
+    read_preference: str = "primary"
+    app_name: str = "policybot"
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        """Read the settings from ``MONGO_*`` environment variables.
+
+        Raises:
+            ValueError: If MONGO_CONNECTION_STRING is not set
+        """
+        uri = os.getenv("MONGO_CONNECTION_STRING")
+        if not uri:
+            raise ValueError("MongoDB connection string not found in environment")
+
+        def number(name: str, default: int) -> int:
+            return int(os.getenv(name, default))
+
+        return cls(
+            uri=uri,
+            max_pool_size=number("MONGO_MAX_POOL_SIZE", cls.max_pool_size),
+            min_pool_size=number("MONGO_MIN_POOL_SIZE", cls.min_pool_size),
+            max_idle_time_ms=number("MONGO_MAX_IDLE_TIME_MS", cls.max_idle_time_ms),
+            wait_queue_timeout_ms=number("MONGO_WAIT_QUEUE_TIMEOUT_MS", cls.wait_queue_timeout_ms),
+            server_selection_timeout_ms=number(
+                "MONGO_SERVER_SELECTION_TIMEOUT_MS", cls.server_selection_timeout_ms
+            ),
+            connect_timeout_ms=number("MONGO_CONNECT_TIMEOUT_MS", cls.connect_timeout_ms),
+            socket_timeout_ms=number("MONGO_SOCKET_TIMEOUT_MS", cls.socket_timeout_ms),
+            read_preference=os.getenv("MONGO_READ_PREFERENCE", cls.read_preference),
+        )
+
+    def client_options(self) -> Dict[str, Any]:
+        """Keyword arguments for ``MongoClient`` / ``AsyncIOMotorClient``."""
+        return {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "readPreference": self.read_preference,
+            "appname": self.app_name,
+        }
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds connection pool events into the ``mongo_pool_*`` metrics.
+
+    Args:
+        client: Label for the client the pool belongs to (``sync``/``async``)
+    """
+
+    def __init__(self, client: str):
+        self.client = client
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        MONGO_POOL_CONNECTIONS.inc(client=self.client, state="open")
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        MONGO_POOL_CONNECTIONS.dec(client=self.client, state="open")
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        MONGO_POOL_CHECKOUTS.inc(client=self.client, outcome=str(event.reason).lower())
+
+    def connection_checked_out(self, event) -> None:
+        MONGO_POOL_CHECKOUTS.inc(client=self.client, outcome="ok")
+        MONGO_POOL_CONNECTIONS.inc(client=self.client, state="in_use")
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(event.duration, client=self.client)
+
+    def connection_checked_in(self, event) -> None:
+        MONGO_POOL_CONNECTIONS.dec(client=self.client, state="in_use")
+
+
+class MongoClientManager:
+    """Lazily created, shared sync and async MongoDB clients.
+
+    The sync client is recreated after a fork, since pymongo clients must
+    not be shared between processes.
+
+    Args:
+        settings: Connection options; read from the environment on first
+            use when omitted
+    """
+
+    def __init__(self, settings: Optional[MongoSettings] = None):
+        self._settings = settings
+        self._client: Optional[MongoClient] = None
+        self._client_pid: Optional[int] = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+
+    @property
+    def settings(self) -> MongoSettings:
+        if self._settings is None:
+            self._settings = MongoSettings.from_env()
+        return self._settings
+
+    def client(self) -> MongoClient:
+        """The process's sync client."""
+        with self._lock:
+            if self._client is None or self._client_pid != os.getpid():
+                logger.info("Creating pooled MongoDB client")
+                self._client = MongoClient(
+                    self.settings.uri,
+                    event_listeners=[PoolMetricsListener("sync")],
+                    **self.settings.client_options(),
+                )
+                self._client_pid = os.getpid()
+            return self._client
+
+    def async_client(self):
+        """The Motor client for the running event loop.
+
+        Raises:
+            ImportError: If motor is not installed
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                try:
+                    from motor.motor_asyncio import AsyncIOMotorClient
+                except ImportError as e:
+                    raise ImportError(
+                        "Cannot import from motor, please install with `pip install motor`."
+                    ) from e
+                logger.info("Creating pooled Motor client")
+                client = self._async_clients[loop] = AsyncIOMotorClient(
+                    self.settings.uri,
+                    event_listeners=[PoolMetricsListener("async")],
+                    **self.settings.client_options(),
+                )
+            return client
+
+    def collection(self, db_name: str, collection_name: str) -> Collection:
+        return self.client()[db_name][collection_name]
+
+    def async_collection(self, db_name: str, collection_name: str):
+        return self.async_client()[db_name][collection_name]
+
+    def pool_stats(self) -> Dict[str, float]:
+        """Current pool counters for both clients, by ``client.state``."""
+        return {
+            f"{client}.{state}": MONGO_POOL_CONNECTIONS.value(client=client, state=state)
+            for client in ("sync", "async")
+            for state in ("open", "in_use")
+        }
+
+    def close(self) -> None:
+        """Close the sync client (async clients close with their loop)."""
+        with self._lock:
+            if self._client is not None and self._client_pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+
+_manager = MongoClientManager()
+
+
+def get_mongo_manager() -> MongoClientManager:
+    """The process-wide client manager."""
+    return _manager
+
+
+def get_collection(db_name: str, collection_name: str) -> Collection:
+    """A collection on the shared sync client, e.g. ``get_collection("WTP", "whbriefingroom")``."""
+    return _manager.collection(db_name, collection_name)
+
+
+def get_async_collection(db_name: str, collection_name: str):
+    """A collection on the running loop's shared Motor client."""
+    return _manager.async_collection(db_name, collection_name)
@@ -0,0 +1,281 @@
+"""Declared MongoDB indexes for the policy corpora and checks of the queries they serve.
+
+Each ``IndexSpec`` names the collection and keys of an index the ETL jobs
+and views rely on; each ``AccessPath`` is a query those jobs run, with the
+index its plan should use. ``ensure_indexes`` creates missing indexes and
+reports existing ones whose options differ from the declaration (they are
+never dropped automatically); ``explain_access_path`` reports the winning
+plan of a query, so a collection scan shows up at deploy time.
+
+    python manage.py ensure_mongo_indexes
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+
+from .mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+CollectionGetter = Callable[[str, str], Collection]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """An index the application needs.
+
+    Args:
+        db_name: Database of the collection
+        collection_name: Collection to index
+        name: Index name
+        keys: ``(field, direction)`` pairs
+        unique: Reject duplicate keys
+        partial_filter: Only index documents matching this filter
+    """
+
+    db_name: str
+    collection_name: str
+    name: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    partial_filter: Optional[Dict[str, Any]] = None
+
+    @property
+    def namespace(self) -> str:
+        return f"{self.db_name}.{self.collection_name}"
+
+    def create_options(self) -> Dict[str, Any]:
+        """Keyword arguments for ``Collection.create_index``."""
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return options
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """Whether an entry of ``index_information()`` has this spec's keys and options."""
+        return (
+            [(key, int(direction)) for key, direction in info["key"]] == list(self.keys)
+            and bool(info.get("unique", False)) == self.unique
+            and info.get("partialFilterExpression") == self.partial_filter
+        )
+
+
+@dataclass(frozen=True)
+class AccessPath:
+    """A query run against a collection, with the index it should use.
+
+    Args:
+        description: Who runs the query
+        db_name: Database of the collection
+        collection_name: Collection queried
+        filter: Query filter, with representative values
+        index: Name of the index the plan should use
+        sort: ``(field, direction)`` pairs the query sorts by
+        limit: Documents the query asks for
+    """
+
+    description: str
+    db_name: str
+    collection_name: str
+    filter: Dict[str, Any]
+    index: str
+    sort: Tuple[Tuple[str, int], ...] = ()
+    limit: int = 1
+
+
+@dataclass
+class IndexResult:
+    """Outcome of ensuring one index: ``exists``, ``created``, ``missing``,
+    ``conflict`` or ``error``."""
+
+    spec: IndexSpec
+    status: str
+    detail: str = ""
+
+
+@dataclass
+class PlanReport:
+    """Winning plan of an access path.
+
+    ``status`` is ``ok`` when the expected index is scanned without an
+    in-memory sort, ``empty`` when the collection does not exist yet, and
+    otherwise ``collscan``, ``wrong_index``, ``blocking_sort`` or ``error``.
+    """
+
+    path: AccessPath
+    status: str
+    stages: List[str] = field(default_factory=list)
+    indexes: List[str] = field(default_factory=list)
+    detail: str = ""
+
+
+INDEXES: Tuple[IndexSpec, ...] = (
+    # whgov_scraper upserts articles by url
+    IndexSpec("WTP", "whbriefingroom", "url_unique", (("url", 1),), unique=True),
+    # whgov_summarizer pages through unsummarized documents by _id. Partial
+    # indexes cannot filter on a missing field, so the index covers documents
+    # with content and puts summary first: missing summaries are the null
+    # range, already in _id order.
+    IndexSpec(
+        "WTP",
+        "whbriefingroom",
+        "content_summary_id",
+        (("summary", 1), ("_id", 1)),
+        partial_filter={"content": {"$exists": True}},
+    ),
+    # RandomCardPool samples a category the shared pool is short of
+    IndexSpec("WTP", "whbriefingroom", "category", (("category", 1),)),
+    # federal_register_api upserts documents by document_number
+    IndexSpec(
+        "govai",
+        "federal_registry",
+        "document_number_unique",
+        (("document_number", 1),),
+        unique=True,
+    ),
+)
+
+ACCESS_PATHS: Tuple[AccessPath, ...] = (
+    AccessPath(
+        "whgov_scraper article upsert",
+        "WTP",
+        "whbriefingroom",
+        {"url": "https://www.whitehouse.gov/briefing-room/"},
+        index="url_unique",
+    ),
+    AccessPath(
+        "whgov_summarizer batch",
+        "WTP",
+        "whbriefingroom",
+        {"content": {"$exists": True}, "summary": {"$exists": False}},
+        index="content_summary_id",
+        sort=(("_id", 1),),
+        limit=50,
+    ),
+    AccessPath(
+        "card pool category sample",
+        "WTP",
+        "whbriefingroom",
+        {"category": "Presidential Actions"},
+        index="category",
+    ),
+    AccessPath(
+        "federal_register_api document upsert",
+        "govai",
+        "federal_registry",
+        {"document_number": "0000-00000"},
+        index="document_number_unique",
+    ),
+)
+
+
+def ensure_index(
+    spec: IndexSpec, create: bool = True, collection_getter: CollectionGetter = get_collection
+) -> IndexResult:
+    """Create ``spec`` if it is missing and check an existing index matches it.
+
+    Args:
+        spec: Index to ensure
+        create: Create a missing index; when False only report it
+        collection_getter: Returns the collection for ``(db_name, collection_name)``
+
+    Returns:
+        IndexResult: What was found or done
+    """
+    collection = collection_getter(spec.db_name, spec.collection_name)
+    try:
+        existing = collection.index_information()
+    except OperationFailure as e:
+        return IndexResult(spec, "error", str(e))
+
+    info = existing.get(spec.name)
+    if info is not None:
+        if spec.matches(info):
+            return IndexResult(spec, "exists")
+        return IndexResult(spec, "conflict", f"index {spec.name} exists with different keys or options: {info}")
+    for name, info in existing.items():
+        if spec.matches(info):
+            return IndexResult(spec, "conflict", f"same index exists under the name {name}")
+
+    if not create:
+        return IndexResult(spec, "missing")
+    try:
+        collection.create_index(list(spec.keys), **spec.create_options())
+    except OperationFailure as e:
+        # e.g. duplicate keys in existing documents for a unique index
+        return IndexResult(spec, "error", str(e.details.get("errmsg", e)) if e.details else str(e))
+    logger.info(f"Created index {spec.name} on {spec.namespace}")
+    return IndexResult(spec, "created")
+
+
+def ensure_indexes(
+    specs: Tuple[IndexSpec, ...] = INDEXES,
+    create: bool = True,
+    collection_getter: CollectionGetter = get_collection,
+) -> List[IndexResult]:
+    """``ensure_index`` for every spec, in order."""
+    return [ensure_index(spec, create, collection_getter) for spec in specs]
+
+
+def _walk_plan(plan: Dict[str, Any], stages: List[str], indexes: List[str]) -> None:
+    # Slot-based plans (MongoDB 7+) nest the classic plan under queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages.append(plan.get("stage", "UNKNOWN"))
+    if "indexName" in plan:
+        indexes.append(plan["indexName"])
+    if "inputStage" in plan:
+        _walk_plan(plan["inputStage"], stages, indexes)
+    for child in plan.get("inputStages", []):
+        _walk_plan(child, stages, indexes)
+
+
+def summarize_plan(path: AccessPath, explain: Dict[str, Any]) -> PlanReport:
+    """Classify the winning plan of an ``explain`` result for ``path``."""
+    stages: List[str] = []
+    indexes: List[str] = []
+    _walk_plan(explain["queryPlanner"]["winningPlan"], stages, indexes)
+
+    if stages == ["EOF"]:
+        status = "empty"
+    elif "COLLSCAN" in stages:
+        status = "collscan"
+    elif path.index not in indexes:
+        status = "wrong_index"
+    elif "SORT" in stages:
+        status = "blocking_sort"
+    else:
+        status = "ok"
+    return PlanReport(path, status, stages, indexes)
+
+
+def explain_access_path(
+    path: AccessPath, collection_getter: CollectionGetter = get_collection
+) -> PlanReport:
+    """Explain ``path`` as a find with its filter, sort and limit.
+
+    Upserts are explained through the equivalent find: the server plans the
+    query part of an update the same way.
+    """
+    collection = collection_getter(path.db_name, path.collection_name)
+    cursor = collection.find(path.filter).limit(path.limit)
+    if path.sort:
+        cursor = cursor.sort(list(path.sort))
+    try:
+        explain = cursor.explain()
+    except OperationFailure as e:
+        return PlanReport(path, "error", detail=str(e))
+    return summarize_plan(path, explain)
+
+
+def explain_access_paths(
+    paths: Tuple[AccessPath, ...] = ACCESS_PATHS,
+    collection_getter: CollectionGetter = get_collection,
+) -> List[PlanReport]:
+    """``explain_access_path`` for every path, in order."""
+    return [explain_access_path(path, collection_getter) for path in paths]
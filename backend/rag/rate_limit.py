@@ -0,0 +1,421 @@
+"""Shared rate limiting for OpenAI calls with priority classes.
+
+Every chat model and embedding call made through ``rag.base`` (and the ETL
+summarizer) takes capacity from a pair of token buckets, one for requests
+per minute and one for tokens per minute. With a Redis URL configured the
+buckets live in Redis, so all workers and ETL jobs share one budget;
+otherwise each process gets its own.
+
+Callers declare how urgent their calls are with ``rate_priority``:
+
+    with rate_priority(Priority.BACKGROUND):
+        summarize_documents()
+
+Lower priorities may not take the last ``RESERVES[priority]`` fraction of
+either bucket, so background work backs off before it can starve chat,
+and within a process a call waits while any more urgent call is queued.
+
+Limits are read from the environment: ``OPENAI_LLM_RPM``,
+``OPENAI_LLM_TPM``, ``OPENAI_EMBEDDINGS_RPM``, ``OPENAI_EMBEDDINGS_TPM``,
+and ``RATE_LIMIT_REDIS_URL`` to share the buckets.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from .metrics import RATE_LIMIT_THROTTLED, RATE_LIMIT_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Priority classes, most urgent first."""
+
+    CHAT = 0
+    SEARCH = 1
+    BACKGROUND = 2
+
+
+# Fraction of each bucket a priority class must leave untouched
+RESERVES = {Priority.CHAT: 0.0, Priority.SEARCH: 0.1, Priority.BACKGROUND: 0.3}
+
+_priority: ContextVar[Priority] = ContextVar("rate_limit_priority", default=Priority.SEARCH)
+
+
+def current_priority() -> Priority:
+    """Priority of OpenAI calls made from the current context."""
+    return _priority.get()
+
+
+@contextmanager
+def rate_priority(priority: Priority):
+    """Run the block's OpenAI calls (and tasks it creates) at ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _refill(level: float, updated: float, now: float, capacity: float) -> float:
+    return min(capacity, level + (now - updated) * capacity / 60.0)
+
+
+def _needed(amount: float, capacity: float, reserve: float) -> float:
+    # Requests larger than the reserve-adjusted bucket go through when it is full
+    return min(amount + reserve * capacity, capacity)
+
+
+class LocalBuckets:
+    """Request and token buckets held in this process."""
+
+    blocking_io = False
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.capacities = (float(requests_per_minute), float(tokens_per_minute))
+        now = time.monotonic()
+        self._state = [[capacity, now] for capacity in self.capacities]
+        self._lock = Lock()
+
+    def try_acquire(self, requests: float, tokens: float, reserve: float) -> float:
+        """Take capacity if both buckets allow it.
+
+        Returns:
+            float: 0 when taken, otherwise seconds until it may succeed
+        """
+        now = time.monotonic()
+        amounts = (requests, tokens)
+        with self._lock:
+            wait = 0.0
+            for state, capacity, amount in zip(self._state, self.capacities, amounts):
+                state[0] = _refill(state[0], state[1], now, capacity)
+                state[1] = now
+                needed = _needed(amount, capacity, reserve)
+                if state[0] < needed:
+                    wait = max(wait, (needed - state[0]) * 60.0 / capacity)
+            if wait == 0.0:
+                for state, amount in zip(self._state, amounts):
+                    state[0] -= amount
+            return wait
+
+    def charge(self, tokens: float) -> None:
+        """Adjust the token bucket by actual usage (negative refunds)."""
+        now = time.monotonic()
+        capacity = self.capacities[1]
+        with self._lock:
+            state = self._state[1]
+            state[0] = min(capacity, _refill(state[0], state[1], now, capacity) - tokens)
+            state[1] = now
+
+
+# KEYS: request bucket, token bucket. ARGV: capacities, amounts, reserve, ttl
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local reserve = tonumber(ARGV[5])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+  local capacity = tonumber(ARGV[i])
+  local amount = tonumber(ARGV[i + 2])
+  local state = redis.call('HMGET', KEYS[i], 'level', 'ts')
+  local level = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  level = math.min(capacity, level + (now - ts) * capacity / 60)
+  levels[i] = level
+  local needed = math.min(amount + reserve * capacity, capacity)
+  if level < needed then
+    wait = math.max(wait, (needed - level) * 60 / capacity)
+  end
+end
+if wait == 0 then
+  for i = 1, 2 do
+    redis.call('HSET', KEYS[i], 'level', levels[i] - tonumber(ARGV[i + 2]), 'ts', now)
+    redis.call('EXPIRE', KEYS[i], ARGV[6])
+  end
+end
+return tostring(wait)
+"""
+
+# KEYS: token bucket. ARGV: capacity, tokens, ttl
+_CHARGE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+level = math.min(capacity, level + (now - ts) * capacity / 60 - tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'level', level, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return tostring(level)
+"""
+
+
+class RedisBuckets:
+    """Request and token buckets shared by every process through Redis.
+
+    Each update is one Lua script using the server clock, so workers on
+    different hosts agree on refill. If Redis is unreachable calls are let
+    through rather than failing chat.
+    """
+
+    blocking_io = True
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        redis_url: str = "redis://127.0.0.1:6379/1",
+        prefix: str = "policybot:rate_limit",
+        name: str = "llm",
+    ):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "Cannot import redis, please install with `pip install redis`."
+            ) from e
+        self._errors = redis.RedisError
+        self.client = redis.Redis.from_url(redis_url)
+        self.capacities = (float(requests_per_minute), float(tokens_per_minute))
+        self.keys = (f"{prefix}:{name}:requests", f"{prefix}:{name}:tokens")
+        self._acquire = self.client.register_script(_ACQUIRE_SCRIPT)
+        self._charge = self.client.register_script(_CHARGE_SCRIPT)
+
+    def try_acquire(self, requests: float, tokens: float, reserve: float) -> float:
+        try:
+            return float(
+                self._acquire(keys=self.keys, args=[*self.capacities, requests, tokens, reserve, 120])
+            )
+        except self._errors as e:
+            logger.warning(f"Rate limiter Redis unavailable, letting call through: {e}")
+            return 0.0
+
+    def charge(self, tokens: float) -> None:
+        try:
+            self._charge(keys=self.keys[1:], args=[self.capacities[1], tokens, 120])
+        except self._errors as e:
+            logger.warning(f"Rate limiter Redis unavailable, usage not recorded: {e}")
+
+
+class RateLimitUsageCallback(BaseCallbackHandler):
+    """Settles each model call's estimated token charge with its actual usage."""
+
+    def __init__(self, limiter: "OpenAIRateLimiter"):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        used = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    used += usage.get("total_tokens", 0)
+        if not used:
+            used = ((response.llm_output or {}).get("token_usage") or {}).get("total_tokens", 0)
+        if used:
+            self.limiter.charge(used - self.limiter.estimated_tokens)
+
+    def on_llm_error(self, error, **kwargs) -> None:
+        # Failed calls (e.g. 429s) are not billed; refund the estimate
+        self.limiter.charge(-self.limiter.estimated_tokens)
+
+
+class OpenAIRateLimiter(BaseRateLimiter):
+    """Priority-aware requests/min and tokens/min limiter.
+
+    Pass it as a chat model's ``rate_limiter`` together with its
+    ``usage_callback``: each call is charged ``estimated_tokens`` up front
+    and corrected once the response reports its usage. Embedding calls
+    know their size in advance and use ``acquire_tokens`` directly.
+
+    Args:
+        requests_per_minute: Request budget
+        tokens_per_minute: Token budget
+        backend: ``LocalBuckets`` or ``RedisBuckets``; local by default
+        name: Resource label for metrics (``llm`` or ``embeddings``)
+        estimated_tokens: Up-front charge for a chat model call
+        poll_interval: Longest sleep between attempts while queued
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        backend=None,
+        name: str = "llm",
+        estimated_tokens: int = 1000,
+        poll_interval: float = 0.05,
+    ):
+        self.backend = backend or LocalBuckets(requests_per_minute, tokens_per_minute)
+        self.name = name
+        self.estimated_tokens = estimated_tokens
+        self.poll_interval = poll_interval
+        self.usage_callback = RateLimitUsageCallback(self)
+        self._waiting = {priority: 0 for priority in Priority}
+        self._lock = Lock()
+
+    def _enter(self, priority: Priority) -> None:
+        with self._lock:
+            self._waiting[priority] += 1
+
+    def _exit(self, priority: Priority) -> None:
+        with self._lock:
+            self._waiting[priority] -= 1
+
+    def _outranked(self, priority: Priority) -> bool:
+        with self._lock:
+            return any(self._waiting[p] for p in Priority if p < priority)
+
+    def _record(self, priority: Priority, start: float, attempts: int) -> None:
+        RATE_LIMIT_WAIT.observe(time.perf_counter() - start, resource=self.name, priority=priority.name.lower())
+        if attempts > 1:
+            RATE_LIMIT_THROTTLED.inc(resource=self.name, priority=priority.name.lower())
+
+    def acquire_tokens(self, tokens: float, requests: float = 1, blocking: bool = True) -> bool:
+        """Wait for capacity for ``requests`` calls totalling ``tokens`` tokens.
+
+        Returns:
+            bool: False only when not blocking and no capacity was free
+        """
+        priority = current_priority()
+        start = time.perf_counter()
+        attempts = 0
+        self._enter(priority)
+        try:
+            while True:
+                attempts += 1
+                wait = self.poll_interval
+                if not self._outranked(priority):
+                    wait = self.backend.try_acquire(requests, tokens, RESERVES[priority])
+                    if wait == 0.0:
+                        break
+                if not blocking:
+                    return False
+                time.sleep(min(wait, self.poll_interval))
+        finally:
+            self._exit(priority)
+        self._record(priority, start, attempts)
+        return True
+
+    async def aacquire_tokens(self, tokens: float, requests: float = 1, blocking: bool = True) -> bool:
+        """Async version of ``acquire_tokens``."""
+        priority = current_priority()
+        start = time.perf_counter()
+        attempts = 0
+        self._enter(priority)
+        try:
+            while True:
+                attempts += 1
+                wait = self.poll_interval
+                if not self._outranked(priority):
+                    if self.backend.blocking_io:
+                        wait = await asyncio.to_thread(
+                            self.backend.try_acquire, requests, tokens, RESERVES[priority]
+                        )
+                    else:
+                        wait = self.backend.try_acquire(requests, tokens, RESERVES[priority])
+                    if wait == 0.0:
+                        break
+                if not blocking:
+                    return False
+                await asyncio.sleep(min(wait, self.poll_interval))
+        finally:
+            self._exit(priority)
+        self._record(priority, start, attempts)
+        return True
+
+    def charge(self, tokens: float) -> None:
+        """Correct the token bucket by ``tokens`` (negative to refund)."""
+        if tokens:
+            self.backend.charge(tokens)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.acquire_tokens(self.estimated_tokens, blocking=blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.aacquire_tokens(self.estimated_tokens, blocking=blocking)
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that takes rate limit capacity before each call.
+
+    Args:
+        embeddings: The underlying embeddings
+        limiter: Limiter for the embedding model's budget
+    """
+
+    def __init__(self, embeddings: Embeddings, limiter: OpenAIRateLimiter):
+        self.underlying = embeddings
+        self.limiter = limiter
+        self.batch_size = getattr(embeddings, "chunk_size", 1000)
+
+    def _cost(self, texts: List[str]) -> Dict[str, float]:
+        return {
+            # About four characters per token, as in ``rag.history``
+            "tokens": sum(len(text) // 4 + 1 for text in texts),
+            "requests": max(1, math.ceil(len(texts) / self.batch_size)),
+        }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.limiter.acquire_tokens(**self._cost(texts))
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.limiter.acquire_tokens(**self._cost([text]))
+        return self.underlying.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self.limiter.aacquire_tokens(**self._cost(texts))
+        return await self.underlying.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await self.limiter.aacquire_tokens(**self._cost([text]))
+        return await self.underlying.aembed_query(text)
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose the wrapped model's attributes (e.g. ``model``)
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+
+_DEFAULT_LIMITS = {"llm": (500, 200_000), "embeddings": (3000, 1_000_000)}
+_limiters: Dict[str, OpenAIRateLimiter] = {}
+_limiters_lock = Lock()
+
+
+def get_rate_limiter(resource: str = "llm") -> OpenAIRateLimiter:
+    """Process-wide limiter for ``llm`` or ``embeddings`` calls, configured from the environment."""
+    with _limiters_lock:
+        limiter = _limiters.get(resource)
+        if limiter is None:
+            default_rpm, default_tpm = _DEFAULT_LIMITS[resource]
+            rpm = float(os.getenv(f"OPENAI_{resource.upper()}_RPM", default_rpm))
+            tpm = float(os.getenv(f"OPENAI_{resource.upper()}_TPM", default_tpm))
+            redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+            backend = RedisBuckets(rpm, tpm, redis_url=redis_url, name=resource) if redis_url else None
+            limiter = _limiters[resource] = OpenAIRateLimiter(rpm, tpm, backend=backend, name=resource)
+        return limiter
+
+
+def configure_rate_limiter(resource: str, limiter: Optional[OpenAIRateLimiter]) -> None:
+    """Replace (or with None, reset) the process-wide limiter for ``resource``."""
+    with _limiters_lock:
+        if limiter is None:
+            _limiters.pop(resource, None)
+        else:
+            _limiters[resource] = limiter
@@ -0,0 +1,135 @@
+"""Process-wide registry of shared model, embedding and vector store clients."""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from threading import Lock, RLock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RegistryEntry:
+    """A shared client together with its bookkeeping."""
+
+    key: Tuple[Hashable, ...]
+    component: Any
+    created_at: float = field(default_factory=time.time)
+
+
+class ComponentRegistry:
+    """Singleton registry handing out pooled LLM, embedding and vector store clients.
+
+    Clients are keyed by the class and configuration of the provider that
+    builds them (e.g. ``OpenAIModel(model_name="gpt-4")`` or
+    ``PineconeVectorStoreModel(index_name=...)``), so every graph asking for
+    the same configuration shares one client and its HTTP connection pool.
+    The graphs holding these clients live for the whole process, so entries
+    are never released; ``clear`` forgets them on reconfiguration.
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "_initialized"):
+            self._entries: Dict[Tuple[Hashable, ...], RegistryEntry] = {}
+            self._entries_lock = Lock()
+            self._build_locks: Dict[Tuple[Hashable, ...], RLock] = {}
+            self._initialized = True
+
+    def acquire_llm(self, model) -> Any:
+        """Return the shared chat model for a ``BaseLLMModel`` provider."""
+        return self._acquire("llm", model, model.get_model)
+
+    def acquire_embeddings(self, embeddings) -> Any:
+        """Return the shared embeddings client for a ``BaseEmbeddings`` provider."""
+        return self._acquire("embeddings", embeddings, embeddings.get_embeddings)
+
+    def acquire_vector_store(self, vector_store) -> Any:
+        """Return the shared vector store for a ``BaseVectorStore`` provider."""
+        return self._acquire("vector_store", vector_store, vector_store.get_vector_store)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the configuration and age of every pooled client."""
+        with self._entries_lock:
+            entries = list(self._entries.values())
+        return {
+            "components": [
+                {
+                    "kind": entry.key[0],
+                    "provider": entry.key[1],
+                    "config": str(entry.key[2]),
+                    "age_seconds": round(time.time() - entry.created_at, 1),
+                }
+                for entry in entries
+            ],
+        }
+
+    def clear(self) -> None:
+        """Forget all pooled clients (used by tests and on reconfiguration)."""
+        with self._entries_lock:
+            self._entries.clear()
+            self._build_locks.clear()
+
+    def _acquire(self, kind: str, provider, factory: Callable[[], Any]) -> Any:
+        key = (kind,) + self._config_key(provider)
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry.component
+            build_lock = self._build_locks.setdefault(key, RLock())
+
+        # Build outside the registry lock so a slow client (e.g. Pinecone
+        # describing its index) does not block unrelated acquires.
+        with build_lock:
+            with self._entries_lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return entry.component
+            component = factory()
+            with self._entries_lock:
+                self._entries[key] = RegistryEntry(key=key, component=component)
+            logger.info(f"Created shared {kind} client for {key[1]}")
+            return component
+
+    @staticmethod
+    def _config_key(provider) -> Tuple[Hashable, ...]:
+        """Build a hashable key from a provider's class and configuration."""
+        if hasattr(provider, "config_key"):
+            config = provider.config_key()
+        else:
+            config = tuple(
+                sorted((name, _freeze(value)) for name, value in vars(provider).items())
+            )
+        cls = type(provider)
+        return (f"{cls.__module__}.{cls.__qualname__}", config)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Make a configuration value hashable, falling back to object identity."""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if any(hasattr(value, attr) for attr in ("get_model", "get_embeddings", "get_vector_store")):
+        # Wrapped providers (e.g. a cached embeddings provider) key by config
+        return ComponentRegistry._config_key(value)
+    # Nested clients (e.g. the embeddings handed to a vector store) are
+    # themselves pooled, so identity is the right notion of equality.
+    return ("id", id(value))
+
+
+def get_registry() -> ComponentRegistry:
+    """Return the process-wide component registry."""
+    return ComponentRegistry()
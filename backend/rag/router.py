@@ -0,0 +1,278 @@
+"""Local query routing ahead of the chat agent.
+
+Obvious cases are decided without a model call: regex rules catch
+greetings, thanks and questions citing a document, law or agency, and a small
+multinomial naive Bayes classifier trained on logged agent decisions
+handles the rest when it is confident. Anything else goes to the LLM agent.
+Every decision is written to a rotating JSONL log by a background thread,
+so routing never waits on file I/O. With ``log_queries`` on, entries carry
+the query text and the agent's decisions become the classifier's training
+data; otherwise only the route, source and confidence are kept.
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from logging.handlers import QueueListener, RotatingFileHandler
+from threading import Lock
+from typing import Dict, List, Optional
+
+from .cache import get_cache_dir
+from .lexical import tokenize
+from .metrics import ROUTER_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+RETRIEVE = "retrieve"
+DIRECT_RESPONSE = "direct_response"
+AGENT = "agent"
+
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|yo|howdy|greetings|good (morning|afternoon|evening)|thanks|thank you|"
+    r"thx|ok(ay)?|cool|great|bye|goodbye|who are you|what can you do|how are you)\b[\s\w',!?.]{0,20}$",
+    re.IGNORECASE,
+)
+# Only unambiguous references to the corpus: document numbers, legal
+# citations and agency names. Generic policy vocabulary ("rules", "tax",
+# "president") also turns up in small talk, so it is left to the classifier
+# and the agent.
+POLICY_PATTERN = re.compile(
+    r"\b(executive orders? (no\.? ?)?\d+|e\.?o\.? ?\d{4,}|h\.\s?r\.?\s?\d+|s\.\s?\d+|"
+    r"pub(lic|\.) ?l(aw|\.) ?\d+-\d+|\d+ c\.?f\.?r\.?|\d+ u\.?s\.?c\.?|\d+ fr \d+|\d{4}-\d{5}|"
+    r"proclamation \d+|department of (the )?\w+|"
+    r"environmental protection agency|food and drug administration|small business administration|"
+    r"federal emergency management agency|internal revenue service|federal trade commission|"
+    r"securities and exchange commission|office of management and budget|"
+    r"centers for disease control)\b"
+    r"|\b(?-i:EPA|FDA|DOJ|DOE|DOD|DHS|HHS|USDA|FTC|SEC|IRS|FEMA|NASA|OMB|CDC)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RouteDecision:
+    """Where a query goes and how sure the router is."""
+
+    route: str
+    confidence: float
+    source: str
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word tokens with Laplace smoothing."""
+
+    def __init__(self):
+        self.class_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = {}
+        self.total_tokens: Counter = Counter()
+        self.vocabulary: set = set()
+
+    @property
+    def trained(self) -> bool:
+        return len(self.class_counts) > 1
+
+    def fit(self, texts: List[str], labels: List[str]) -> "NaiveBayesClassifier":
+        for text, label in zip(texts, labels):
+            tokens = tokenize(text)
+            self.class_counts[label] += 1
+            self.token_counts.setdefault(label, Counter()).update(tokens)
+            self.total_tokens[label] += len(tokens)
+            self.vocabulary.update(tokens)
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        documents = sum(self.class_counts.values())
+        vocabulary_size = len(self.vocabulary) or 1
+        log_scores = {}
+        for label, count in self.class_counts.items():
+            score = math.log(count / documents)
+            denominator = self.total_tokens[label] + vocabulary_size
+            for token in tokens:
+                score += math.log((self.token_counts[label][token] + 1) / denominator)
+            log_scores[label] = score
+        peak = max(log_scores.values())
+        exp_scores = {label: math.exp(score - peak) for label, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "class_counts": dict(self.class_counts),
+            "token_counts": {label: dict(counts) for label, counts in self.token_counts.items()},
+            "total_tokens": dict(self.total_tokens),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesClassifier":
+        classifier = cls()
+        classifier.class_counts = Counter(data["class_counts"])
+        classifier.token_counts = {
+            label: Counter(counts) for label, counts in data["token_counts"].items()
+        }
+        classifier.total_tokens = Counter(data["total_tokens"])
+        for counts in classifier.token_counts.values():
+            classifier.vocabulary.update(counts)
+        return classifier
+
+
+class QueryRouter:
+    """Decide between retrieval, a direct response, or asking the agent.
+
+    Args:
+        log_path: JSONL file receiving every routing decision
+        model_path: Trained classifier JSON (see ``train``)
+        threshold: Minimum classifier probability to skip the agent
+        log_queries: Store the query text with each decision; needed to train
+        max_log_bytes: Size at which the log is rotated
+        log_backups: Rotated log files kept
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        model_path: Optional[str] = None,
+        threshold: float = 0.85,
+        log_queries: bool = False,
+        max_log_bytes: int = 10_000_000,
+        log_backups: int = 5,
+    ):
+        self.log_path = log_path or os.getenv(
+            "ROUTER_LOG_PATH", os.path.join(get_cache_dir(), "router_decisions.jsonl")
+        )
+        self.model_path = model_path or os.getenv(
+            "ROUTER_MODEL_PATH", os.path.join(get_cache_dir(), "router_model.json")
+        )
+        self.threshold = threshold
+        self.log_queries = log_queries
+        self.log_backups = log_backups
+        self.classifier = self._load_classifier()
+        self.counts: Counter = Counter()
+        self._lock = Lock()
+        self._log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._log_handler = RotatingFileHandler(
+            self.log_path, maxBytes=max_log_bytes, backupCount=log_backups, encoding="utf-8", delay=True
+        )
+        self._log_listener = QueueListener(self._log_queue, self._log_handler)
+        self._log_listener.start()
+        self._log_open = True
+
+    def _load_classifier(self) -> Optional[NaiveBayesClassifier]:
+        if not os.path.exists(self.model_path):
+            return None
+        try:
+            with open(self.model_path) as f:
+                return NaiveBayesClassifier.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load router model {self.model_path}: {e}")
+            return None
+
+    def is_small_talk(self, query: str) -> bool:
+        """Whether the rules answer ``query`` directly; nothing is recorded."""
+        return not POLICY_PATTERN.search(query) and bool(SMALL_TALK_PATTERN.match(query))
+
+    def route(self, query: str) -> RouteDecision:
+        """Route a (reformulated) user question."""
+        # Policy terms win over small talk ("thanks, and the EPA rule?")
+        if POLICY_PATTERN.search(query):
+            decision = RouteDecision(RETRIEVE, 0.9, "rules")
+        elif SMALL_TALK_PATTERN.match(query):
+            decision = RouteDecision(DIRECT_RESPONSE, 0.95, "rules")
+        elif self.classifier is not None and self.classifier.trained:
+            probabilities = self.classifier.predict_proba(query)
+            route, confidence = max(probabilities.items(), key=lambda item: item[1])
+            if confidence >= self.threshold:
+                decision = RouteDecision(route, confidence, "classifier")
+            else:
+                decision = RouteDecision(AGENT, confidence, "classifier")
+        else:
+            decision = RouteDecision(AGENT, 0.0, "default")
+        with self._lock:
+            self.counts[AGENT if decision.route == AGENT else decision.source] += 1
+        ROUTER_DECISIONS.inc(route=decision.route, source=decision.source)
+        self.record(query, decision)
+        return decision
+
+    def record_agent_decision(self, query: str, route: str) -> None:
+        """Log the LLM agent's choice for a query the router deferred."""
+        self.record(query, RouteDecision(route, 1.0, "agent"))
+
+    def record(self, query: str, decision: RouteDecision) -> None:
+        """Queue a decision for the log; agent decisions become training labels."""
+        entry = {"ts": time.time(), **asdict(decision)}
+        if self.log_queries:
+            entry["query"] = query
+        self._log_queue.put(logging.makeLogRecord({"msg": json.dumps(entry)}))
+        logger.info(
+            f"Routed query to {decision.route} "
+            f"(source={decision.source}, confidence={decision.confidence:.2f})"
+        )
+
+    def flush(self) -> None:
+        """Write every queued decision to the log."""
+        with self._lock:
+            if self._log_open:
+                self._log_listener.stop()
+                self._log_listener.start()
+
+    def close(self) -> None:
+        """Write queued decisions and stop the log thread."""
+        with self._lock:
+            if not self._log_open:
+                return
+            self._log_open = False
+            self._log_listener.stop()
+        self._log_handler.close()
+
+    def log_files(self) -> List[str]:
+        """The decision log and its rotated backups that exist, oldest first."""
+        paths = [f"{self.log_path}.{index}" for index in range(self.log_backups, 0, -1)] + [self.log_path]
+        return [path for path in paths if os.path.exists(path)]
+
+    def stats(self) -> Dict[str, int]:
+        """Decision counts by source; ``agent`` counts queries deferred to the LLM."""
+        with self._lock:
+            counts = dict(self.counts)
+        counts["llm_calls_saved"] = counts.get("rules", 0) + counts.get("classifier", 0)
+        return counts
+
+    def train(self, log_path: Optional[str] = None) -> int:
+        """Fit the classifier on logged agent decisions and save it.
+
+        Only decisions made by the LLM agent are used as labels, so the
+        classifier never learns from its own guesses. Reads the log and its
+        rotated backups unless ``log_path`` is given.
+
+        Returns:
+            int: Number of training examples
+        """
+        if log_path is None:
+            self.flush()
+        texts, labels = [], []
+        for path in [log_path] if log_path else self.log_files():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Entries logged without query text cannot be learned from
+                    if (
+                        isinstance(entry, dict)
+                        and entry.get("source") == "agent"
+                        and entry.get("route") in (RETRIEVE, DIRECT_RESPONSE)
+                        and entry.get("query")
+                    ):
+                        texts.append(entry["query"])
+                        labels.append(entry["route"])
+        classifier = NaiveBayesClassifier().fit(texts, labels)
+        with open(self.model_path, "w") as f:
+            json.dump(classifier.to_dict(), f)
+        self.classifier = classifier
+        return len(texts)
@@ -0,0 +1,360 @@
+"""Semantic result cache in front of the search graph."""
+
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional
+
+import numpy as np
+
+from .cache import CacheStats, make_key, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Tokens with a digit (years, order and document numbers): queries differing
+# only in these ("EO 14110" / "EO 14111") embed almost identically but want
+# other documents
+IDENTIFIER_PATTERN = re.compile(r"\w*\d[\w.-]*")
+
+
+@dataclass
+class CachedSearch:
+    """A cached search answer."""
+
+    query: str
+    doc_ids: List[str]
+    created_at: float = field(default_factory=time.time)
+
+
+def identifier_tokens(query: str) -> FrozenSet[str]:
+    """The tokens of a query containing a digit, casefolded."""
+    return frozenset(token.strip(".-").casefold() for token in IDENTIFIER_PATTERN.findall(query))
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class SearchCacheBackend:
+    """Base interface for search result cache storage."""
+
+    def get(self, key: str) -> Optional[CachedSearch]:
+        raise NotImplementedError
+
+    def nearest(
+        self, vector: np.ndarray, threshold: float, accept: Optional[Callable[[CachedSearch], bool]] = None
+    ) -> Optional[CachedSearch]:
+        """Return the most similar cached search at or above ``threshold``.
+
+        Candidates rejected by ``accept`` are skipped for the next nearest.
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, vector: np.ndarray, entry: CachedSearch) -> None:
+        raise NotImplementedError
+
+    def invalidate(self) -> None:
+        """Drop every cached search (e.g. after the index was updated)."""
+        raise NotImplementedError
+
+
+class InMemorySearchCacheBackend(SearchCacheBackend):
+    """Per-process backend keeping entries and a normalized vector matrix."""
+
+    def __init__(self, ttl: float = 600, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedSearch] = {}
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[CachedSearch]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                return None
+            return entry
+
+    def nearest(
+        self, vector: np.ndarray, threshold: float, accept: Optional[Callable[[CachedSearch], bool]] = None
+    ) -> Optional[CachedSearch]:
+        with self._lock:
+            if not self._entries:
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._vectors)
+                self._matrix = np.stack([self._vectors[k] for k in self._matrix_keys])
+            scores = self._matrix @ vector
+            for index in np.argsort(-scores):
+                if scores[index] < threshold:
+                    return None
+                key = self._matrix_keys[index]
+                entry = self._entries.get(key)
+                if entry is not None and not self._expired(entry) and (accept is None or accept(entry)):
+                    return entry
+            return None
+
+    def set(self, key: str, vector: np.ndarray, entry: CachedSearch) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._vectors[key] = vector
+            self._matrix = None
+            if len(self._entries) > self.max_entries:
+                # Entries are inserted in time order; drop expired then oldest
+                for stale in [k for k, e in self._entries.items() if self._expired(e)]:
+                    self._remove(stale)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrix = None
+
+    def _expired(self, entry: CachedSearch) -> bool:
+        return time.time() - entry.created_at > self.ttl
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+        self._matrix = None
+
+
+class RedisSearchCacheBackend(SearchCacheBackend):
+    """Redis backend so every ASGI worker shares cached searches.
+
+    Entries live under a generation number that ``invalidate`` bumps, so
+    invalidation is a single INCR. Each worker keeps a local copy of the
+    query vectors for nearest-neighbour lookups and refreshes it at most
+    every ``sync_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://127.0.0.1:6379/1",
+        ttl: float = 600,
+        max_entries: int = 1000,
+        prefix: str = "policybot:search_cache",
+        sync_interval: float = 5.0,
+    ):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "Cannot import redis, please install with `pip install redis`."
+            ) from e
+        self.client = redis.Redis.from_url(redis_url)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.sync_interval = sync_interval
+        self._lock = Lock()
+        self._generation: Optional[int] = None
+        self._generation_checked_at = 0.0
+        self._synced_at = 0.0
+        self._matrix_generation: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+    def get(self, key: str) -> Optional[CachedSearch]:
+        raw = self.client.get(self._entry_key(key))
+        if raw is None:
+            return None
+        return CachedSearch(**json.loads(raw))
+
+    def nearest(
+        self, vector: np.ndarray, threshold: float, accept: Optional[Callable[[CachedSearch], bool]] = None
+    ) -> Optional[CachedSearch]:
+        keys, matrix = self._sync()
+        if matrix is None:
+            return None
+        scores = matrix @ vector
+        for index in np.argsort(-scores):
+            if scores[index] < threshold:
+                return None
+            key = keys[index]
+            entry = self.get(key)
+            if entry is None:
+                # Entry expired; forget its vector
+                self.client.hdel(self._vectors_key(), key)
+            elif accept is None or accept(entry):
+                return entry
+        return None
+
+    def set(self, key: str, vector: np.ndarray, entry: CachedSearch) -> None:
+        generation = self._current_generation()
+        vectors_key = self._vectors_key(generation)
+        order_key = f"{self.prefix}:{generation}:order"
+        pipe = self.client.pipeline()
+        pipe.set(self._entry_key(key, generation), json.dumps(entry.__dict__), ex=int(self.ttl))
+        pipe.hset(vectors_key, key, vector.astype(np.float32).tobytes())
+        pipe.zadd(order_key, {key: entry.created_at})
+        pipe.expire(vectors_key, int(self.ttl))
+        pipe.expire(order_key, int(self.ttl))
+        pipe.zcard(order_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = [k for k, _ in self.client.zpopmin(order_key, size - self.max_entries)]
+            if evicted:
+                self.client.hdel(vectors_key, *evicted)
+                self.client.delete(*[self._entry_key(k.decode(), generation) for k in evicted])
+
+    def invalidate(self) -> None:
+        self.client.incr(f"{self.prefix}:generation")
+        with self._lock:
+            self._generation = None
+            self._matrix = None
+
+    def _current_generation(self) -> int:
+        now = time.time()
+        if self._generation is None or now - self._generation_checked_at > self.sync_interval:
+            self._generation = int(self.client.get(f"{self.prefix}:generation") or 0)
+            self._generation_checked_at = now
+        return self._generation
+
+    def _entry_key(self, key: str, generation: Optional[int] = None) -> str:
+        generation = self._current_generation() if generation is None else generation
+        return f"{self.prefix}:{generation}:q:{key}"
+
+    def _vectors_key(self, generation: Optional[int] = None) -> str:
+        generation = self._current_generation() if generation is None else generation
+        return f"{self.prefix}:{generation}:vectors"
+
+    def _sync(self):
+        """Refresh the local vector matrix if stale; returns (keys, matrix)."""
+        with self._lock:
+            generation = self._current_generation()
+            if (
+                generation == self._matrix_generation
+                and time.time() - self._synced_at <= self.sync_interval
+            ):
+                return self._matrix_keys, self._matrix
+            raw = self.client.hgetall(self._vectors_key(generation))
+            self._synced_at = time.time()
+            self._matrix_generation = generation
+            if not raw:
+                self._matrix, self._matrix_keys = None, []
+            else:
+                self._matrix_keys = [k.decode() for k in raw]
+                self._matrix = np.stack(
+                    [np.frombuffer(v, dtype=np.float32) for v in raw.values()]
+                )
+            return self._matrix_keys, self._matrix
+
+
+class SearchResultCache:
+    """Exact-then-semantic cache mapping search queries to ordered doc ids.
+
+    Lookups first try the normalized query text, then the nearest cached
+    query embedding whose cosine similarity clears ``similarity_threshold``
+    and whose query has the same numbers and document ids.
+    When a ``version_provider`` is given (e.g. the vector index's record
+    count) it is polled every ``version_check_interval`` seconds and the
+    cache is invalidated whenever the reported version changes.
+
+    Args:
+        backend: Storage backend; defaults to an in-memory backend
+        similarity_threshold: Minimum cosine similarity for a semantic hit
+        version_provider: Callable returning the current index version
+        version_check_interval: Seconds between version checks
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SearchCacheBackend] = None,
+        similarity_threshold: float = 0.95,
+        version_provider: Optional[Callable[[], Hashable]] = None,
+        version_check_interval: float = 60.0,
+    ):
+        self.backend = backend or InMemorySearchCacheBackend()
+        self.similarity_threshold = similarity_threshold
+        self.version_provider = version_provider
+        self.version_check_interval = version_check_interval
+        self.stats = CacheStats()
+        self.semantic_hits = 0
+        self._version: Optional[Hashable] = None
+        self._version_checked_at = 0.0
+
+    @staticmethod
+    def key(query: str) -> str:
+        return make_key("search", normalize_text(query))
+
+    def get(self, query: str) -> Optional[List[str]]:
+        """Return cached doc ids for an exact (normalized) query match."""
+        self._check_version()
+        entry = self.backend.get(self.key(query))
+        if entry is None:
+            return None
+        self.stats.hits += 1
+        return entry.doc_ids
+
+    def get_similar(self, query: str, vector: List[float]) -> Optional[List[str]]:
+        """Return cached doc ids for the nearest sufficiently similar query."""
+        identifiers = identifier_tokens(query)
+        entry = self.backend.nearest(
+            _unit(vector),
+            self.similarity_threshold,
+            accept=lambda candidate: identifier_tokens(candidate.query) == identifiers,
+        )
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.semantic_hits += 1
+        return entry.doc_ids
+
+    def set(self, query: str, vector: List[float], doc_ids: List[str]) -> None:
+        self.backend.set(
+            self.key(query), _unit(vector), CachedSearch(query=query, doc_ids=list(doc_ids))
+        )
+
+    def invalidate(self) -> None:
+        logger.info("Invalidating search result cache")
+        self.backend.invalidate()
+
+    def _check_version(self) -> None:
+        if self.version_provider is None:
+            return
+        now = time.time()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        try:
+            version = self.version_provider()
+        except Exception as e:
+            logger.warning(f"Could not read index version for search cache: {e}")
+            return
+        if self._version is not None and version != self._version:
+            self.invalidate()
+        self._version = version
+
+
+def create_search_cache(
+    backend: str = "memory",
+    ttl: float = 600,
+    similarity_threshold: float = 0.95,
+    max_entries: int = 1000,
+    redis_url: Optional[str] = None,
+    version_provider: Optional[Callable[[], Hashable]] = None,
+) -> SearchResultCache:
+    """Build a search result cache from plain settings values."""
+    if backend == "redis":
+        store = RedisSearchCacheBackend(
+            redis_url=redis_url or "redis://127.0.0.1:6379/1", ttl=ttl, max_entries=max_entries
+        )
+    elif backend == "memory":
+        store = InMemorySearchCacheBackend(ttl=ttl, max_entries=max_entries)
+    else:
+        raise ValueError(f"Unknown search cache backend: {backend}")
+    return SearchResultCache(
+        store, similarity_threshold=similarity_threshold, version_provider=version_provider
+    )
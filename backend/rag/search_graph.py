@@ -1,11 +1,11 @@
 """Search graph implementation for document retrieval."""
 
+import asyncio
 from typing import Optional, List, Literal
 from threading import Lock
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import MessagesState, StateGraph
-from langchain_pinecone import PineconeVectorStore
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.graph import END, START
 from pydantic import BaseModel, Field
@@ -14,11 +14,17 @@ from langchain_core.documents import Document
 from IPython.display import Image
 from langchain_core.tools.simple import Tool
 from langchain_core.prompts import PromptTemplate
-from typing import Dict
+from langchain_core.runnables import RunnableLambda
+from typing import Any, Dict
 import logging
-from langchain.tools.retriever import RetrieverInput
+from langchain_core.tools.retriever import RetrieverInput
 logger = logging.getLogger(__name__)
 
+from .cache import ExpansionCache, make_key, normalize_text
+from .lexical import BM25Index
+from .metrics import token_usage_callback
+from .search_cache import SearchResultCache
+from .singleflight import create_singleflight
 from .base import (
     BaseRAGGraph,
     BaseModel,
@@ -33,57 +39,41 @@ from .base import (
 class ExtState(MessagesState):
     doc_ids: list
 
-class VectorStoreRetriever(BaseRetriever):
-    """Sync wrapper for vector store retrieval."""
-    
-    vector_store: PineconeVectorStore
+def get_retriever_tool(retriever: BaseRetriever, name: str, description: str) -> Tool:
+    """Create a search tool returning the documents and their combined text."""
 
-    async def _aget_relevant_documents(self, query: str) -> List[Document]:
-        """Async retrieval of relevant documents."""
-        docs = await self.vector_store.asimilarity_search(query, k=6)
-        return docs
+    def sync_func(query: str) -> Dict[str, any]:
+        """Sync function for retrieval."""
+        docs = retriever.invoke(query)
+        combined_string = "\n\n".join(doc.page_content for doc in docs)
+        return {
+            "documents": docs,
+            "combined_string": combined_string,
+        }
+
+    async def async_func(query: str) -> Dict[str, any]:
+        """Async function for retrieval."""
+        docs = await retriever.ainvoke(query)
+        combined_string = "\n\n".join(doc.page_content for doc in docs)
+        return {
+            "documents": docs,
+            "combined_string": combined_string,
+        }
+
+    return Tool(
+        name=name,
+        description=description,
+        func=sync_func,
+        coroutine=async_func,
+        args_schema=RetrieverInput,
+    )
 
-    def _get_relevant_documents(self, query: str) -> List[Document]:
-        """Sync retrieval of relevant documents."""
-        docs = self.vector_store.similarity_search(query, k=6)
-        return docs
-    
-    def get_retriever_tool(self, name: str, description: str, document_prompt: Optional[BasePromptTemplate] = None) -> Tool:
-        """Create a tool for this retriever."""
-                
-        def sync_func(query: str) -> Dict[str, any]:
-            """Sync function for retrieval."""
-            docs = self._get_relevant_documents(query)
-            doc_list = [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
-            combined_string = "\n\n".join(doc["content"] for doc in doc_list)
-            return {
-                "documents": docs,
-                "combined_string": combined_string,
-            }
-
-        async def async_func(query: str) -> Dict[str, any]:
-            """Async function for retrieval."""
-            docs = await self._aget_relevant_documents(query)
-            doc_list = [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
-            combined_string = "\n\n".join(doc["content"] for doc in doc_list)
-            return {
-                "documents": docs,
-                "combined_string": combined_string,
-            }
-        
-        return Tool(
-            name=name,
-            description=description,
-            func=sync_func,
-            coroutine=async_func,
-            args_schema=RetrieverInput,
-        )
-    
 class SearchGraph(BaseRAGGraph):
     """Singleton search graph for document retrieval."""
 
     _instance = None
     _lock = Lock()
+    graph_name = "search"
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -97,49 +87,120 @@ class SearchGraph(BaseRAGGraph):
         model: Optional[BaseModel] = None,
         embeddings: Optional[BaseEmbeddings] = None,
         vector_store: Optional[BaseVectorStore] = None,
+        lexical_index: Optional[BM25Index] = None,
         search_prompt: Optional[QuerySearchPromptTemplate] = None,
+        result_cache: Optional[SearchResultCache] = None,
+        expansion_cache: Optional[ExpansionCache] = None,
+        expansion_options: Optional[Dict[str, Any]] = None,
     ):
         if not hasattr(self, "_initialized"):
-            super().__init__(model, embeddings, vector_store)
+            super().__init__(model, embeddings, vector_store, lexical_index)
+
+            # Semantic cache of query -> ordered doc ids; invalidated when
+            # the index record count changes
+            self.result_cache = result_cache
+            if self.result_cache is not None and self.result_cache.version_provider is None:
+                self.result_cache.version_provider = self._index_version
 
             # Initialize prompts
             self.search_prompt = QuerySearchPromptTemplate().get_prompt_template()
             self.rewrite_prompt = RewritePromptTemplate().get_prompt_template()
             self.grader_prompt = GraderPromptTemplate().get_prompt_template()
+            self.search_chain = self.search_prompt | self.llm | StrOutputParser()
 
-            # Create sync retriever
-            self.sync_retriever = VectorStoreRetriever(vector_store=self.vector_store)
-            self.retrieve_tool = self.sync_retriever.get_retriever_tool(
+            # Expansions are deterministic at temperature 0, so memoize them
+            self.expansion_cache = expansion_cache or ExpansionCache(
+                prompt_template=self.search_prompt.template,
+                model_name=getattr(self.llm, "model_name", type(self.llm).__name__),
+                **(expansion_options or {}),
+            )
+
+            self.retrieve_tool = get_retriever_tool(
+                self.retriever,
                 name="search_documents",
                 description="Search through documents to find relevant information"
             )
 
-            # Initialize search state
-            self.max_retrieval_attempts = 3
-            self.retrieval_attempts = 0
-            
+            # Identical searches and expansions in flight at once run once
+            self.search_flight = create_singleflight("search")
+            self.expansion_flight = create_singleflight("expansion")
+
+            # Per-request state lives in ExtState, never on this shared
+            # instance, so concurrent searches cannot interfere
             self.graph = self._setup_workflow()
             self._initialized = True
 
+    def expand_query(self, query: str, refresh: bool = False, record: bool = True) -> str:
+        """Expand a query with the LLM, memoized in the expansion cache.
+
+        Args:
+            query: The raw search query
+            refresh: Ignore any cached expansion and recompute it
+            record: Count this lookup in the historical query log
+        """
+        if not refresh:
+            cached = self.expansion_cache.get(query, record=record)
+            if cached is not None:
+                return cached
+
+        def expand() -> str:
+            expansion = self.search_chain.invoke({"query": query})
+            self.expansion_cache.set(query, expansion)
+            return expansion
+
+        return self.expansion_flight.do(self._expansion_key(query), expand)
+
+    async def aexpand_query(self, query: str, refresh: bool = False, record: bool = True) -> str:
+        """Async version of ``expand_query``; the SQLite cache runs in a thread."""
+        if not refresh:
+            cached = await asyncio.to_thread(self.expansion_cache.get, query, record=record)
+            if cached is not None:
+                return cached
+
+        async def expand() -> str:
+            expansion = await self.search_chain.ainvoke({"query": query})
+            await asyncio.to_thread(self.expansion_cache.set, query, expansion)
+            return expansion
+
+        return await self.expansion_flight.ado(self._expansion_key(query), expand)
+
+    def _expansion_key(self, query: str) -> str:
+        return make_key(
+            "expansion", self.expansion_cache.prompt_hash, self.expansion_cache.model_name, normalize_text(query)
+        )
+
     def _expand_query(self, state):
         """Expand the search query for better retrieval."""
         messages = state["messages"]
         query = messages[0].content
-        search_chain = self.search_prompt | self.llm | StrOutputParser()
-        response = search_chain.invoke({"query": query})
+        response = self.expand_query(query)
         return {"messages":[response]}
 
+    async def _aexpand_query(self, state):
+        """Async version of ``_expand_query``."""
+        response = await self.aexpand_query(state["messages"][0].content)
+        return {"messages": [response]}
+
     def _retrieve(self, state):
         """Decide whether to retrieve or respond."""
         documents = self.retrieve_tool.invoke(state["messages"][-1].content)
         return {"messages": [documents["combined_string"]], "doc_ids": [doc.metadata["id"] for doc in documents["documents"]]}
-    
+
+    async def _aretrieve(self, state):
+        """Async version of ``_retrieve``."""
+        documents = await self.retrieve_tool.ainvoke(state["messages"][-1].content)
+        return {"messages": [documents["combined_string"]], "doc_ids": [doc.metadata["id"] for doc in documents["documents"]]}
+
+    def _dual_node(self, name: str, func, afunc) -> RunnableLambda:
+        """A node running ``func`` under ``invoke`` and ``afunc`` under ``ainvoke``."""
+        return RunnableLambda(self._node(name, func), afunc=self._node(name, afunc), name=name)
+
     def _setup_workflow(self) -> StateGraph:
         """Set up the search workflow with conditional branching."""
         workflow = StateGraph(ExtState)
 
-        workflow.add_node("expand_query", self._expand_query)
-        workflow.add_node("retrieve", self._retrieve)
+        workflow.add_node("expand_query", self._dual_node("expand_query", self._expand_query, self._aexpand_query))
+        workflow.add_node("retrieve", self._dual_node("retrieve", self._retrieve, self._aretrieve))
 
         workflow.add_edge(START, "expand_query")
         workflow.add_edge("expand_query", "retrieve")
@@ -154,18 +215,85 @@ class SearchGraph(BaseRAGGraph):
         """Override string representation to display graph visualization."""
         return Image(self.get_compiled_graph().get_graph(xray=True).draw_mermaid_png())
     
+    def _index_version(self):
+        """Record count of the backing index, used to detect index updates."""
+        if hasattr(self.vector_store, "index_version"):
+            return self.vector_store.index_version
+        index = getattr(self.vector_store, "index", None) or getattr(self.vector_store, "_index", None)
+        if index is None:
+            return None
+        return getattr(index.describe_index_stats(), "total_vector_count", None)
+
     def process_query(self, query: str):
         """Process a search query through the workflow.
 
+        Served from the result cache when the same or a near-identical
+        query was answered recently, and shared with any identical search
+        already in flight.
+
         Args:
             query: The search query
-            context: Optional context from chat session
         """
-        # self.retrieval_attempts = 0  # Reset counter
+        return self.search_flight.do(self._search_key(query), lambda: self._search(query))
+
+    def _search_key(self, query: str) -> str:
+        return make_key("search", normalize_text(query))
+
+    def _search(self, query: str) -> List[str]:
+        vector = None
+        if self.result_cache is not None:
+            cached = self.result_cache.get(query)
+            if cached is None:
+                vector = self.embeddings.embed_query(query)
+                cached = self.result_cache.get_similar(query, vector)
+            if cached is not None:
+                logger.info(f"Search served from cache with {len(cached)} results")
+                return cached
+
         inputs = {"messages": [HumanMessage(content=query)], "doc_ids": []}
         logger.info("Processing search query")
-        for step in self.graph.stream(inputs, stream_mode="values"):
-            if len(step["doc_ids"] )>0:
-                logger.info(f"Search completed successfully with {len(step["doc_ids"])} results")
-                return step["doc_ids"]
-            
+        config = {"callbacks": [token_usage_callback]}
+        for step in self.graph.stream(inputs, config, stream_mode="values"):
+            doc_ids = step["doc_ids"]
+            if len(doc_ids) > 0:
+                logger.info(f"Search completed successfully with {len(doc_ids)} results")
+                if vector is not None:
+                    self.result_cache.set(query, vector, doc_ids)
+                return doc_ids
+        return []
+
+    async def aprocess_query(self, query: str) -> List[str]:
+        """Async version of ``process_query`` for ASGI views.
+
+        Runs the workflow with ``ainvoke`` so the LLM, embedding and vector
+        store calls yield to the event loop instead of holding a thread.
+
+        Args:
+            query: The search query
+
+        Returns:
+            List[str]: Ordered ids of the matching documents
+        """
+        return await self.search_flight.ado(self._search_key(query), lambda: self._asearch(query))
+
+    async def _asearch(self, query: str) -> List[str]:
+        vector = None
+        if self.result_cache is not None:
+            cached = await asyncio.to_thread(self.result_cache.get, query)
+            if cached is None:
+                vector = await self.embeddings.aembed_query(query)
+                cached = await asyncio.to_thread(self.result_cache.get_similar, query, vector)
+            if cached is not None:
+                logger.info(f"Search served from cache with {len(cached)} results")
+                return cached
+
+        inputs = {"messages": [HumanMessage(content=query)], "doc_ids": []}
+        logger.info("Processing async search query")
+        config = {"callbacks": [token_usage_callback]}
+        state = await self.graph.ainvoke(inputs, config)
+        doc_ids = state["doc_ids"]
+        if doc_ids:
+            logger.info(f"Search completed successfully with {len(doc_ids)} results")
+            if vector is not None:
+                await asyncio.to_thread(self.result_cache.set, query, vector, doc_ids)
+        return doc_ids
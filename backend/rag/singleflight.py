@@ -0,0 +1,254 @@
+"""Request coalescing ("singleflight") for identical in-flight calls.
+
+When many users send the same search at once, only the first caller (the
+leader) runs the expansion, embedding, retrieval or full search; callers
+arriving while it is in flight wait for the same future and share its
+result. Nothing is kept once the call finishes, so this never serves stale
+results. The caches in ``rag.cache`` and ``rag.search_cache`` do that.
+
+With a Redis URL, JSON-serializable results are also coalesced across
+workers: the leader holds a short Redis lock and publishes its result
+under a result key that other workers' callers poll for.
+
+    flight = create_singleflight("expansion")
+    expansion = await flight.ado(key, lambda: chain.ainvoke({"query": query}))
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import weakref
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import SINGLEFLIGHT_CALLS, SINGLEFLIGHT_DEDUPLICATED
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Deletes the lock only if this leader still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisFlight:
+    """Cross-worker leader lock and result hand-off in Redis.
+
+    Args:
+        redis_url: Redis server URL
+        prefix: Key prefix for locks and results
+        lock_ttl: Seconds a leader may hold the lock
+        result_ttl: Seconds a published result stays readable
+        poll_interval: Seconds between result checks while waiting
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://127.0.0.1:6379/1",
+        prefix: str = "policybot:singleflight",
+        lock_ttl: float = 30.0,
+        result_ttl: float = 5.0,
+        poll_interval: float = 0.05,
+    ):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "Cannot import redis, please install with `pip install redis`."
+            ) from e
+        self.errors = redis.RedisError
+        self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._release = self.client.register_script(_RELEASE_SCRIPT)
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.prefix}:lock:{key}"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.prefix}:result:{key}"
+
+    def acquire(self, key: str) -> Optional[str]:
+        """Become the leader for ``key``; returns a lock token, or None if another worker leads."""
+        token = uuid.uuid4().hex
+        if self.client.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)):
+            return token
+        return None
+
+    def publish(self, key: str, token: str, value: Any) -> None:
+        """Publish the leader's result and release its lock."""
+        try:
+            self.client.set(self._result_key(key), json.dumps(value), px=int(self.result_ttl * 1000))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Singleflight result for {key} is not JSON-serializable: {e}")
+        self._release(keys=[self._lock_key(key)], args=[token])
+
+    def release(self, key: str, token: str) -> None:
+        self._release(keys=[self._lock_key(key)], args=[token])
+
+    def poll(self, key: str) -> Any:
+        """One check for a published result: the value, ``_MISSING`` to keep
+        waiting, or None when the leader is gone without publishing."""
+        value = self.client.get(self._result_key(key))
+        if value is not None:
+            return json.loads(value)
+        if not self.client.exists(self._lock_key(key)):
+            value = self.client.get(self._result_key(key))
+            return json.loads(value) if value is not None else None
+        return _MISSING
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key.
+
+    Sync callers (``do``) and async callers (``ado``) are coalesced
+    separately; async calls are grouped per event loop. Followers get the
+    leader's result object itself, so treat results as read-only.
+
+    Args:
+        operation: Label for the dedup metrics, e.g. ``search``
+        shared: ``RedisFlight`` to coalesce across workers as well; only
+            for JSON-serializable results
+    """
+
+    def __init__(self, operation: str, shared: Optional[RedisFlight] = None):
+        self.operation = operation
+        self.shared = shared
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = Lock()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently running."""
+        with self._lock:
+            return len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run ``func`` unless an identical call is in flight; return its result."""
+        SINGLEFLIGHT_CALLS.inc(operation=self.operation)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            SINGLEFLIGHT_DEDUPLICATED.inc(operation=self.operation, scope="process")
+            return future.result()
+
+        try:
+            result = self._run_shared(key, func) if self.shared is not None else func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of ``do``; ``func`` returns the awaitable to run.
+
+        The work runs in its own task, so a cancelled caller (e.g. a closed
+        request) does not cancel it for the others.
+        """
+        SINGLEFLIGHT_CALLS.inc(operation=self.operation)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            task = calls.get(key)
+            if task is None:
+                runner = self._arun_shared(key, func) if self.shared is not None else func()
+                task = calls[key] = asyncio.ensure_future(runner)
+                task.add_done_callback(lambda done: self._finish(calls, key, done))
+            else:
+                SINGLEFLIGHT_DEDUPLICATED.inc(operation=self.operation, scope="process")
+        return await asyncio.shield(task)
+
+    def _finish(self, calls: Dict[str, asyncio.Task], key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if calls.get(key) is task:
+                del calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def _run_shared(self, key: str, func: Callable[[], Any]) -> Any:
+        try:
+            token = self.shared.acquire(key)
+        except self.shared.errors as e:
+            logger.warning(f"Singleflight Redis unavailable, running {self.operation} locally: {e}")
+            return func()
+        if token is not None:
+            try:
+                result = func()
+            except BaseException:
+                self._safe(self.shared.release, key, token)
+                raise
+            self._safe(self.shared.publish, key, token, result)
+            return result
+
+        deadline = time.monotonic() + self.shared.lock_ttl
+        while time.monotonic() < deadline:
+            value = self._safe(self.shared.poll, key, default=None)
+            if value is None:
+                break
+            if value is not _MISSING:
+                SINGLEFLIGHT_DEDUPLICATED.inc(operation=self.operation, scope="redis")
+                return value
+            time.sleep(self.shared.poll_interval)
+        return func()
+
+    async def _arun_shared(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            token = await asyncio.to_thread(self.shared.acquire, key)
+        except self.shared.errors as e:
+            logger.warning(f"Singleflight Redis unavailable, running {self.operation} locally: {e}")
+            return await func()
+        if token is not None:
+            try:
+                result = await func()
+            except BaseException:
+                await asyncio.to_thread(self._safe, self.shared.release, key, token)
+                raise
+            await asyncio.to_thread(self._safe, self.shared.publish, key, token, result)
+            return result
+
+        deadline = time.monotonic() + self.shared.lock_ttl
+        while time.monotonic() < deadline:
+            value = await asyncio.to_thread(self._safe, self.shared.poll, key, default=None)
+            if value is None:
+                break
+            if value is not _MISSING:
+                SINGLEFLIGHT_DEDUPLICATED.inc(operation=self.operation, scope="redis")
+                return value
+            await asyncio.sleep(self.shared.poll_interval)
+        return await func()
+
+    def _safe(self, method: Callable, *args, default: Any = None) -> Any:
+        try:
+            return method(*args)
+        except self.shared.errors as e:
+            logger.warning(f"Singleflight Redis error during {self.operation}: {e}")
+            return default
+
+
+def create_singleflight(operation: str, shared: bool = True) -> SingleFlight:
+    """SingleFlight for ``operation``, shared across workers through
+    ``SINGLEFLIGHT_REDIS_URL`` when that is set and ``shared`` is True."""
+    redis_url = os.getenv("SINGLEFLIGHT_REDIS_URL") if shared else None
+    return SingleFlight(operation, shared=RedisFlight(redis_url) if redis_url else None)
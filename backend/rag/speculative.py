@@ -0,0 +1,79 @@
+"""Speculative retrieval started before the agent decides to search."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from .base import RetrievalResult
+from .lexical import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def query_similarity(first: str, second: str) -> float:
+    """Jaccard similarity of the two queries' word tokens."""
+    a, b = set(tokenize(first)), set(tokenize(second))
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+
+class SpeculativeRetrieval:
+    """A retrieval for the raw user question, run while the graph plans.
+
+    The chat graph starts one per turn, concurrently with history
+    reformulation and the agent call. When the agent's search query is
+    close enough to the raw question the in-flight (or finished) result is
+    reused; otherwise the task is cancelled and the real query runs.
+
+    Args:
+        query: The raw user question
+        retrieve: Coroutine function performing the retrieval
+        similarity_threshold: Minimum token Jaccard similarity for reuse
+    """
+
+    def __init__(
+        self,
+        query: str,
+        retrieve: Callable[[str], Awaitable[RetrievalResult]],
+        similarity_threshold: float = 0.6,
+    ):
+        self.query = query
+        self.retrieve = retrieve
+        self.similarity_threshold = similarity_threshold
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "SpeculativeRetrieval":
+        self._task = asyncio.create_task(self.retrieve(self.query))
+        return self
+
+    async def take(self, query: str) -> Optional[RetrievalResult]:
+        """Return the speculative result if it answers ``query``.
+
+        Single use: the task is released either way, and a failed
+        speculative retrieval simply falls back to a fresh one.
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return None
+        similarity = query_similarity(self.query, query)
+        if similarity < self.similarity_threshold:
+            task.cancel()
+            logger.info(f"Speculative retrieval discarded (similarity={similarity:.2f})")
+            return None
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed: {e}")
+            return None
+        logger.info(f"Speculative retrieval reused (similarity={similarity:.2f})")
+        return result
+
+    def cancel(self) -> None:
+        """Drop an unused speculative retrieval (e.g. on a direct response).
+
+        Safe to call from sync graph nodes, which LangGraph runs in a thread.
+        """
+        task, self._task = self._task, None
+        if task is not None:
+            task.get_loop().call_soon_threadsafe(task.cancel)
@@ -0,0 +1,118 @@
+"""Coalescing of streamed graph events into WebSocket frames."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+
+_DONE = object()
+
+
+@dataclass
+class StreamStats:
+    """Frame and byte counts for one streamed response."""
+
+    frames: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def record(self, payload: str) -> None:
+        self.frames += 1
+        self.bytes += len(payload.encode("utf-8"))
+
+    def as_dict(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "seconds": round(elapsed, 3),
+            "frames_per_second": round(self.frames / elapsed, 1),
+            "bytes_per_second": round(self.bytes / elapsed, 1),
+        }
+
+
+class _StreamError:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def coalesce_stream(
+    events: AsyncIterator[dict],
+    flush_interval: float = 0.05,
+    max_bytes: int = 1024,
+) -> AsyncIterator[dict]:
+    """Merge consecutive ``chunk`` events into larger frames.
+
+    Text chunks are buffered until ``flush_interval`` seconds have passed
+    since the first buffered chunk or ``max_bytes`` of text is pending,
+    whichever comes first. Any other event (a step transition, metadata)
+    flushes the buffer and is passed through immediately, so the client
+    never sees a step change before the text that preceded it.
+
+    Args:
+        events: Source stream of ``{"type": ..., ...}`` events
+        flush_interval: Longest time a chunk waits in the buffer
+        max_bytes: Buffered text size that forces a flush
+
+    Yields:
+        dict: Coalesced ``chunk`` frames and pass-through events
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(_StreamError(e))
+        finally:
+            await queue.put(_DONE)
+
+    producer = asyncio.create_task(pump())
+    buffer: List[str] = []
+    size = 0
+    deadline = 0.0
+
+    def flush() -> dict:
+        nonlocal buffer, size
+        frame = {"type": "chunk", "chunk": "".join(buffer)}
+        buffer, size = [], 0
+        return frame
+
+    try:
+        while True:
+            timeout = max(deadline - loop.time(), 0) if buffer else None
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield flush()
+                continue
+
+            if event is _DONE:
+                break
+            if isinstance(event, _StreamError):
+                if buffer:
+                    yield flush()
+                raise event.error
+            if event.get("type") == "chunk":
+                if not event["chunk"]:
+                    continue
+                if not buffer:
+                    deadline = loop.time() + flush_interval
+                buffer.append(event["chunk"])
+                size += len(event["chunk"].encode("utf-8"))
+                if size >= max_bytes:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield event
+
+        if buffer:
+            yield flush()
+    finally:
+        producer.cancel()
@@ -30,6 +30,7 @@ function Chat({ token, theme }) {
   const stepDisplayMap = {
     history: "Analyzing Chat Context",
     grade_documents: "Evaluating Sources",
+    route: "Planning Response",
     agent: "Planning Response",
     rewrite: "Refining Query",
     retrieve: "Retrieving Documents",